@@ -12,7 +12,7 @@ from typing import List, Optional
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from src.config.settings import Config
-from src.parser import MarkdownParser
+from src.parser import MarkdownParser, ParseCache
 from src.branding import BrandQuestionnaire, BrandProfileManager
 from src.batch import BatchProcessor, BatchConfiguration
 
@@ -38,14 +38,21 @@ def cli(ctx):
 @click.option('--output-dir', '-o', type=click.Path(), help='Output directory')
 @click.option('--template', '-t', help='Template to use')
 @click.option('--create-brand', is_flag=True, help='Create new brand profile')
+@click.option('--no-cache', is_flag=True, help='Do not use the parse and chart caches')
+@click.option('--stream', is_flag=True, help='Stream HTML output to disk instead of building it in memory')
+@click.option('--chart-format', type=click.Choice(['svg', 'png']), default='svg',
+              help='Image format for charts embedded in HTML')
+@click.option('--pdf-workers', type=int, default=0,
+              help='Lay out long PDFs in chunks across this many worker processes')
 @click.pass_context
-def transform(ctx, input_file, company, formats, output_dir, template, create_brand):
+def transform(ctx, input_file, company, formats, output_dir, template, create_brand, no_cache, stream,
+              chart_format, pdf_workers):
     """Transform a single markdown document"""
 
     base_dir = ctx.obj['base_dir']
 
     # Setup components
-    parser = MarkdownParser(config)
+    parser = MarkdownParser(config, cache=None if no_cache else ParseCache(config.parse_cache_dir))
 
     # Parse document
     click.echo(f"📄 Parsing {input_file}...")
@@ -72,27 +79,35 @@ def transform(ctx, input_file, company, formats, output_dir, template, create_br
     # Import generators
     from src.templates import TemplateEngine
     from src.generators.html_generator import HTMLGenerator
+    from src.generators.chart_cache import ChartCache
+    from src.generators.image_optimizer import ImageOptimizer
     from src.generators.pdf_generator import PDFGenerator
     from src.generators.pptx_generator import PowerPointGenerator
     from src.generators.docx_generator import WordGenerator
 
     # Setup template engine and generators
     templates_dir = base_dir / "src" / "templates"
-    template_engine = TemplateEngine(templates_dir)
+    template_engine = TemplateEngine(templates_dir, config.template_cache_dir)
 
     # Set output directory
     output_dir = Path(output_dir) if output_dir else base_dir / "outputs"
 
+    # Images are downsampled once per output resolution and shared between documents
+    image_optimizer = ImageOptimizer(config.image_cache_dir)
+
     # Generate documents
     for format_type in formats:
         click.echo(f"🔄 Generating {format_type.upper()}...")
 
         try:
             if format_type == 'html':
-                generator = HTMLGenerator(template_engine, output_dir / "html")
-                output_path = generator.generate_html(document, brand_profile)
+                chart_cache = None if no_cache else ChartCache(config.chart_cache_dir)
+                generator = HTMLGenerator(template_engine, output_dir / "html", chart_cache, chart_format,
+                                          image_optimizer)
+                output_path = generator.generate_html(document, brand_profile, stream=stream)
             elif format_type == 'pdf':
-                generator = PDFGenerator(template_engine, output_dir / "pdf")
+                generator = PDFGenerator(template_engine, output_dir / "pdf", parallel_workers=pdf_workers,
+                                         image_optimizer=image_optimizer)
                 output_path = generator.generate_pdf(document, brand_profile)
             elif format_type == 'pptx':
                 generator = PowerPointGenerator(template_engine, output_dir / "presentations")
@@ -106,6 +121,11 @@ def transform(ctx, input_file, company, formats, output_dir, template, create_br
         except Exception as e:
             click.echo(f"❌ Error generating {format_type}: {e}")
 
+    # Stop the PDF chunk worker processes started for this run
+    if 'pdf' in formats and pdf_workers > 1:
+        from src.generators.pdf_service import get_pdf_service
+        get_pdf_service().shutdown()
+
     click.echo("🎉 Transformation complete!")
 
 @cli.command()
@@ -116,10 +136,19 @@ def transform(ctx, input_file, company, formats, output_dir, template, create_br
               help='Output formats to generate')
 @click.option('--output-dir', '-o', type=click.Path(), help='Output directory')
 @click.option('--workers', '-w', default=4, help='Number of parallel workers')
+@click.option('--backend', '-b', default='thread', type=click.Choice(['thread', 'process']),
+              help='Run workers as threads or as separate processes')
 @click.option('--recursive', '-r', is_flag=True, help='Process subdirectories recursively')
 @click.option('--create-brand', is_flag=True, help='Create new brand profile')
+@click.option('--incremental', '-i', is_flag=True, help='Skip documents unchanged since the last run')
+@click.option('--no-cache', is_flag=True, help='Do not use the parse and chart caches')
+@click.option('--stream', is_flag=True, help='Stream HTML output to disk instead of building it in memory')
+@click.option('--chart-format', type=click.Choice(['svg', 'png']), default='svg',
+              help='Image format for charts embedded in HTML')
+@click.option('--trace', type=click.Path(), help='Write a Chrome trace (chrome://tracing, Perfetto) of job phases')
 @click.pass_context
-def batch(ctx, directory, company, formats, output_dir, workers, recursive, create_brand):
+def batch(ctx, directory, company, formats, output_dir, workers, backend, recursive, create_brand, incremental,
+          no_cache, stream, chart_format, trace):
     """Process multiple documents in batch"""
 
     base_dir = ctx.obj['base_dir']
@@ -143,9 +172,19 @@ def batch(ctx, directory, company, formats, output_dir, workers, recursive, crea
     # Setup batch processor
     batch_config = BatchConfiguration(
         max_workers=workers,
+        execution_backend=backend,
         output_directory=Path(output_dir) if output_dir else base_dir / "outputs",
         create_index_pages=True,
-        create_summary_document=True
+        create_summary_document=True,
+        incremental=incremental,
+        use_parse_cache=not no_cache,
+        parse_cache_dir=config.parse_cache_dir,
+        use_chart_cache=not no_cache,
+        chart_cache_dir=config.chart_cache_dir,
+        image_cache_dir=config.image_cache_dir,
+        stream_html=stream,
+        chart_formats={"html": chart_format},
+        trace_path=Path(trace) if trace else None
     )
 
     batch_processor = BatchProcessor(base_dir, batch_config)
@@ -169,6 +208,8 @@ def batch(ctx, directory, company, formats, output_dir, workers, recursive, crea
             click.echo(f"✅ Completed: {job.input_path.name}")
         elif status == "failed":
             click.echo(f"❌ Failed: {job.input_path.name} - {job.error_message}")
+        elif status == "skipped":
+            click.echo(f"⏭️ Unchanged: {job.input_path.name}")
 
     batch_processor.config.progress_callback = progress_callback
 
@@ -182,6 +223,8 @@ def batch(ctx, directory, company, formats, output_dir, workers, recursive, crea
     click.echo(f"Total jobs: {results['total_jobs']}")
     click.echo(f"Completed: {results['completed_jobs']}")
     click.echo(f"Failed: {results['failed_jobs']}")
+    if incremental:
+        click.echo(f"Skipped (unchanged): {results['skipped_jobs']}")
     click.echo(f"Success rate: {results['success_rate']:.1f}%")
     click.echo(f"Total time: {results['total_processing_time']:.2f} seconds")
 
@@ -190,6 +233,30 @@ def batch(ctx, directory, company, formats, output_dir, workers, recursive, crea
         for format_type, count in results['formats_generated'].items():
             click.echo(f"  {format_type.upper()}: {count}")
 
+    if results['parse_cache']:
+        cache_stats = results['parse_cache']
+        click.echo(f"\n🗄️ Parse cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                   f"({cache_stats['hit_rate']:.1f}% hit rate)")
+
+    if results['chart_cache']:
+        cache_stats = results['chart_cache']
+        click.echo(f"📈 Chart cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                   f"({cache_stats['hit_rate']:.1f}% hit rate)")
+
+    if results['images']:
+        image_stats = results['images']
+        click.echo(f"🖼️ Images: {image_stats['images']} optimized, {image_stats['deduplicated']} reused, "
+                   f"{image_stats['bytes_saved'] / 1024:.0f} KB saved")
+
+    if results['phase_timings']:
+        click.echo("\n⏱️ Phase timings (p50 / p95 / max):")
+        phase_timings = sorted(results['phase_timings'].items(), key=lambda item: item[1]['total'], reverse=True)
+        for name, timing in phase_timings:
+            click.echo(f"  {name}: {timing['p50'] * 1000:.0f}ms / {timing['p95'] * 1000:.0f}ms / "
+                       f"{timing['max'] * 1000:.0f}ms over {timing['count']} spans")
+        if trace:
+            click.echo(f"  Trace: {trace}")
+
     if results['failed_job_details']:
         click.echo("\n❌ Failed jobs:")
         for job_detail in results['failed_job_details'][:5]:  # Show first 5
@@ -252,12 +319,13 @@ def list_brands():
 
 @cli.command()
 @click.argument('input_file', type=click.Path(exists=True))
+@click.option('--no-cache', is_flag=True, help='Do not use the parse and chart caches')
 @click.pass_context
-def analyze(ctx, input_file):
+def analyze(ctx, input_file, no_cache):
     """Analyze a markdown document without generating output"""
 
     base_dir = ctx.obj['base_dir']
-    parser = MarkdownParser(config)
+    parser = MarkdownParser(config, cache=None if no_cache else ParseCache(config.parse_cache_dir))
 
     click.echo(f"🔍 Analyzing {input_file}...")
 
@@ -297,6 +365,72 @@ def analyze(ctx, input_file):
         for member in document.team_members[:5]:
             click.echo(f"  • {member.name} - {member.title}")
 
+@cli.command()
+@click.option('--corpus', multiple=True, type=click.Path(exists=True),
+              help='Markdown corpus directories (default: ../companies)')
+@click.option('--formats', '-f', multiple=True, default=['html', 'pdf', 'pptx', 'docx'],
+              type=click.Choice(['html', 'pdf', 'pptx', 'docx']),
+              help='Output formats to benchmark')
+@click.option('--synthetic', multiple=True, type=int, default=[40, 160],
+              help='Section counts of synthetic documents to add')
+@click.option('--repeat', type=int, default=3, help='Runs per case; the median is recorded')
+@click.option('--max-files', type=int, help='Only benchmark the first N corpus files')
+@click.option('--baseline', type=click.Path(), help='Baseline JSON to compare against')
+@click.option('--threshold', type=float, default=0.25, help='Allowed slowdown against the baseline (0.25 = 25%)')
+@click.option('--output', '-o', type=click.Path(), help='Write results JSON here')
+@click.option('--update-baseline', is_flag=True, help='Save the results as the new baseline')
+@click.pass_context
+def benchmark(ctx, corpus, formats, synthetic, repeat, max_files, baseline, threshold, output, update_baseline):
+    """Benchmark document generation and check for regressions"""
+
+    from src.benchmark import BenchmarkSuite, BenchmarkConfiguration
+
+    base_dir = ctx.obj['base_dir']
+    corpus_dirs = [Path(path) for path in corpus] or [config.companies_dir]
+    baseline_path = Path(baseline) if baseline else base_dir / "benchmarks" / "baseline.json"
+
+    suite = BenchmarkSuite(base_dir, BenchmarkConfiguration(
+        corpus_dirs=[path for path in corpus_dirs if path.exists()],
+        formats=list(formats),
+        synthetic_sections=list(synthetic),
+        repeat=repeat,
+        threshold=threshold,
+        max_corpus_files=max_files
+    ))
+
+    click.echo(f"⏱️ Benchmarking {', '.join(formats)} over {', '.join(str(path) for path in corpus_dirs)}...")
+    results = suite.run()
+
+    # Slowest cases first
+    cases = sorted(results['cases'].values(), key=lambda case: case['total'], reverse=True)
+    click.echo(f"\n📊 {len(cases)} cases, peak RSS {results['peak_rss_kb'] or 0:,} KB")
+    for case in cases[:10]:
+        phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in case['phases'].items())
+        click.echo(f"  {case['case']} [{case['format']}]: {case['total'] * 1000:.0f}ms "
+                   f"({phases}), {case['output_bytes']:,} bytes, peak {case['peak_memory_kb']:,} KB")
+
+    if output:
+        suite.save_results(results, Path(output))
+        click.echo(f"\n💾 Results: {output}")
+
+    regressions = []
+    previous = suite.load_baseline(baseline_path)
+    if previous is not None:
+        regressions = suite.compare(results, previous)
+        if regressions:
+            click.echo(f"\n❌ {len(regressions)} regression(s) against {baseline_path}:")
+            for regression in regressions:
+                click.echo(f"  {regression.key} {regression.metric}: {regression.format_value(regression.baseline)} -> "
+                           f"{regression.format_value(regression.current)} ({regression.ratio:.2f}x)")
+        else:
+            click.echo(f"\n✅ No regressions against {baseline_path}")
+
+    if update_baseline:
+        suite.save_results(results, baseline_path)
+        click.echo(f"💾 Baseline updated: {baseline_path}")
+    elif regressions:
+        sys.exit(1)
+
 @cli.command()
 def init():
     """Initialize the document transformer (install dependencies)"""
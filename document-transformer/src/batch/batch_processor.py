@@ -5,21 +5,29 @@ Handles bulk processing of multiple documents and companies
 
 import os
 import json
+import hashlib
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any, Union
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, asdict, replace
 from datetime import datetime
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 import time
 
-from ..parser import MarkdownParser, ParsedDocument
+from ..parser import MarkdownParser, ParsedDocument, ParseCache
+from ..parser.markdown_parser import PARSER_VERSION
 from ..branding import BrandProfile, BrandProfileManager, BrandQuestionnaire
-from ..templates import TemplateEngine
+from ..templates import TemplateEngine, TemplateConfig, hash_brand_profile
+from ..templates.template_engine import TEMPLATES_VERSION
 from ..generators.html_generator import HTMLGenerator
+from ..generators.chart_cache import ChartCache, CHART_VERSION
+from ..generators.image_optimizer import ImageOptimizer, IMAGE_PIPELINE_VERSION
 from ..generators.pdf_generator import PDFGenerator, PDFOptions
 from ..generators.pptx_generator import PowerPointGenerator
 from ..generators.docx_generator import WordGenerator, DocumentOptions
+from ..profiling import PhaseTimer, Span, SpanCollector, phase
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 @dataclass
 class ProcessingJob:
@@ -30,7 +38,7 @@ class ProcessingJob:
     template_config: Optional[str] = None
     custom_options: Optional[Dict] = None
     priority: int = 0  # Higher number = higher priority
-    status: str = "pending"  # pending, processing, completed, failed
+    status: str = "pending"  # pending, processing, completed, failed, skipped
     error_message: Optional[str] = None
     output_paths: Dict[str, str] = None
     processing_time: Optional[float] = None
@@ -42,10 +50,22 @@ class ProcessingJob:
         if self.created_at is None:
             self.created_at = datetime.now()
 
+@dataclass
+class JobContext:
+    """Shared state handed from a job's prepare step to its format tasks"""
+    document: ParsedDocument
+    brand_profile: BrandProfile
+    template_config: Optional[TemplateConfig] = None
+    rendered_html: Optional[str] = None
+    started_at: float = 0.0
+    parse_cache_counters: Optional[Dict[str, int]] = None
+    spans: Optional[List[Span]] = None  # phase spans recorded in a worker process
+
 @dataclass
 class BatchConfiguration:
     """Configuration for batch processing"""
     max_workers: int = 4
+    execution_backend: str = "thread"  # thread, process
     output_directory: Optional[Path] = None
     create_index_pages: bool = True
     create_summary_document: bool = True
@@ -53,12 +73,72 @@ class BatchConfiguration:
     retry_failed_jobs: bool = True
     max_retries: int = 3
     timeout_seconds: int = 300
+    incremental: bool = False
+    manifest_path: Optional[Path] = None
+    use_parse_cache: bool = True
+    parse_cache_dir: Optional[Path] = None
+    parse_cache_max_mb: int = 256
+    use_chart_cache: bool = True
+    chart_cache_dir: Optional[Path] = None
+    chart_cache_max_mb: int = 128
+    optimize_images: bool = True
+    image_cache_dir: Optional[Path] = None
+    image_cache_max_mb: int = 256
+    chart_formats: Dict[str, str] = field(default_factory=lambda: {"html": "svg"})  # output format -> png, svg
+    stream_html: bool = False
+    trace_path: Optional[Path] = None  # write a Chrome trace of job phases here
     progress_callback: Optional[callable] = None
 
+# Per-process state for the process-pool backend
+_worker_processor = None
+
+def _init_process_worker(base_dir: Path, config: BatchConfiguration):
+    """Build the parser, template engine and generators once per worker process"""
+
+    # Forked workers keep the parent's handlers; spawned workers start with none, so log to stderr
+    logging.basicConfig(level=getattr(logging, config.log_level.upper()), format=LOG_FORMAT)
+
+    global _worker_processor
+    _worker_processor = BatchProcessor(base_dir, config, worker=True)
+
+def _prepare_job_in_worker(job: ProcessingJob) -> JobContext:
+    """Prepare a job in a worker process and report its parse cache activity"""
+
+    parse_cache = _worker_processor.parse_cache
+    before = parse_cache.get_counters() if parse_cache else None
+
+    context = _worker_processor._prepare_job(job)
+
+    if parse_cache:
+        after = parse_cache.get_counters()
+        context.parse_cache_counters = {key: after[key] - before[key] for key in after}
+
+    context.spans = _worker_processor.span_collector.drain()
+    return context
+
+def _generate_format_in_worker(job: ProcessingJob, format_type: str,
+                               context: JobContext) -> Tuple[Optional[str], Dict[str, Dict[str, int]], List[Span]]:
+    """Generate one output format in a worker process and report its cache activity and phase spans"""
+
+    counters_sources = {
+        "chart_cache": _worker_processor.chart_cache,
+        "images": _worker_processor.image_optimizer
+    }
+    before = {name: source.get_counters() for name, source in counters_sources.items() if source}
+
+    output_path = _worker_processor._generate_format(job, format_type, context)
+
+    counters = {}
+    for name, start in before.items():
+        after = counters_sources[name].get_counters()
+        counters[name] = {key: after[key] - start[key] for key in after}
+
+    return output_path, counters, _worker_processor.span_collector.drain()
+
 class BatchProcessor:
     """Handles batch processing of multiple documents"""
 
-    def __init__(self, base_dir: Path, config: Optional[BatchConfiguration] = None):
+    def __init__(self, base_dir: Path, config: Optional[BatchConfiguration] = None, worker: bool = False):
         self.base_dir = base_dir
         self.config = config or BatchConfiguration()
 
@@ -66,19 +146,71 @@ class BatchProcessor:
         self.setup_output_directories()
 
         # Initialize components
-        self.parser = MarkdownParser()
-        self.template_engine = TemplateEngine(self.base_dir / "src" / "templates")
+        self._initialize_components()
+
+        # Job tracking
+        self.jobs: List[ProcessingJob] = []
+        self.span_collector = SpanCollector()
+        self.processing_stats = {
+            "total_jobs": 0,
+            "completed_jobs": 0,
+            "failed_jobs": 0,
+            "skipped_jobs": 0,
+            "total_time": 0.0,
+            "formats_generated": {}
+        }
+
+        # Setup logging (worker processes are set up by _init_process_worker)
+        if worker:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.setup_logging()
+
+    def _initialize_components(self):
+        """Create the parser, template engine, brand manager and generators"""
+
+        self.parse_cache = None
+        if self.config.use_parse_cache:
+            self.parse_cache = ParseCache(
+                self.config.parse_cache_dir or self.base_dir / "cache" / "parse",
+                self.config.parse_cache_max_mb
+            )
+        self.parser = MarkdownParser(cache=self.parse_cache)
+
+        self.chart_cache = None
+        if self.config.use_chart_cache:
+            self.chart_cache = ChartCache(
+                self.config.chart_cache_dir or self.base_dir / "cache" / "charts",
+                self.config.chart_cache_max_mb
+            )
+
+        self.image_optimizer = None
+        if self.config.optimize_images:
+            self.image_optimizer = ImageOptimizer(
+                self.config.image_cache_dir or self.base_dir / "cache" / "images",
+                self.config.image_cache_max_mb
+            )
+
+        self.template_engine = TemplateEngine(
+            self.base_dir / "src" / "templates",
+            self.base_dir / "cache" / "templates"
+        )
         self.brand_manager = BrandProfileManager(self.base_dir / "brand-profiles")
 
         # Initialize generators
         self.html_generator = HTMLGenerator(
             self.template_engine,
-            self.output_dirs["html"]
+            self.output_dirs["html"],
+            self.chart_cache,
+            self.config.chart_formats.get("html", "svg"),
+            self.image_optimizer
         )
         self.pdf_generator = PDFGenerator(
             self.template_engine,
             self.output_dirs["pdf"],
-            self.html_generator
+            self.html_generator,
+            image_optimizer=self.image_optimizer,
+            warm_fonts=True
         )
         self.pptx_generator = PowerPointGenerator(
             self.template_engine,
@@ -89,19 +221,6 @@ class BatchProcessor:
             self.output_dirs["documents"]
         )
 
-        # Job tracking
-        self.jobs: List[ProcessingJob] = []
-        self.processing_stats = {
-            "total_jobs": 0,
-            "completed_jobs": 0,
-            "failed_jobs": 0,
-            "total_time": 0.0,
-            "formats_generated": {}
-        }
-
-        # Setup logging
-        self.setup_logging()
-
     def setup_output_directories(self):
         """Setup output directories for different formats"""
 
@@ -129,7 +248,7 @@ class BatchProcessor:
 
         logging.basicConfig(
             level=getattr(logging, self.config.log_level.upper()),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            format=LOG_FORMAT,
             handlers=[
                 logging.FileHandler(log_file),
                 logging.StreamHandler()
@@ -213,28 +332,91 @@ class BatchProcessor:
         start_time = time.time()
         self.logger.info(f"Starting batch processing of {len(self.jobs)} jobs")
 
+        # Phase timings and the trace cover this run only
+        self.span_collector.clear()
+
         # Sort jobs by priority
         sorted_jobs = sorted(self.jobs, key=lambda x: x.priority, reverse=True)
 
-        # Process jobs in parallel
-        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-            future_to_job = {
-                executor.submit(self._process_single_job, job): job
-                for job in sorted_jobs
-            }
-
-            for future in as_completed(future_to_job):
-                job = future_to_job[future]
-                try:
-                    result = future.result()
-                    self._update_job_status(job, "completed", result)
-                    if self.config.progress_callback:
-                        self.config.progress_callback(job, "completed")
-                except Exception as e:
-                    self._update_job_status(job, "failed", {"error": str(e)})
-                    self.logger.error(f"Job failed: {job.input_path.name} - {e}")
-                    if self.config.progress_callback:
-                        self.config.progress_callback(job, "failed")
+        # Skip jobs whose inputs and dependencies are unchanged since the last run
+        manifest = None
+        fingerprints = {}
+        if self.config.incremental:
+            manifest = self._load_manifest()
+            sorted_jobs = self._filter_unchanged_jobs(sorted_jobs, manifest, fingerprints)
+
+        # Process jobs in parallel. Each job is a small plan: a prepare task
+        # (parse, brand, template render) fans out into one task per format.
+        use_processes = self.config.execution_backend == "process"
+        prepare_function = _prepare_job_in_worker if use_processes else self._prepare_job
+        format_function = _generate_format_in_worker if use_processes else self._generate_format
+
+        with self._create_executor() as executor:
+            pending = {}
+            job_states = {}
+
+            for job in sorted_jobs:
+                job.status = "processing"
+                pending[executor.submit(prepare_function, job)] = (job, None)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    job, format_type = pending.pop(future)
+
+                    if format_type is None:
+                        try:
+                            context = future.result()
+                        except Exception as e:
+                            self._fail_job(job, e)
+                            continue
+
+                        if context.parse_cache_counters and self.parse_cache:
+                            self.parse_cache.merge_counters(context.parse_cache_counters)
+                        if context.spans:
+                            self.span_collector.add(context.spans)
+                            context.spans = None
+
+                        job_states[id(job)] = {
+                            "context": context,
+                            "remaining": len(job.output_formats),
+                            "output_paths": {}
+                        }
+                        for job_format in job.output_formats:
+                            pending[executor.submit(format_function, job, job_format, context)] = (job, job_format)
+                    else:
+                        state = job_states[id(job)]
+                        try:
+                            output_path = future.result()
+                            if use_processes:
+                                output_path, counters, spans = output_path
+                                self.span_collector.add(spans)
+                                if "chart_cache" in counters and self.chart_cache:
+                                    self.chart_cache.merge_counters(counters["chart_cache"])
+                                if "images" in counters and self.image_optimizer:
+                                    self.image_optimizer.merge_counters(counters["images"])
+                            if output_path:
+                                state["output_paths"][format_type] = output_path
+                        except Exception as e:
+                            self.logger.error(f"Error generating {format_type} for {job.input_path.name}: {e}")
+                        state["remaining"] -= 1
+
+                    # The job is done once its last format task has finished
+                    state = job_states.get(id(job))
+                    if state and state["remaining"] == 0:
+                        del job_states[id(job)]
+                        result = self._build_job_result(state["context"], state["output_paths"])
+                        self._complete_job(job, result, manifest, fingerprints.get(id(job)))
+
+        if manifest is not None:
+            self._save_manifest(manifest)
+
+        # Workers wrote to the shared cache directories
+        if use_processes:
+            for cache in (self.parse_cache, self.chart_cache, self.image_optimizer):
+                if cache:
+                    cache.reload_index()
 
         total_time = time.time() - start_time
         self.processing_stats["total_time"] = total_time
@@ -242,10 +424,190 @@ class BatchProcessor:
         # Generate reports
         if self.config.create_summary_document:
             self._create_processing_report()
+        if self.config.trace_path:
+            trace_path = self.span_collector.export_chrome_trace(self.config.trace_path)
+            self.logger.info(f"Phase trace saved: {trace_path}")
 
         self.logger.info(f"Batch processing completed in {total_time:.2f} seconds")
         return self.get_processing_summary()
 
+    def _complete_job(self, job: ProcessingJob, result: Dict[str, Any],
+                      manifest: Optional[Dict[str, Any]], fingerprint: Optional[Dict[str, str]]):
+        """Mark a job as completed, record it in the manifest and notify listeners"""
+
+        self._update_job_status(job, "completed", result)
+        if manifest is not None:
+            self._record_manifest_entry(manifest, job, fingerprint)
+        if self.config.progress_callback:
+            self.config.progress_callback(job, "completed")
+
+    def _fail_job(self, job: ProcessingJob, error: Exception):
+        """Mark a job as failed and notify listeners"""
+
+        self._update_job_status(job, "failed", {"error": str(error)})
+        self.logger.error(f"Job failed: {job.input_path.name} - {error}")
+        if self.config.progress_callback:
+            self.config.progress_callback(job, "failed")
+
+    def _create_executor(self):
+        """Create the executor for the configured execution backend"""
+
+        backend = self.config.execution_backend
+        if backend == "thread":
+            return ThreadPoolExecutor(max_workers=self.config.max_workers)
+        if backend == "process":
+            # Callbacks stay in the parent, workers only need the settings
+            worker_config = replace(self.config, progress_callback=None)
+            return ProcessPoolExecutor(
+                max_workers=self.config.max_workers,
+                initializer=_init_process_worker,
+                initargs=(self.base_dir, worker_config)
+            )
+
+        raise ValueError(f"Unsupported execution backend: {backend}")
+
+    def _get_manifest_path(self) -> Path:
+        """Get the location of the incremental build manifest"""
+        return self.config.manifest_path or self.output_dirs["base"] / "batch_manifest.json"
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Load the incremental build manifest from the last run"""
+
+        manifest_path = self._get_manifest_path()
+        if manifest_path.exists():
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+
+        return {"jobs": {}}
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        """Save the incremental build manifest"""
+
+        manifest["updated_at"] = datetime.now().isoformat()
+        manifest_path = self._get_manifest_path()
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        self.logger.info(f"Manifest saved: {manifest_path}")
+
+    def _filter_unchanged_jobs(self, jobs: List[ProcessingJob], manifest: Dict[str, Any],
+                               fingerprints: Dict[int, Dict[str, str]]) -> List[ProcessingJob]:
+        """Mark up-to-date jobs as skipped and return the jobs that need processing"""
+
+        # Shared dependencies are hashed once per run
+        template_hash = self._hash_templates()
+        settings_hash = self._hash_output_settings()
+        saved_profiles_hash = None
+
+        pending_jobs = []
+        for job in jobs:
+            if job.brand_profile is None and saved_profiles_hash is None:
+                saved_profiles_hash = self._hash_saved_brand_profiles()
+
+            fingerprint = {
+                "input_hash": self._hash_file(job.input_path),
+                "brand_hash": self._hash_brand_profile(job.brand_profile) if job.brand_profile
+                              else f"auto:{saved_profiles_hash}",
+                "template_hash": f"{template_hash}:{job.template_config or ''}",
+                "settings_hash": settings_hash
+            }
+            fingerprints[id(job)] = fingerprint
+
+            entry = manifest["jobs"].get(self._manifest_key(job))
+            if entry and self._is_up_to_date(job, entry, fingerprint):
+                job.status = "skipped"
+                job.output_paths = {fmt: entry["outputs"][fmt] for fmt in job.output_formats}
+                self.processing_stats["skipped_jobs"] += 1
+                if self.config.progress_callback:
+                    self.config.progress_callback(job, "skipped")
+            else:
+                pending_jobs.append(job)
+
+        self.logger.info(f"Incremental mode: {len(jobs) - len(pending_jobs)} unchanged jobs skipped")
+        return pending_jobs
+
+    def _is_up_to_date(self, job: ProcessingJob, entry: Dict[str, Any], fingerprint: Dict[str, str]) -> bool:
+        """Check a manifest entry against the current job fingerprint and outputs"""
+
+        for key, value in fingerprint.items():
+            if entry.get(key) != value:
+                return False
+
+        outputs = entry.get("outputs", {})
+        for format_type in job.output_formats:
+            output_path = outputs.get(format_type)
+            if not output_path or not Path(output_path).exists():
+                return False
+
+        return True
+
+    def _record_manifest_entry(self, manifest: Dict[str, Any], job: ProcessingJob,
+                               fingerprint: Dict[str, str]):
+        """Record the fingerprint and outputs of a completed job"""
+
+        key = self._manifest_key(job)
+        entry = manifest["jobs"].get(key)
+
+        # Outputs from older runs only stay valid when nothing changed
+        outputs = {}
+        if entry and all(entry.get(k) == v for k, v in fingerprint.items()):
+            outputs.update(entry.get("outputs", {}))
+        outputs.update({fmt: str(path) for fmt, path in job.output_paths.items()})
+
+        manifest["jobs"][key] = dict(fingerprint, outputs=outputs)
+
+    def _manifest_key(self, job: ProcessingJob) -> str:
+        """Manifest key for a job"""
+        return str(Path(job.input_path).resolve())
+
+    def _hash_file(self, file_path: Path) -> str:
+        """SHA-256 of a file's contents"""
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _hash_directory(self, directory: Path, patterns: List[str]) -> str:
+        """SHA-256 over the names and contents of matching files in a directory"""
+
+        digest = hashlib.sha256()
+        files = sorted({path for pattern in patterns for path in directory.glob(pattern) if path.is_file()})
+        for file_path in files:
+            digest.update(str(file_path.relative_to(directory)).encode('utf-8'))
+            digest.update(self._hash_file(file_path).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _hash_templates(self) -> str:
+        """Hash of all HTML templates, stylesheets and custom template configs"""
+        return self._hash_directory(self.template_engine.templates_dir, ["**/*.html", "**/*.css", "custom/*.json"])
+
+    def _hash_output_settings(self) -> str:
+        """Hash of the batch settings and pipeline versions that change generated outputs"""
+
+        settings = {
+            "chart_formats": self.config.chart_formats,
+            "stream_html": self.config.stream_html,
+            "optimize_images": self.config.optimize_images,
+            "parser_version": PARSER_VERSION,
+            "templates_version": TEMPLATES_VERSION,
+            "chart_version": CHART_VERSION,
+            "image_pipeline_version": IMAGE_PIPELINE_VERSION
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _hash_saved_brand_profiles(self) -> str:
+        """Hash of the saved brand profiles used when a job has no explicit brand"""
+        return self._hash_directory(self.brand_manager.brand_profiles_dir, ["*_brand_profile.json"])
+
+    def _hash_brand_profile(self, brand_profile: BrandProfile) -> str:
+        """Hash of the brand settings that affect rendering"""
+        return hash_brand_profile(brand_profile)
+
     def process_single_job(self, job: ProcessingJob) -> Dict[str, Any]:
         """Process a single job (can be called directly)"""
         return self._process_single_job(job)
@@ -254,7 +616,39 @@ class BatchProcessor:
         """Internal method to process a single job"""
 
         job.status = "processing"
-        start_time = time.time()
+        context = self._prepare_job(job)
+
+        # Generate output files
+        output_paths = {}
+
+        for format_type in job.output_formats:
+            try:
+                output_path = self._generate_format(job, format_type, context)
+                if output_path:
+                    output_paths[format_type] = output_path
+
+            except Exception as e:
+                self.logger.error(f"Error generating {format_type} for {job.input_path.name}: {e}")
+                continue
+
+        return self._build_job_result(context, output_paths)
+
+    def _prepare_job(self, job: ProcessingJob) -> JobContext:
+        """Parse the document, resolve the brand and render the shared HTML for a job"""
+
+        started_at = time.time()
+        timer = PhaseTimer(record_spans=True, job=job.input_path.name)
+
+        try:
+            with timer.activate(), timer.phase("prepare"):
+                context = self._prepare_job_phases(job, started_at)
+        finally:
+            self.span_collector.add(timer.spans)
+
+        return context
+
+    def _prepare_job_phases(self, job: ProcessingJob, started_at: float) -> JobContext:
+        """Parse, brand lookup and shared render steps of _prepare_job"""
 
         try:
             # Parse document
@@ -263,47 +657,75 @@ class BatchProcessor:
             # Get or create brand profile
             brand_profile = job.brand_profile
             if not brand_profile:
-                brand_profile = self._get_or_create_brand_profile(document)
-
-            # Generate output files
-            output_paths = {}
-
-            for format_type in job.output_formats:
-                try:
-                    if format_type == "html":
-                        output_path = self.html_generator.generate_html(document, brand_profile)
-                    elif format_type == "pdf":
-                        output_path = self.pdf_generator.generate_pdf(document, brand_profile)
-                    elif format_type == "pptx":
-                        output_path = self.pptx_generator.generate_presentation(document, brand_profile)
-                    elif format_type == "docx":
-                        output_path = self.docx_generator.generate_document(document, brand_profile)
-                    else:
-                        self.logger.warning(f"Unsupported format: {format_type}")
-                        continue
+                with phase("brand"):
+                    brand_profile = self._get_or_create_brand_profile(document)
 
-                    output_paths[format_type] = output_path
-                    self.processing_stats["formats_generated"][format_type] = \
-                        self.processing_stats["formats_generated"].get(format_type, 0) + 1
+        except Exception as e:
+            raise Exception(f"Failed to process {job.input_path.name}: {e}")
 
-                except Exception as e:
-                    self.logger.error(f"Error generating {format_type} for {job.input_path.name}: {e}")
-                    continue
+        context = JobContext(document=document, brand_profile=brand_profile, started_at=started_at)
 
-            processing_time = time.time() - start_time
+        # HTML and PDF both start from the same template render (streamed HTML renders on its own)
+        needs_html_render = "html" in job.output_formats and not self.config.stream_html
+        if needs_html_render or "pdf" in job.output_formats:
+            try:
+                context.template_config = self.template_engine.get_template_for_document(document, brand_profile)
+                context.rendered_html = self.template_engine.render_document(
+                    document, brand_profile, context.template_config
+                )
+            except Exception as e:
+                # Leave rendering to the individual generators
+                self.logger.warning(f"Shared render failed for {job.input_path.name}: {e}")
 
-            return {
-                "output_paths": output_paths,
-                "processing_time": processing_time,
-                "document_info": {
-                    "title": document.metadata.title,
-                    "type": document.metadata.document_type,
-                    "company": document.metadata.company_name
-                }
-            }
+        return context
 
-        except Exception as e:
-            raise Exception(f"Failed to process {job.input_path.name}: {e}")
+    def _generate_format(self, job: ProcessingJob, format_type: str, context: JobContext) -> Optional[str]:
+        """Generate one output format from a prepared job, recording its phase spans"""
+
+        timer = PhaseTimer(record_spans=True, job=job.input_path.name, format=format_type)
+        try:
+            with timer.activate(), timer.phase(f"generate_{format_type}"):
+                return self._run_generator(job, format_type, context)
+        finally:
+            self.span_collector.add(timer.spans)
+
+    def _run_generator(self, job: ProcessingJob, format_type: str, context: JobContext) -> Optional[str]:
+        """Run the generator for one output format"""
+
+        document = context.document
+        brand_profile = context.brand_profile
+
+        if format_type == "html":
+            return self.html_generator.generate_html(
+                document, brand_profile, context.template_config, rendered_html=context.rendered_html,
+                stream=self.config.stream_html
+            )
+        elif format_type == "pdf":
+            return self.pdf_generator.generate_pdf(
+                document, brand_profile, context.template_config, rendered_html=context.rendered_html
+            )
+        elif format_type == "pptx":
+            return self.pptx_generator.generate_presentation(document, brand_profile)
+        elif format_type == "docx":
+            return self.docx_generator.generate_document(document, brand_profile)
+
+        self.logger.warning(f"Unsupported format: {format_type}")
+        return None
+
+    def _build_job_result(self, context: JobContext, output_paths: Dict[str, str]) -> Dict[str, Any]:
+        """Build the result record for a finished job"""
+
+        document = context.document
+
+        return {
+            "output_paths": output_paths,
+            "processing_time": time.time() - context.started_at,
+            "document_info": {
+                "title": document.metadata.title,
+                "type": document.metadata.document_type,
+                "company": document.metadata.company_name
+            }
+        }
 
     def _get_or_create_brand_profile(self, document: ParsedDocument) -> BrandProfile:
         """Get existing brand profile or create a default one"""
@@ -362,6 +784,9 @@ class BatchProcessor:
             self.processing_stats["completed_jobs"] += 1
             if result and "output_paths" in result:
                 job.output_paths = result["output_paths"]
+                for format_type in result["output_paths"]:
+                    self.processing_stats["formats_generated"][format_type] = \
+                        self.processing_stats["formats_generated"].get(format_type, 0) + 1
             if result and "processing_time" in result:
                 job.processing_time = result["processing_time"]
         elif status == "failed":
@@ -380,6 +805,12 @@ class BatchProcessor:
 
         report_data = {
             "processing_summary": self.processing_stats,
+            "parse_cache": self.parse_cache.get_stats() if self.parse_cache else None,
+            "chart_cache": self.chart_cache.get_stats() if self.chart_cache else None,
+            "images": self.image_optimizer.get_stats() if self.image_optimizer else None,
+            "render_cache": self.template_engine.render_cache.get_stats(),
+            "pdf_service": self.pdf_generator.pdf_service.get_stats(),
+            "phase_timings": self.span_collector.get_phase_stats(),
             "job_details": [],
             "generated_at": datetime.now().isoformat(),
             "configuration": asdict(self.config)
@@ -426,14 +857,20 @@ class BatchProcessor:
 
         completed_jobs = [j for j in self.jobs if j.status == "completed"]
         failed_jobs = [j for j in self.jobs if j.status == "failed"]
+        skipped_jobs = [j for j in self.jobs if j.status == "skipped"]
 
         return {
             "total_jobs": len(self.jobs),
             "completed_jobs": len(completed_jobs),
             "failed_jobs": len(failed_jobs),
-            "success_rate": (len(completed_jobs) / len(self.jobs)) * 100 if self.jobs else 0,
+            "skipped_jobs": len(skipped_jobs),
+            "success_rate": ((len(completed_jobs) + len(skipped_jobs)) / len(self.jobs)) * 100 if self.jobs else 0,
             "total_processing_time": self.processing_stats["total_time"],
             "formats_generated": self.processing_stats["formats_generated"],
+            "parse_cache": self.parse_cache.get_stats() if self.parse_cache else None,
+            "chart_cache": self.chart_cache.get_stats() if self.chart_cache else None,
+            "images": self.image_optimizer.get_stats() if self.image_optimizer else None,
+            "phase_timings": self.span_collector.get_phase_stats(),
             "output_directories": {k: str(v) for k, v in self.output_dirs.items()},
             "failed_job_details": [
                 {
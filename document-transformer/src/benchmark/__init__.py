@@ -0,0 +1,13 @@
+"""
+Benchmark module for document transformation
+"""
+
+from .benchmark_suite import BenchmarkSuite, BenchmarkConfiguration, CaseResult, Regression, make_synthetic_document
+
+__all__ = [
+    'BenchmarkSuite',
+    'BenchmarkConfiguration',
+    'CaseResult',
+    'Regression',
+    'make_synthetic_document'
+]
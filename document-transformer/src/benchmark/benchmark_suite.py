@@ -0,0 +1,343 @@
+"""
+Benchmark suite for document generation
+Times each generator phase over the markdown corpus and synthetic documents, and compares runs against a JSON baseline
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import importlib
+import platform
+import statistics
+import tempfile
+import tracemalloc
+import logging
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Callable, Tuple
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+from ..parser import MarkdownParser, ParsedDocument
+from ..branding import BrandProfile, ColorPalette, Typography, DesignStyle
+from ..templates import TemplateEngine
+from ..profiling import PhaseTimer
+
+# Bump when cases or measurements change so old baselines are not compared against
+BENCHMARK_VERSION = "1.1.0"
+
+FORMATS = ['html', 'pdf', 'pptx', 'docx']
+
+@dataclass
+class BenchmarkConfiguration:
+    """Configuration for a benchmark run"""
+    corpus_dirs: List[Path] = field(default_factory=list)
+    formats: List[str] = field(default_factory=lambda: list(FORMATS))
+    synthetic_sections: List[int] = field(default_factory=lambda: [40, 160])
+    repeat: int = 3
+    threshold: float = 0.25  # allowed slowdown relative to the baseline
+    min_regression_seconds: float = 0.05  # ignore slowdowns smaller than this, they are noise
+    min_regression_kb: int = 1024  # ignore smaller growth in peak memory
+    min_regression_bytes: int = 1024  # ignore smaller growth in output size
+    max_corpus_files: Optional[int] = None
+
+@dataclass
+class CaseResult:
+    """Median timings of one document in one output format"""
+    case: str
+    format: str
+    phases: Dict[str, float]
+    total: float
+    output_bytes: int
+    peak_memory_kb: int = 0  # peak traced allocations of one untimed run of this case alone
+
+@dataclass
+class Regression:
+    """A timing, memory peak or output size that grew more than the baseline allows"""
+    key: str
+    metric: str
+    baseline: float
+    current: float
+    unit: str = "seconds"  # seconds, kb or bytes
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float('inf')
+
+    def format_value(self, value: float) -> str:
+        """A measurement in this regression's unit, for display"""
+
+        if self.unit == "seconds":
+            return f"{value * 1000:.0f}ms"
+        if self.unit == "kb":
+            return f"{value:,.0f} KB"
+        return f"{value:,.0f} bytes"
+
+def make_synthetic_document(sections: int, company: str = "Benchmark Corp") -> str:
+    """Build a large investor document with sections, financial tables and team members"""
+
+    lines = [
+        f"# {company} Research Pack",
+        "",
+        f"**Company**: {company}",
+        "**Document Type**: Market Research",
+        "",
+        "## Executive Summary",
+        "",
+        f"{company} builds fibre and wireless infrastructure for underserved markets. " * 4,
+        ""
+    ]
+
+    for i in range(1, sections + 1):
+        lines.extend([
+            f"## Market Segment {i}",
+            "",
+            f"Segment {i} shows steady demand growth with improving unit economics and a clear path to scale. " * 3,
+            "",
+            f"- Subscribers in segment {i} grew {10 + i % 30}% year on year",
+            f"- Average revenue per user reached R{150 + i % 90}",
+            ""
+        ])
+        if i % 2 == 0:
+            lines.extend([
+                f"### Financial Projections {i}",
+                "",
+                "| Year | Revenue | EBITDA | Margin |",
+                "|------|---------|--------|--------|",
+            ])
+            for year in range(2025, 2030):
+                revenue = (i + 1) * (year - 2020) * 1.5
+                lines.append(f"| {year} | R{revenue:.1f}M | R{revenue * 0.3:.1f}M | {30 + (year - 2025) * 2}% |")
+            lines.append("")
+
+    lines.extend(["## Team", ""])
+    for i in range(6):
+        lines.extend([f"### Team Member {i + 1}", "**Role**: Executive", "Experienced operator.", ""])
+
+    return "\n".join(lines)
+
+def get_peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process over its whole life, in kilobytes"""
+
+    if not RESOURCE_AVAILABLE:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+class BenchmarkSuite:
+    """Runs the generators over a document corpus and records per-phase timings"""
+
+    def __init__(self, base_dir: Path, config: Optional[BenchmarkConfiguration] = None):
+        self.base_dir = base_dir
+        self.config = config or BenchmarkConfiguration()
+        self.templates_dir = base_dir / "src" / "templates"
+        self.logger = logging.getLogger(__name__)
+
+        self.brand_profile = BrandProfile(
+            company_name="Benchmark Corp",
+            industry="telecom",
+            design_style=DesignStyle.MODERN_CORPORATE,
+            color_palette=ColorPalette(primary=["#1976D2", "#2196F3"], secondary=["#424242", "#757575"]),
+            typography=Typography(heading_font="Inter", body_font="Inter")
+        )
+
+    def collect_cases(self, work_dir: Path) -> List[Tuple[str, Path]]:
+        """Corpus markdown files plus synthetic documents, as (case name, path)"""
+
+        cases = []
+        for corpus_dir in self.config.corpus_dirs:
+            files = sorted(corpus_dir.glob("**/*.md"))
+            if self.config.max_corpus_files:
+                files = files[:self.config.max_corpus_files]
+            for file_path in files:
+                cases.append((f"corpus/{file_path.relative_to(corpus_dir).as_posix()}", file_path))
+
+        for sections in self.config.synthetic_sections:
+            file_path = work_dir / f"synthetic_{sections}.md"
+            file_path.write_text(make_synthetic_document(sections), encoding='utf-8')
+            cases.append((f"synthetic/{sections}_sections", file_path))
+
+        return cases
+
+    def run(self) -> Dict[str, Any]:
+        """Run every case in every available format and return the results document"""
+
+        work_dir = Path(tempfile.mkdtemp(prefix="document-benchmark-"))
+        try:
+            generators = self._build_generators(work_dir / "outputs")
+            results = []
+
+            for case, file_path in self.collect_cases(work_dir):
+                for format_type in self.config.formats:
+                    if format_type not in generators:
+                        continue
+                    try:
+                        results.append(self._run_case(case, file_path, format_type, generators[format_type]))
+                    except Exception as e:
+                        self.logger.warning(f"Benchmark case {case} ({format_type}) failed: {e}")
+
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        return {
+            "version": BENCHMARK_VERSION,
+            "generated_at": datetime.now().isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "processor": platform.processor()
+            },
+            "formats": sorted(generators),
+            "peak_rss_kb": get_peak_rss_kb(),
+            "cases": {f"{result.case}:{result.format}": asdict(result) for result in results}
+        }
+
+    def _build_generators(self, output_dir: Path) -> Dict[str, Callable[[TemplateEngine, ParsedDocument], str]]:
+        """Generator functions for each requested format whose dependencies are installed"""
+
+        generators = {}
+
+        if 'html' in self.config.formats:
+            from ..generators.html_generator import HTMLGenerator
+            generators['html'] = lambda engine, document: HTMLGenerator(
+                engine, output_dir / "html").generate_html(document, self.brand_profile)
+
+        optional = {
+            'pdf': ('..generators.pdf_generator', 'PDFGenerator', 'generate_pdf', "pdf"),
+            'pptx': ('..generators.pptx_generator', 'PowerPointGenerator', 'generate_presentation', "presentations"),
+            'docx': ('..generators.docx_generator', 'WordGenerator', 'generate_document', "documents")
+        }
+        for format_type, (module_name, class_name, method_name, subdir) in optional.items():
+            if format_type not in self.config.formats:
+                continue
+            try:
+                module = importlib.import_module(module_name, __package__)
+            except (ImportError, OSError) as e:
+                self.logger.warning(f"Skipping {format_type} benchmarks: {e}")
+                continue
+
+            generator_class = getattr(module, class_name)
+            generators[format_type] = (
+                lambda engine, document, generator_class=generator_class, method_name=method_name, subdir=subdir:
+                getattr(generator_class(engine, output_dir / subdir), method_name)(document, self.brand_profile)
+            )
+
+        return generators
+
+    def _run_case(self, case: str, file_path: Path, format_type: str,
+                  generate: Callable[[TemplateEngine, ParsedDocument], str]) -> CaseResult:
+        """Run one case several times and keep the median of each phase"""
+
+        runs = []
+        output_bytes = 0
+        for _ in range(max(1, self.config.repeat)):
+            # A fresh engine per run so the render cache does not hide template cost
+            engine = TemplateEngine(self.templates_dir)
+            timer = PhaseTimer()
+
+            start = time.perf_counter()
+            with timer.activate(), redirect_stdout(io.StringIO()):
+                document = MarkdownParser().parse_file(file_path)
+                output_path = generate(engine, document)
+            total = time.perf_counter() - start
+
+            runs.append((total, timer.phases))
+            output_bytes = Path(output_path).stat().st_size
+
+        phase_names = sorted({name for _, phases in runs for name in phases})
+        return CaseResult(
+            case=case,
+            format=format_type,
+            phases={name: statistics.median(phases.get(name, 0.0) for _, phases in runs) for name in phase_names},
+            total=statistics.median(total for total, _ in runs),
+            output_bytes=output_bytes,
+            peak_memory_kb=self._measure_peak_memory_kb(file_path, generate)
+        )
+
+    def _measure_peak_memory_kb(self, file_path: Path,
+                                generate: Callable[[TemplateEngine, ParsedDocument], str]) -> int:
+        """Peak memory allocated while running one case, in kilobytes.
+
+        Process RSS only ever grows to the largest case so far, so allocations are traced instead, in a
+        separate run because tracing slows the timed runs down.
+        """
+
+        already_tracing = tracemalloc.is_tracing()
+        if already_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+
+        try:
+            engine = TemplateEngine(self.templates_dir)
+            baseline_bytes, _ = tracemalloc.get_traced_memory()
+            with redirect_stdout(io.StringIO()):
+                document = MarkdownParser().parse_file(file_path)
+                generate(engine, document)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+
+        return max(0, peak_bytes - baseline_bytes) // 1024
+
+    def compare(self, results: Dict[str, Any], baseline: Dict[str, Any]) -> List[Regression]:
+        """Timings, memory peaks and output sizes that grew past the baseline by more than the threshold"""
+
+        if baseline.get("version") != results.get("version"):
+            self.logger.warning(f"Baseline version {baseline.get('version')} does not match {results.get('version')}")
+            return []
+
+        # Growth below the minimum for its unit is noise
+        min_growth = {
+            "seconds": self.config.min_regression_seconds,
+            "kb": self.config.min_regression_kb,
+            "bytes": self.config.min_regression_bytes
+        }
+
+        regressions = []
+        for key, current in results["cases"].items():
+            previous = baseline.get("cases", {}).get(key)
+            if previous is None:
+                continue
+
+            metrics = [
+                ("total", "seconds", previous["total"], current["total"]),
+                ("peak_memory_kb", "kb", previous["peak_memory_kb"], current["peak_memory_kb"]),
+                ("output_bytes", "bytes", previous["output_bytes"], current["output_bytes"])
+            ]
+            metrics.extend(
+                (name, "seconds", previous["phases"][name], current["phases"].get(name, 0.0))
+                for name in previous["phases"]
+            )
+            for metric, unit, before, after in metrics:
+                if after - before > min_growth[unit] and after > before * (1 + self.config.threshold):
+                    regressions.append(Regression(key, metric, before, after, unit))
+
+        return regressions
+
+    def save_results(self, results: Dict[str, Any], output_path: Path):
+        """Write results as JSON, for use as the next baseline"""
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    def load_baseline(self, baseline_path: Path) -> Optional[Dict[str, Any]]:
+        """Load a saved baseline, or None if there is none"""
+
+        if not baseline_path.exists():
+            return None
+
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
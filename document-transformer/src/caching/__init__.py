@@ -0,0 +1,9 @@
+"""
+Caching module for document transformation
+"""
+
+from .lru_store import DiskLRUStore
+
+__all__ = [
+    'DiskLRUStore'
+]
@@ -0,0 +1,185 @@
+"""
+On-disk LRU store shared by the parse, chart and image caches
+Keeps one file per entry, bounded by total size, with hit/miss counters that can be merged across processes
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+class DiskLRUStore:
+    """On-disk LRU store of byte values, bounded by total size.
+
+    Subclasses store other value types by overriding _serialize and _deserialize.
+    """
+
+    def __init__(self, cache_dir: Path, max_size_mb: float = 128, suffix: str = ""):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.suffix = suffix  # file name suffix added to every key
+
+        self._lock = threading.Lock()
+        self._entries = self._load_index()  # key -> size in bytes, oldest first
+        self._total_size = sum(self._entries.values())
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _serialize(self, value: Any) -> bytes:
+        return value
+
+    def _deserialize(self, payload: bytes) -> Any:
+        return payload
+
+    def path_for(self, key: str) -> Path:
+        """File that holds the entry for a key"""
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """Build the LRU index from the files already on disk"""
+
+        entries = []
+        for file_path in self.cache_dir.iterdir():
+            name = file_path.name
+            if name.endswith(".tmp") or not name.endswith(self.suffix):
+                continue
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            key = name[:len(name) - len(self.suffix)]
+            entries.append((stat.st_mtime, key, stat.st_size))
+
+        entries.sort()
+        return OrderedDict((key, size) for _, key, size in entries)
+
+    def __contains__(self, key: str) -> bool:
+        """Check for an entry without counting a lookup"""
+
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None on a miss"""
+
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+
+        # Files are replaced atomically, so reading and decoding need not hold the lock
+        file_path = self.path_for(key)
+        try:
+            value = self._deserialize(file_path.read_bytes())
+        except (OSError, ValueError, TypeError, KeyError):
+            # Unreadable or stale entry, drop it and treat as a miss
+            with self._lock:
+                self._remove_entry(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            # Mark as most recently used
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+
+        try:
+            os.utime(file_path)
+        except OSError:
+            pass
+
+        return value
+
+    def put(self, key: str, value: Any):
+        """Store a value and evict old entries if over budget"""
+
+        payload = self._serialize(value)
+        if len(payload) > self.max_size_bytes:
+            return
+
+        file_path = self.path_for(key)
+        temp_path = self.cache_dir / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(temp_path, file_path)
+
+        with self._lock:
+            if key in self._entries:
+                self._total_size -= self._entries[key]
+            self._entries[key] = len(payload)
+            self._entries.move_to_end(key)
+            self._total_size += len(payload)
+            self.writes += 1
+
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until under the size budget"""
+
+        while self._total_size > self.max_size_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._remove_entry(oldest_key)
+            self.evictions += 1
+
+    def _remove_entry(self, key: str):
+        """Remove an entry from the index and from disk"""
+
+        size = self._entries.pop(key, 0)
+        self._total_size -= size
+        try:
+            self.path_for(key).unlink()
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove all cached entries"""
+
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_entry(key)
+
+    def reload_index(self):
+        """Re-read the index from disk after other processes wrote to the cache"""
+
+        with self._lock:
+            self._entries = self._load_index()
+            self._total_size = sum(self._entries.values())
+
+    def get_counters(self) -> Dict[str, int]:
+        """Get the raw activity counters"""
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions
+        }
+
+    def merge_counters(self, counters: Dict[str, int]):
+        """Add activity counters reported by another process"""
+
+        with self._lock:
+            self.hits += counters.get("hits", 0)
+            self.misses += counters.get("misses", 0)
+            self.writes += counters.get("writes", 0)
+            self.evictions += counters.get("evictions", 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and size information"""
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) * 100 if lookups else 0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size_bytes": self._total_size
+        }
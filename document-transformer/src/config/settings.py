@@ -6,6 +6,8 @@ import os
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from ..parser.keyword_scanner import KeywordScanner
+
 class Config:
     """Main configuration class for the document transformer"""
 
@@ -17,6 +19,11 @@ class Config:
         self.outputs_dir = self.base_dir / "outputs"
         self.brand_profiles_dir = self.base_dir / "brand-profiles"
         self.companies_dir = self.base_dir.parent / "companies"
+        self.cache_dir = self.base_dir / "cache"
+        self.parse_cache_dir = self.cache_dir / "parse"
+        self.template_cache_dir = self.cache_dir / "templates"
+        self.chart_cache_dir = self.cache_dir / "charts"
+        self.image_cache_dir = self.cache_dir / "images"
 
         # Output directories
         self.html_output = self.outputs_dir / "html"
@@ -153,22 +160,45 @@ class Config:
         """Get industry-specific theme configuration"""
         return self.INDUSTRY_THEMES.get(industry.lower(), self.INDUSTRY_THEMES['saas'])
 
-    def get_document_type(self, keywords: List[str], content: str, has_tables: bool = False) -> str:
-        """Determine document type based on keywords and content analysis"""
+    def get_document_type_keywords(self) -> List[str]:
+        """All keywords and section names used by document type detection"""
+        keywords = []
+        for config in self.DOCUMENT_TYPES.values():
+            keywords.extend(config['keywords'])
+            keywords.extend(config.get('sections', []))
+        return list(dict.fromkeys(keywords))
+
+    @property
+    def document_type_scanner(self) -> KeywordScanner:
+        """Keyword scanner over the document type vocabulary, rebuilt whenever the vocabulary changes"""
+        keywords = self.get_document_type_keywords()
+        if getattr(self, '_document_type_scanner_keywords', None) != keywords:
+            self._document_type_scanner = KeywordScanner(keywords)
+            self._document_type_scanner_keywords = keywords
+        return self._document_type_scanner
+
+    def get_document_type(self, keywords: List[str], content: str, has_tables: bool = False,
+                          keyword_counts: Optional[Dict[str, int]] = None) -> str:
+        """Determine document type based on keywords and content analysis.
+
+        keyword_counts may carry counts already taken over the lowercased content by a scanner
+        that includes get_document_type_keywords(); otherwise the content is scanned here once.
+        """
         scores = {}
+        if keyword_counts is None:
+            keyword_counts = self.document_type_scanner.count(content.lower())
 
         for doc_type, config in self.DOCUMENT_TYPES.items():
             score = 0
-            content_lower = content.lower()
 
             # Check keyword matches
             for keyword in keywords:
-                if keyword in content_lower:
+                if keyword in keyword_counts:
                     score += config['keywords'].count(keyword) * 2
 
             # Check section matches
             for section in config.get('sections', []):
-                if section in content_lower:
+                if section in keyword_counts:
                     score += 1
 
             # Check for tables if relevant
@@ -0,0 +1,43 @@
+"""
+Cache for rendered chart images
+Stores chart bytes on disk keyed by table data, chart configuration and brand styling
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import List, Any
+from dataclasses import asdict
+
+from ..branding import BrandProfile
+from ..caching import DiskLRUStore
+
+# Bump whenever chart rendering changes so cached charts are invalidated
+CHART_VERSION = "1.1.0"
+
+class ChartCache(DiskLRUStore):
+    """On-disk LRU cache of rendered charts, bounded by total size"""
+
+    def __init__(self, cache_dir: Path, max_size_mb: int = 128):
+        super().__init__(cache_dir, max_size_mb)
+
+    def make_key(self, table_data: List[List[str]], config: Any, brand_profile: BrandProfile,
+                 image_format: str = "png") -> str:
+        """Build a cache key from the table, chart configuration and brand colors and fonts"""
+
+        colors = brand_profile.color_palette
+        key_data = {
+            "table": table_data,
+            "config": asdict(config),
+            "brand": {
+                "primary": colors.primary,
+                "secondary": colors.secondary,
+                "accent": colors.accent,
+                "font": brand_profile.typography.body_font
+            },
+            "format": image_format,
+            "version": CHART_VERSION
+        }
+
+        serialized = json.dumps(key_data, sort_keys=True, default=str)
+        return f"{hashlib.sha256(serialized.encode('utf-8')).hexdigest()}.{image_format}"
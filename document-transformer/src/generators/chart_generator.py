@@ -5,14 +5,19 @@ Creates professional charts and graphs for financial data and business metrics
 
 import io
 import base64
+import threading
 from pathlib import Path
 from typing import List, Dict, Optional, Any, Tuple
 from dataclasses import dataclass
 import logging
 
 try:
-    import matplotlib.pyplot as plt
+    import matplotlib
+    import matplotlib.style
+    import matplotlib.text
     import matplotlib.patches as mpatches
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
     import numpy as np
     MATPLOTLIB_AVAILABLE = True
 except ImportError:
@@ -21,6 +26,7 @@ except ImportError:
 
 from ..parser import FinancialData
 from ..branding import BrandProfile, ColorPalette
+from .chart_cache import ChartCache
 
 @dataclass
 class ChartConfig:
@@ -35,12 +41,68 @@ class ChartConfig:
     title: Optional[str] = None
     x_label: Optional[str] = None
     y_label: Optional[str] = None
+    image_format: str = "png"  # png, svg
+
+# Chart defaults shared by every brand, applied to matplotlib's rcParams once per process; the brand
+# font is set on each chart's text instead, so concurrent renders never change rcParams under each other
+_CHART_RC = {
+    'font.size': 10,
+    'axes.titlesize': 14,
+    'axes.labelsize': 12,
+    'legend.fontsize': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    # Keep SVG text as text so it uses the page fonts, and make SVG output repeatable
+    'svg.fonttype': 'none',
+    'svg.hashsalt': 'document-transformer'
+}
+_chart_rc_applied = False
+
+# Guards the figure pool and the one-time rcParams setup; drawing happens outside it
+_pool_lock = threading.Lock()
+
+# Cleared figures kept for reuse, keyed by (width, height, dpi)
+_figure_pool: Dict[Tuple[float, float, int], List["Figure"]] = {}
+_FIGURE_POOL_SIZE = 2
+
+def _apply_chart_rc():
+    """Apply the shared chart defaults to rcParams the first time a generator is set up"""
+
+    global _chart_rc_applied
+
+    with _pool_lock:
+        if not _chart_rc_applied:
+            matplotlib.style.use('default')
+            matplotlib.rcParams.update(_CHART_RC)
+            _chart_rc_applied = True
+
+def _acquire_figure(width: float, height: float, dpi: int) -> "Figure":
+    """Take a figure of the given size from the pool, or create one on its own Agg canvas"""
+
+    with _pool_lock:
+        pool = _figure_pool.get((width, height, dpi))
+        if pool:
+            return pool.pop()
+
+    fig = Figure(figsize=(width, height), dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _release_figure(fig: "Figure", width: float, height: float, dpi: int):
+    """Clear a figure and return it to the pool"""
+
+    fig.clear()
+    with _pool_lock:
+        pool = _figure_pool.setdefault((width, height, dpi), [])
+        if len(pool) < _FIGURE_POOL_SIZE:
+            pool.append(fig)
 
 class ChartGenerator:
     """Generates professional charts for financial data and business metrics"""
 
-    def __init__(self, brand_profile: BrandProfile):
+    def __init__(self, brand_profile: BrandProfile, chart_cache: Optional[ChartCache] = None):
         self.brand_profile = brand_profile
+        self.chart_cache = chart_cache
         self.logger = logging.getLogger(__name__)
 
         # Setup matplotlib style if available
@@ -48,7 +110,7 @@ class ChartGenerator:
             self._setup_matplotlib_style()
 
     def _setup_matplotlib_style(self):
-        """Setup matplotlib with brand-specific styling"""
+        """Setup brand colors and font; shared chart defaults go into rcParams once per process"""
 
         # Brand colors
         colors = self.brand_profile.color_palette
@@ -56,20 +118,16 @@ class ChartGenerator:
         self.secondary_colors = colors.secondary or ['#424242', '#616161', '#757575']
         self.accent_color = colors.accent or '#2196F3'
 
-        # Set style
-        plt.style.use('default')
+        # Brand font, set per chart; font sizes and grid come from the shared chart defaults
+        self.font_family = self.brand_profile.typography.body_font or 'Inter'
+        _apply_chart_rc()
 
-        # Configure font
-        font_family = self.brand_profile.typography.body_font or 'Inter'
-        plt.rcParams['font.family'] = font_family
-        plt.rcParams['font.size'] = 10
-        plt.rcParams['axes.titlesize'] = 14
-        plt.rcParams['axes.labelsize'] = 12
-        plt.rcParams['legend.fontsize'] = 10
+    def _apply_font_family(self, fig, ax):
+        """Set the brand font on every text in the chart, including tick labels created while drawing"""
 
-        # Configure grid
-        plt.rcParams['axes.grid'] = True
-        plt.rcParams['grid.alpha'] = 0.3
+        ax.tick_params(labelfontfamily=self.font_family)
+        for text in fig.findobj(matplotlib.text.Text):
+            text.set_fontfamily(self.font_family)
 
     def generate_financial_chart(self, financial_data: FinancialData,
                                 config: Optional[ChartConfig] = None) -> str:
@@ -81,16 +139,41 @@ class ChartGenerator:
         if config is None:
             config = ChartConfig()
 
+        # Reuse a chart already rendered for the same table, configuration and brand
+        cache_key = None
+        if self.chart_cache:
+            cache_key = self.chart_cache.make_key(financial_data.table_data, config, self.brand_profile,
+                                                  config.image_format)
+            cached_image = self.chart_cache.get(cache_key)
+            if cached_image is not None:
+                return base64.b64encode(cached_image).decode()
+
         try:
             # Parse financial data
-            parsed_data = self._parse_financial_table(financial_data.table_data)
+            parsed_data = self._parse_financial_table(financial_data)
 
             if not parsed_data:
                 return self._generate_fallback_chart(financial_data, config)
 
-            # Create figure
-            fig, ax = plt.subplots(figsize=(config.width/100, config.height/100),
-                               dpi=config.dpi)
+            image_bytes = self._render_chart(parsed_data, config)
+
+            if cache_key:
+                self.chart_cache.put(cache_key, image_bytes)
+
+            return base64.b64encode(image_bytes).decode()
+
+        except Exception as e:
+            self.logger.error(f"Error generating chart: {e}")
+            return self._generate_fallback_chart(financial_data, config)
+
+    def _render_chart(self, parsed_data: Dict[str, Any], config: ChartConfig) -> bytes:
+        """Draw a chart on a pooled figure and return the image bytes"""
+
+        figure_size = (config.width/100, config.height/100, config.dpi)
+
+        fig = _acquire_figure(*figure_size)
+        try:
+            ax = fig.add_subplot()
 
             # Generate chart based on data type
             if self._is_revenue_data(parsed_data):
@@ -104,79 +187,30 @@ class ChartGenerator:
 
             # Apply styling
             self._apply_chart_styling(ax, config)
+            self._apply_font_family(fig, ax)
 
-            # Convert to base64 string
-            image_base64 = self._fig_to_base64(fig)
-            plt.close(fig)
+            # Convert to image bytes
+            return self._fig_to_image(fig, config.image_format)
+        finally:
+            _release_figure(fig, *figure_size)
 
-            return image_base64
-
-        except Exception as e:
-            self.logger.error(f"Error generating chart: {e}")
-            return self._generate_fallback_chart(financial_data, config)
-
-    def _parse_financial_table(self, table_data: List[List[str]]) -> Dict[str, Any]:
+    def _parse_financial_table(self, financial_data: FinancialData) -> Dict[str, Any]:
         """Parse financial table data into structured format"""
 
+        table_data = financial_data.table_data
         if not table_data or len(table_data) < 2:
             return {}
 
-        headers = table_data[0]
-        rows = table_data[1:]
-
-        # Try to identify column types
-        parsed = {
-            'headers': headers,
-            'rows': rows,
-            'data_columns': [],
-            'label_column': None
+        # Column types come from the table's cached columnar view
+        columns = financial_data.columns
+        return {
+            'headers': columns.headers,
+            'rows': columns.rows,
+            'columns': columns,
+            'data_columns': columns.data_columns,
+            'label_column': columns.label_column
         }
 
-        # Find label column (usually first column with text)
-        for i, header in enumerate(headers):
-            if self._is_text_column(rows, i):
-                parsed['label_column'] = i
-                break
-
-        # Find data columns (numeric columns)
-        for i, header in enumerate(headers):
-            if i != parsed['label_column'] and self._is_numeric_column(rows, i):
-                parsed['data_columns'].append(i)
-
-        return parsed
-
-    def _is_text_column(self, rows: List[List[str]], col_index: int) -> bool:
-        """Check if column contains text data"""
-        if col_index >= len(rows[0]):
-            return False
-
-        non_numeric_count = 0
-        for row in rows[:5]:  # Check first 5 rows
-            if col_index < len(row):
-                try:
-                    float(row[col_index].replace(',', '').replace('$', ''))
-                except:
-                    non_numeric_count += 1
-
-        return non_numeric_count > len(rows[:5]) * 0.7
-
-    def _is_numeric_column(self, rows: List[List[str]], col_index: int) -> bool:
-        """Check if column contains numeric data"""
-        if col_index >= len(rows[0]):
-            return False
-
-        numeric_count = 0
-        for row in rows[:5]:  # Check first 5 rows
-            if col_index < len(row):
-                try:
-                    value = row[col_index].replace(',', '').replace('$', '').replace('%', '')
-                    float(value)
-                    numeric_count += 1
-                except:
-                    continue
-
-        return numeric_count > len(rows[:5]) * 0.5
-
     def _is_revenue_data(self, parsed_data: Dict) -> bool:
         """Check if data represents revenue/financial metrics"""
         headers = [h.lower() for h in parsed_data.get('headers', [])]
@@ -193,21 +227,18 @@ class ChartGenerator:
         """Check if data represents comparison between items"""
         return len(parsed_data.get('data_columns', [])) >= 2
 
+    def _labeled_values(self, parsed_data: Dict) -> Tuple[List[str], List[float]]:
+        """Labels and values of the first data column, for rows where that column is numeric"""
+
+        if not parsed_data['data_columns']:
+            return [], []
+
+        return parsed_data['columns'].series(parsed_data['data_columns'][0])
+
     def _create_revenue_chart(self, ax, parsed_data: Dict, config: ChartConfig):
         """Create revenue/financial chart"""
 
-        labels = []
-        values = []
-
-        for row in parsed_data['rows']:
-            if parsed_data['label_column'] is not None and len(parsed_data['data_columns']) > 0:
-                label = row[parsed_data['label_column']]
-                try:
-                    value = float(row[parsed_data['data_columns'][0]].replace(',', '').replace('$', ''))
-                    labels.append(label)
-                    values.append(value)
-                except:
-                    continue
+        labels, values = self._labeled_values(parsed_data)
 
         if labels and values:
             bars = ax.bar(labels, values, color=self.primary_colors[0], alpha=0.8)
@@ -221,18 +252,7 @@ class ChartGenerator:
     def _create_growth_chart(self, ax, parsed_data: Dict, config: ChartConfig):
         """Create growth chart (line chart)"""
 
-        labels = []
-        values = []
-
-        for row in parsed_data['rows']:
-            if parsed_data['label_column'] is not None and len(parsed_data['data_columns']) > 0:
-                label = row[parsed_data['label_column']]
-                try:
-                    value = float(row[parsed_data['data_columns'][0]].replace('%', ''))
-                    labels.append(label)
-                    values.append(value)
-                except:
-                    continue
+        labels, values = self._labeled_values(parsed_data)
 
         if labels and values:
             line = ax.plot(labels, values, color=self.primary_colors[0],
@@ -249,17 +269,13 @@ class ChartGenerator:
         labels = []
         data_series = [[] for _ in parsed_data['data_columns']]
 
-        for row in parsed_data['rows']:
-            if parsed_data['label_column'] is not None:
-                label = row[parsed_data['label_column']]
-                labels.append(label)
+        if parsed_data['label_column'] is not None:
+            table = parsed_data['columns'].table
+            labels = [row[parsed_data['label_column']] for row in parsed_data['rows']]
 
-                for i, col_idx in enumerate(parsed_data['data_columns']):
-                    try:
-                        value = float(row[col_idx].replace(',', '').replace('$', '').replace('%', ''))
-                        data_series[i].append(value)
-                    except:
-                        data_series[i].append(0)
+            # Cells that are not numbers plot as zero
+            values = np.where(table.valid, table.values, 0.0)
+            data_series = [values[:, col_idx] for col_idx in parsed_data['data_columns']]
 
         # Create grouped bar chart
         x = np.arange(len(labels))
@@ -304,18 +320,40 @@ class ChartGenerator:
         if config.show_legend and ax.get_legend():
             ax.legend(frameon=False, bbox_to_anchor=(1.05, 1), loc='upper left')
 
-    def _fig_to_base64(self, fig) -> str:
-        """Convert matplotlib figure to base64 string"""
+    def _fig_to_image(self, fig, image_format: str) -> bytes:
+        """Convert matplotlib figure to image bytes in the requested format"""
+
+        if image_format == "svg":
+            return self._fig_to_svg(fig)
+        return self._fig_to_png(fig)
+
+    def _fig_to_svg(self, fig) -> bytes:
+        """Convert matplotlib figure to SVG bytes"""
+
+        buffer = io.BytesIO()
+
+        # Text stays text and ids are repeatable through the shared chart rcParams
+        fig.savefig(buffer, format='svg', bbox_inches='tight',
+                   facecolor='white', edgecolor='none', metadata={'Date': None})
+        image_bytes = buffer.getvalue()
+        buffer.close()
+
+        return image_bytes
+
+    def _fig_to_png(self, fig) -> bytes:
+        """Convert matplotlib figure to PNG bytes"""
 
         buffer = io.BytesIO()
         fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight',
                    facecolor='white', edgecolor='none')
-        buffer.seek(0)
-
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
+        image_bytes = buffer.getvalue()
         buffer.close()
 
-        return image_base64
+        return image_bytes
+
+    def _fig_to_base64(self, fig) -> str:
+        """Convert matplotlib figure to base64 string"""
+        return base64.b64encode(self._fig_to_png(fig)).decode()
 
     def _generate_fallback_chart(self, financial_data: FinancialData,
                                 config: Optional[ChartConfig] = None) -> str:
@@ -326,21 +364,20 @@ class ChartGenerator:
 
         if financial_data.table_data and len(financial_data.table_data) > 1:
             # Create simple ASCII chart
-            rows = financial_data.table_data[1:6]  # Show first 5 data rows
+            table = financial_data.columns.table
 
-            for row in rows:
+            for i, row in enumerate(table.rows[:5]):  # Show first 5 data rows
                 if len(row) > 1:
                     label = row[0]
-                    try:
-                        # Try to extract numeric value from second column
-                        value_str = row[1].replace(',', '').replace('$', '').replace('%', '')
-                        value = float(value_str)
+                    if table.valid[i, 1]:
+                        # Numeric value from second column
+                        value = float(table.values[i, 1])
 
                         # Create simple bar visualization
                         bar_length = min(50, int(value / 1000000))  # Scale to millions
                         bar = '█' * bar_length
                         chart_text += f"{label:20} {bar} ${value:,.0f}\n"
-                    except:
+                    else:
                         chart_text += f"{label:20} {row[1]}\n"
 
         # Convert to base64 for consistency
@@ -378,28 +415,31 @@ class ChartGenerator:
         if not MATPLOTLIB_AVAILABLE or not values:
             return ""
 
-        try:
-            fig, ax = plt.subplots(figsize=(width/100, height/100), dpi=150)
+        figure_size = (width/100, height/100, 150)
 
-            # Remove all axes for clean sparkline
-            ax.set_xticks([])
-            ax.set_yticks([])
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['bottom'].set_visible(False)
-            ax.spines['left'].set_visible(False)
+        try:
+            fig = _acquire_figure(*figure_size)
+            try:
+                ax = fig.add_subplot()
 
-            # Plot sparkline
-            ax.plot(values, color=self.accent_color, linewidth=2)
+                # Remove all axes for clean sparkline
+                ax.set_xticks([])
+                ax.set_yticks([])
+                ax.spines['top'].set_visible(False)
+                ax.spines['right'].set_visible(False)
+                ax.spines['bottom'].set_visible(False)
+                ax.spines['left'].set_visible(False)
 
-            # Add dot at end
-            ax.plot(len(values)-1, values[-1], 'o', color=self.accent_color, markersize=4)
+                # Plot sparkline
+                ax.plot(values, color=self.accent_color, linewidth=2)
 
-            # Convert to base64
-            image_base64 = self._fig_to_base64(fig)
-            plt.close(fig)
+                # Add dot at end
+                ax.plot(len(values)-1, values[-1], 'o', color=self.accent_color, markersize=4)
 
-            return image_base64
+                # Convert to base64
+                return self._fig_to_base64(fig)
+            finally:
+                _release_figure(fig, *figure_size)
 
         except Exception as e:
             self.logger.error(f"Error creating sparkline: {e}")
@@ -414,23 +454,19 @@ class ChartGenerator:
             return stats
 
         # Extract numeric values
-        values = []
-        for row in financial_data.table_data[1:]:
-            if len(row) > 1:
-                try:
-                    value = float(row[1].replace(',', '').replace('$', '').replace('%', ''))
-                    values.append(value)
-                except:
-                    continue
-
-        if values:
-            stats['min'] = min(values)
-            stats['max'] = max(values)
-            stats['avg'] = sum(values) / len(values)
-            stats['total'] = sum(values)
+        columns = financial_data.columns
+        if columns.table.shape[1] < 2:
+            return stats
+        values = columns.column_values(1)
+
+        if values.size:
+            stats['min'] = float(values.min())
+            stats['max'] = float(values.max())
+            stats['avg'] = float(values.mean())
+            stats['total'] = float(values.sum())
 
             # Calculate growth if multiple values
             if len(values) > 1:
-                stats['growth'] = ((values[-1] - values[0]) / values[0]) * 100 if values[0] != 0 else 0
+                stats['growth'] = float((values[-1] - values[0]) / values[0]) * 100 if values[0] != 0 else 0
 
         return stats
\ No newline at end of file
@@ -17,6 +17,7 @@ from docx.enum.style import WD_STYLE_TYPE
 
 from ..parser import ParsedDocument, ContentSection, FinancialData, TeamMember
 from ..branding import BrandProfile, ColorPalette, Typography
+from ..profiling import phase
 
 @dataclass
 class DocumentOptions:
@@ -54,21 +55,23 @@ class WordGenerator:
         if output_filename is None:
             output_filename = self._generate_filename(document)
 
-        # Create document
-        doc = Document()
+        with phase("layout"):
+            # Create document
+            doc = Document()
 
-        # Set document properties
-        self._set_document_properties(doc, document, brand_profile)
+            # Set document properties
+            self._set_document_properties(doc, document, brand_profile)
 
-        # Apply styling
-        self._apply_document_styling(doc, brand_profile, doc_options)
+            # Apply styling
+            self._apply_document_styling(doc, brand_profile, doc_options)
 
-        # Add content
-        self._add_document_content(doc, document, brand_profile, doc_options)
+            # Add content
+            self._add_document_content(doc, document, brand_profile, doc_options)
 
         # Save document
         output_path = self.output_dir / output_filename
-        doc.save(str(output_path))
+        with phase("write"):
+            doc.save(str(output_path))
 
         print(f"✅ Generated Word document: {output_path}")
         return str(output_path)
@@ -292,20 +295,26 @@ class WordGenerator:
                 table_title.style = 'Heading 3'
 
             if financial.table_data and len(financial.table_data) > 0:
+                columns = financial.columns
+
                 # Create table
-                table = doc.add_table(rows=len(financial.table_data), cols=len(financial.table_data[0]))
+                table = doc.add_table(rows=len(columns.rows) + 1, cols=len(columns.headers))
                 table.style = 'Medium Grid 1 Accent 1'
 
-                # Add data to table
-                for row_idx, row_data in enumerate(financial.table_data):
-                    for col_idx, cell_data in enumerate(row_data):
-                        if col_idx < len(financial.table_data[0]):  # Ensure we don't exceed column count
-                            cell = table.cell(row_idx, col_idx)
-                            cell.text = str(cell_data)
+                # Add header row
+                for col_idx, header in enumerate(columns.headers):
+                    cell = table.cell(0, col_idx)
+                    cell.text = str(header)
+                    cell.paragraphs[0].style = 'TableHeader'
+
+                # Add data rows, right-aligning numbers
+                for row_idx, row_data in enumerate(columns.rows):
+                    for col_idx, cell_data in enumerate(row_data[:len(columns.headers)]):  # Don't exceed column count
+                        cell = table.cell(row_idx + 1, col_idx)
+                        cell.text = str(cell_data)
 
-                            # Style header row
-                            if row_idx == 0:
-                                cell.paragraphs[0].style = 'TableHeader'
+                        if columns.table.valid[row_idx, col_idx]:
+                            cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
 
                 # Add some spacing after table
                 doc.add_paragraph()
@@ -5,27 +5,42 @@ Converts parsed documents to responsive HTML with CSS styling
 
 import re
 import base64
+import itertools
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, Tuple, Iterable, Iterator
 from dataclasses import asdict
 import mimetypes
 
 from ..parser import ParsedDocument, ContentSection, FinancialData, TeamMember
 from ..branding import BrandProfile, ColorPalette, Typography
 from ..templates import TemplateEngine, TemplateConfig
-from .chart_generator import ChartGenerator
+from .chart_generator import ChartGenerator, ChartConfig
+from .chart_cache import ChartCache
+from .html_rewriter import HTMLRewriter
+from .image_optimizer import ImageOptimizer
+from ..profiling import phase
+
+# Widest image to keep for HTML output: twice the content column, for high-density screens
+HTML_IMAGE_MAX_WIDTH = 1600
 
 class HTMLGenerator:
     """Generates responsive HTML documents from parsed markdown"""
 
-    def __init__(self, template_engine: TemplateEngine, output_dir: Path):
+    def __init__(self, template_engine: TemplateEngine, output_dir: Path,
+                 chart_cache: Optional[ChartCache] = None, chart_format: str = "svg",
+                 image_optimizer: Optional[ImageOptimizer] = None):
         self.template_engine = template_engine
         self.output_dir = output_dir
+        self.chart_cache = chart_cache
+        self.chart_format = chart_format  # png, svg
+        self.image_optimizer = image_optimizer
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def generate_html(self, document: ParsedDocument, brand_profile: BrandProfile,
                      template_config: Optional[TemplateConfig] = None,
-                     output_filename: Optional[str] = None) -> str:
+                     output_filename: Optional[str] = None,
+                     rendered_html: Optional[str] = None,
+                     stream: bool = False) -> str:
         """Generate HTML document"""
 
         # Select template if not provided
@@ -36,22 +51,19 @@ class HTMLGenerator:
         if output_filename is None:
             output_filename = self._generate_filename(document)
 
-        # Render document
-        html_content = self._render_document(document, brand_profile, template_config)
-
-        # Process embedded content
-        html_content = self._process_embedded_content(html_content, document, brand_profile)
-
-        # Add responsive enhancements
-        html_content = self._add_responsive_enhancements(html_content)
-
-        # Add SEO and metadata
-        html_content = self._add_seo_metadata(html_content, document, brand_profile)
+        # Render in chunks when streaming, otherwise as one string
+        if rendered_html is not None:
+            chunks = [rendered_html]
+        elif stream:
+            chunks = self.template_engine.generate_document(document, brand_profile, template_config)
+        else:
+            chunks = [self._render_document(document, brand_profile, template_config)]
 
-        # Write HTML file
+        # Write HTML file, post-processing it on the way out
         output_path = self.output_dir / output_filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        with phase("post_process"), open(output_path, 'w', encoding='utf-8') as f:
+            for chunk in self._post_process(chunks, document, brand_profile):
+                f.write(chunk)
 
         return str(output_path)
 
@@ -61,107 +73,182 @@ class HTMLGenerator:
 
         return self.template_engine.render_document(document, brand_profile, template_config)
 
-    def _process_embedded_content(self, html_content: str, document: ParsedDocument,
-                                brand_profile: BrandProfile) -> str:
-        """Process embedded images, links, and other content"""
+    def _post_process(self, chunks: Iterable[str], document: ParsedDocument,
+                      brand_profile: BrandProfile) -> Iterator[str]:
+        """Apply images, links, charts, team, CSS, responsive and SEO rewrites as the chunks stream past"""
 
-        # Process images
-        html_content = self._process_images(html_content, document)
+        # Images, links, financial charts and team sections
+        content_rewriter = HTMLRewriter()
+        for old, new in self._get_content_replacements(document, brand_profile):
+            content_rewriter.add_replacement(old, new)
+        chunks = content_rewriter.rewrite_stream(chunks)
 
-        # Process links
-        html_content = self._process_links(html_content, document)
+        # Head rewrites depend on what the rewritten document contains, so buffer up to </head>
+        buffered = ''
+        for chunk in chunks:
+            search_start = max(0, len(buffered) - len('</head>'))
+            buffered += chunk
+            if buffered.find('</head>', search_start) != -1:
+                break
 
-        # Process financial data visualization
-        html_content = self._process_financial_data(html_content, document, brand_profile)
+        # Without a style tag or viewport meta in the head, the rest of the document decides
+        if not ('<style>' in buffered and '</style>' in buffered and '<meta name="viewport"' in buffered):
+            buffered += ''.join(chunks)
 
-        # Process team member sections
-        html_content = self._process_team_sections(html_content, document)
+        head_rewriter, prefix = self._build_head_rewriter(buffered, document, brand_profile)
+        if prefix:
+            yield prefix
+        yield from head_rewriter.rewrite_stream(itertools.chain([buffered], chunks))
 
-        # Add custom CSS from brand profile
-        html_content = self._inject_custom_css(html_content, brand_profile)
+    def _build_head_rewriter(self, html_content: str, document: ParsedDocument,
+                             brand_profile: BrandProfile) -> Tuple[HTMLRewriter, str]:
+        """Build the CSS, responsive and SEO rewrites for a document, plus any text to put before it"""
 
-        return html_content
+        rewriter = HTMLRewriter()
+
+        custom_css = self._generate_custom_css(brand_profile)
+        responsive_css = self._get_responsive_css()
+        seo_html = self._generate_seo_metadata(document, brand_profile)
 
-    def _process_images(self, html_content: str, document: ParsedDocument) -> str:
-        """Process and optimize images in the HTML"""
+        # Brand and responsive CSS go into the existing style tag, or a new one in the head
+        prefix = ''
+        if '<style>' in html_content and '</style>' in html_content:
+            rewriter.add_replacement('</style>', '</style>', first=f'{custom_css}{responsive_css}</style>')
+            rewriter.add_replacement('</head>', '</head>', first=f'{seo_html}</head>')
+        elif '</head>' in html_content:
+            rewriter.add_replacement(
+                '</head>',
+                f'<style>\n{custom_css}\n</style>\n</head>',
+                first=f'<style>\n{custom_css}\n{responsive_css}</style>\n{seo_html}</head>'
+            )
+        else:
+            # Add at the beginning
+            prefix = f'<style>\n{custom_css}\n{responsive_css}</style>\n'
+
+        # Add responsive meta tag
+        if '<meta name="viewport"' not in html_content:
+            rewriter.add_replacement(
+                '<head>',
+                '<head>\n<meta name="viewport" content="width=device-width, initial-scale=1.0">'
+            )
+
+        return rewriter, prefix
+
+    def _get_content_replacements(self, document: ParsedDocument,
+                                  brand_profile: BrandProfile) -> List[Tuple[str, str]]:
+        """Get the ordered (old, new) rewrites for images, links, charts and team sections"""
+
+        replacements = []
+        replacements.extend(self._get_image_replacements(document))
+        replacements.extend(self._get_optimized_image_replacements(document, brand_profile))
+        replacements.extend(self._get_link_replacements(document))
+        replacements.extend(self._get_financial_replacements(document, brand_profile))
+        replacements.extend(self._get_team_replacements(document))
+        return replacements
+
+    def _get_image_replacements(self, document: ParsedDocument) -> List[Tuple[str, str]]:
+        """Rewrites that style images and wrap them in figure elements"""
 
         if not document.images:
-            return html_content
+            return []
 
         # Add image styling classes
-        html_content = html_content.replace('<img', '<img class="document-image" loading="lazy"')
+        replacements = [('<img', '<img class="document-image" loading="lazy"')]
 
         # Wrap images in figure elements with captions
         for i, img_src in enumerate(document.images):
-            img_tag = f'src="{img_src}"'
-            if img_tag in html_content:
-                # Create figure with caption
-                figure_html = f'''<figure class="document-figure">
+            figure_html = f'''<figure class="document-figure">
                     <img src="{img_src}" alt="Document image {i+1}" class="document-image" loading="lazy">
                     <figcaption>Image {i+1}</figcaption>
                 </figure>'''
-                html_content = html_content.replace(f'<img {img_tag}', figure_html)
+            replacements.append((f'<img src="{img_src}"', figure_html))
 
-        return html_content
+        return replacements
 
-    def _process_links(self, html_content: str, document: ParsedDocument) -> str:
-        """Process external links with proper attributes"""
+    def _get_optimized_image_replacements(self, document: ParsedDocument,
+                                          brand_profile: BrandProfile) -> List[Tuple[str, str]]:
+        """Rewrites that point image references at optimized copies in the shared assets directory"""
 
-        if not document.links:
-            return html_content
+        if self.image_optimizer is None:
+            return []
 
-        for link in document.links:
-            # Add external link attributes
-            if link in html_content:
-                html_content = html_content.replace(
-                    f'href="{link}"',
-                    f'href="{link}" target="_blank" rel="noopener noreferrer" class="external-link"'
-                )
+        references = list(document.images)
+        if brand_profile.brand_assets.logo_path:
+            references.append(brand_profile.brand_assets.logo_path)
+        if not references:
+            return []
 
-        return html_content
+        base_dir = Path(document.metadata.source_path).parent if document.metadata.source_path else None
+        optimized = self.image_optimizer.optimize_references(references, base_dir, HTML_IMAGE_MAX_WIDTH)
 
-    def _process_financial_data(self, html_content: str, document: ParsedDocument, brand_profile: BrandProfile) -> str:
-        """Enhance financial data with charts and visualizations"""
+        # Identical images from any document share one file in outputs/html/assets
+        replacements = []
+        for reference, image in optimized.items():
+            asset_path = self.image_optimizer.publish(image, self.output_dir / "assets")
+            asset_url = f"assets/{asset_path.name}"
+            replacements.append((f'src="{reference}"', f'src="{asset_url}"'))
+            replacements.append((f']({reference})', f']({asset_url})'))
+
+        return replacements
+
+    def _get_link_replacements(self, document: ParsedDocument) -> List[Tuple[str, str]]:
+        """Rewrites that add external link attributes"""
+
+        return [
+            (f'href="{link}"', f'href="{link}" target="_blank" rel="noopener noreferrer" class="external-link"')
+            for link in document.links
+        ]
+
+    def _get_financial_replacements(self, document: ParsedDocument,
+                                    brand_profile: BrandProfile) -> List[Tuple[str, str]]:
+        """Rewrites that insert charts after financial tables and a summary dashboard"""
 
         if not document.financial_data:
-            return html_content
+            return []
 
         # Initialize chart generator
-        chart_generator = ChartGenerator(brand_profile)
+        chart_generator = ChartGenerator(brand_profile, self.chart_cache)
 
-        # Generate charts for each financial table
+        # Insert a chart after each financial table heading
+        replacements = []
         for i, financial in enumerate(document.financial_data):
             chart_html = self._generate_enhanced_chart_html(financial, chart_generator, i)
-
-            # Insert chart after financial table
             table_pattern = f'<h3>{financial.title}</h3>'
-            if table_pattern in html_content:
-                html_content = html_content.replace(
-                    table_pattern,
-                    table_pattern + chart_html
-                )
+            replacements.append((table_pattern, table_pattern + chart_html))
 
         # Add summary statistics
         summary_html = self._generate_financial_summary(document.financial_data, chart_generator)
-        html_content = html_content.replace(
+        replacements.append((
             '</div>\n</div>\n</body>',
             f'{summary_html}\n</div>\n</div>\n</body>'
-        )
+        ))
 
-        return html_content
+        return replacements
 
     def _generate_enhanced_chart_html(self, financial: FinancialData, chart_generator: ChartGenerator, index: int) -> str:
         """Generate enhanced HTML chart with visualization"""
 
         # Generate chart
-        chart_data = chart_generator.generate_financial_chart(financial)
+        with phase("charts"):
+            chart_data = chart_generator.generate_financial_chart(financial, ChartConfig(image_format=self.chart_format))
 
         # Generate statistics
         stats = chart_generator.get_chart_summary_stats(financial)
 
         # Build HTML
-        if chart_data.startswith('<div'):  # Fallback HTML
+        if chart_data.lstrip().startswith('<div'):  # Fallback HTML
             chart_html = chart_data
+        elif self.chart_format == "svg":  # Inline vector chart
+            svg_markup = base64.b64decode(chart_data).decode('utf-8')
+            svg_markup = svg_markup[svg_markup.find('<svg'):].replace(
+                '<svg ', '<svg style="width: 100%; max-width: 800px; height: auto;" ', 1
+            )
+            chart_html = f'''<div class="chart-container" id="chart-{index}">
+                <h4>{financial.title}</h4>
+                <div class="chart-image">
+                    {svg_markup}
+                </div>
+            </div>'''
         else:  # Base64 encoded image
             chart_html = f'''<div class="chart-container" id="chart-{index}">
                 <h4>{financial.title}</h4>
@@ -239,50 +326,20 @@ class HTMLGenerator:
 
         return summary_html
 
-    def _process_team_sections(self, html_content: str, document: ParsedDocument) -> str:
-        """Enhance team member sections with avatars and better layout"""
-
-        if not document.team_members:
-            return html_content
+    def _get_team_replacements(self, document: ParsedDocument) -> List[Tuple[str, str]]:
+        """Rewrites that add avatar placeholders to team member headings"""
 
-        # Add avatar placeholders for team members
+        replacements = []
         for member in document.team_members:
-            member_html = f'<h4>{member.name}</h4>'
-            if member_html in html_content:
-                enhanced_member = f'''<div class="team-avatar">
+            enhanced_member = f'''<div class="team-avatar">
                     <div class="avatar-circle">
                         {member.name[:2].upper()}
                     </div>
                 </div>
                 <h4>{member.name}</h4>'''
-                html_content = html_content.replace(member_html, enhanced_member)
-
-        return html_content
-
-    def _inject_custom_css(self, html_content: str, brand_profile: BrandProfile) -> str:
-        """Inject custom CSS based on brand profile"""
+            replacements.append((f'<h4>{member.name}</h4>', enhanced_member))
 
-        custom_css = self._generate_custom_css(brand_profile)
-
-        # Find or create style tag
-        if '<style>' in html_content and '</style>' in html_content:
-            # Append to existing style tag
-            style_start = html_content.find('<style>')
-            style_end = html_content.find('</style>') + len('</style>')
-            existing_css = html_content[style_start:style_end]
-            enhanced_css = existing_css.replace('</style>', f'{custom_css}</style>')
-            html_content = html_content[:style_start] + enhanced_css + html_content[style_end:]
-        elif '</head>' in html_content:
-            # Insert before closing head tag
-            html_content = html_content.replace(
-                '</head>',
-                f'<style>\n{custom_css}\n</style>\n</head>'
-            )
-        else:
-            # Add at the beginning
-            html_content = f'<style>\n{custom_css}\n</style>\n{html_content}'
-
-        return html_content
+        return replacements
 
     def _generate_custom_css(self, brand_profile: BrandProfile) -> str:
         """Generate custom CSS based on brand profile"""
@@ -419,10 +476,10 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 </script>'''
 
-    def _add_responsive_enhancements(self, html_content: str) -> str:
-        """Add responsive design enhancements"""
+    def _get_responsive_css(self) -> str:
+        """Responsive design enhancements"""
 
-        responsive_css = '''
+        return '''
 /* Responsive Design Enhancements */
 @media (max-width: 1200px) {
     .content-container {
@@ -534,30 +591,8 @@ document.addEventListener('DOMContentLoaded', function() {
 }
 '''
 
-        # Add responsive CSS
-        if '<style>' in html_content and '</style>' in html_content:
-            style_end = html_content.find('</style>')
-            html_content = (html_content[:style_end] +
-                          responsive_css +
-                          html_content[style_end:])
-        elif '</head>' in html_content:
-            html_content = html_content.replace(
-                '</head>',
-                f'<style>\n{responsive_css}\n</style>\n</head>'
-            )
-
-        # Add responsive meta tag
-        if '<meta name="viewport"' not in html_content:
-            html_content = html_content.replace(
-                '<head>',
-                '<head>\n<meta name="viewport" content="width=device-width, initial-scale=1.0">'
-            )
-
-        return html_content
-
-    def _add_seo_metadata(self, html_content: str, document: ParsedDocument,
-                         brand_profile: BrandProfile) -> str:
-        """Add SEO and metadata to HTML"""
+    def _generate_seo_metadata(self, document: ParsedDocument, brand_profile: BrandProfile) -> str:
+        """Generate SEO and metadata tags for the document head"""
 
         metadata = []
 
@@ -594,13 +629,7 @@ document.addEventListener('DOMContentLoaded', function() {
         metadata.append('<meta name="twitter:card" content="summary_large_image">')
         metadata.append('<meta name="twitter:title" content="' + title + '">')
 
-        # Insert meta tags
-        head_end = html_content.find('</head>')
-        if head_end != -1:
-            meta_html = '\n'.join(metadata) + '\n'
-            html_content = html_content[:head_end] + meta_html + html_content[head_end:]
-
-        return html_content
+        return '\n'.join(metadata) + '\n'
 
     def _generate_filename(self, document: ParsedDocument) -> str:
         """Generate appropriate filename for HTML output"""
@@ -0,0 +1,297 @@
+"""
+Single-pass HTML rewriter
+Applies literal find/replace rules to HTML in one traversal, for whole strings or chunk streams
+"""
+
+import re
+from typing import Dict, List, Optional, Set, Tuple, Iterable, Iterator
+
+# Rules are indexed by this many leading and trailing characters
+_GRAM = 4
+
+class HTMLRewriter:
+    """Applies ordered literal rewrites to HTML, with the same result as applying them one after another.
+
+    Rules are grouped into stages whose patterns cannot overlap each other or text inserted by earlier
+    rules in the stage. Each stage is applied in a single scan and the stages are chained.
+    """
+
+    def __init__(self):
+        self._rules: List[Tuple[str, str, Optional[str]]] = []
+        self._stages: Optional[List["_RewriteStage"]] = None
+
+    def add_replacement(self, old: str, new: str, first: Optional[str] = None):
+        """Replace every occurrence of old, using first instead for the first occurrence if given"""
+
+        if old:
+            self._rules.append((old, new, first))
+            self._stages = None
+
+    def rewrite(self, html_content: str) -> str:
+        """Rewrite a complete HTML string"""
+        return ''.join(self.rewrite_stream([html_content]))
+
+    def rewrite_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Rewrite a stream of HTML chunks, holding back only a pattern-length tail per stage"""
+
+        if self._stages is None:
+            self._stages = self._build_stages()
+
+        for stage in self._stages:
+            chunks = stage.rewrite_stream(chunks)
+        yield from chunks
+
+    def _build_stages(self) -> List["_RewriteStage"]:
+        """Group consecutive rules into stages that are safe to apply in one scan"""
+
+        stages = []
+        for old, new, first in self._rules:
+            if not stages or not stages[-1].accepts(old, new, first):
+                stages.append(_RewriteStage())
+            stages[-1].add(old, new, first)
+        return stages
+
+class _RewriteStage:
+    """Rules applied together in one scan.
+
+    A scan replaces the earliest-added pattern at each position, then applies the stage's later rules
+    to the inserted text. That matches sequential replacement as long as no pattern overlaps another
+    except at the same start, no pattern reaches across the edge of an earlier rule's inserted text, and
+    first-occurrence patterns never occur inside inserted text. accepts() checks these for a new rule.
+    """
+
+    def __init__(self):
+        self.rules: List[Tuple[str, str, Optional[str]]] = []
+        self._closed = False  # holds a rule no later rule may join
+        self._inserted: List[str] = []
+        self._inserted_set: Set[str] = set()
+        self._inserted_lengths: Set[int] = set()
+        self._short_inserted: Set[str] = set()  # inserted texts shorter than _GRAM
+
+        # Patterns and inserted texts by their leading and trailing characters
+        self._heads: Dict[str, List[str]] = {}
+        self._tails: Dict[str, List[str]] = {}
+        self._short_heads: Set[str] = set()
+        self._short_tails: Set[str] = set()  # proper suffixes only
+        self._pattern_grams: Dict[str, List[str]] = {}  # substrings of patterns after their first character
+
+        self._replacements: Dict[str, str] = {}
+        self._first_replacements: Dict[str, str] = {}
+        self._seen = set()
+        self._regex = None
+
+    def accepts(self, old: str, new: str, first: Optional[str]) -> bool:
+        """Whether the rule can join this stage without changing the result"""
+
+        if not self.rules:
+            return True
+        if self._closed or len(old) < _GRAM:
+            return False
+
+        # Sequentially, a first occurrence inside earlier inserted text would count as the first
+        if first is not None and any(old in text for text in self._inserted):
+            return False
+
+        grams = [old[i:i + _GRAM] for i in range(len(old) - _GRAM + 1)]
+        return not (self._reaches_into_start(old, grams) or self._reaches_into_end(old, grams)
+                    or self._within_pattern(old))
+
+    def add(self, old: str, new: str, first: Optional[str] = None):
+        """Add a rule that accepts() allowed"""
+
+        self.rules.append((old, new, first))
+        self._regex = None
+
+        # Short patterns and deletions are not covered by the indexes, so they get a stage to themselves
+        if len(old) < _GRAM or not new or first == '':
+            self._closed = True
+
+        self._index(old)
+        for i in range(1, len(old) - _GRAM + 1):
+            self._pattern_grams.setdefault(old[i:i + _GRAM], []).append(old)
+
+        for text in (new, first):
+            if text:
+                self._inserted.append(text)
+                self._inserted_set.add(text)
+                self._inserted_lengths.add(len(text))
+                if len(text) < _GRAM:
+                    self._short_inserted.add(text)
+                self._index(text)
+
+    def _index(self, text: str):
+        """Index a pattern or inserted text by its leading and trailing characters"""
+
+        if len(text) >= _GRAM:
+            self._heads.setdefault(text[:_GRAM], []).append(text)
+            self._tails.setdefault(text[-_GRAM:], []).append(text)
+        for length in range(1, min(_GRAM, len(text) + 1)):
+            self._short_heads.add(text[:length])
+            if length < len(text):
+                self._short_tails.add(text[-length:])
+
+    def _reaches_into_start(self, old: str, grams: List[str]) -> bool:
+        """Whether old, after its first character, runs into the start of an indexed text or contains one"""
+
+        for length in range(1, min(_GRAM, len(old))):
+            if old[-length:] in self._short_heads:
+                return True
+
+        if not self._heads.keys().isdisjoint(grams[1:]):
+            for start in range(1, len(grams)):
+                texts = self._heads.get(grams[start])
+                if texts and any(text.startswith(old[start:]) or old.startswith(text, start) for text in texts):
+                    return True
+
+        # Short inserted texts anywhere inside old
+        return any(text in old for text in self._short_inserted)
+
+    def _reaches_into_end(self, old: str, grams: List[str]) -> bool:
+        """Whether old starts with the end of a longer indexed text, or with a whole inserted text"""
+
+        for end in range(1, min(_GRAM, len(old))):
+            if old[:end] in self._short_tails:
+                return True
+
+        # grams[i] ends at i + _GRAM
+        if not self._tails.keys().isdisjoint(grams[:-1]):
+            for end in range(_GRAM, len(old)):
+                texts = self._tails.get(grams[end - _GRAM])
+                if texts and any(len(text) > end and text.endswith(old[:end]) for text in texts):
+                    return True
+
+        return any(old[:length] in self._inserted_set for length in self._inserted_lengths if length < len(old))
+
+    def _within_pattern(self, old: str) -> bool:
+        """Whether old occurs inside a stage pattern other than at its start"""
+        return any(pattern.find(old, 1) != -1 for pattern in self._pattern_grams.get(old[:_GRAM], ()))
+
+    def rewrite_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Rewrite a stream of HTML chunks, holding back only a pattern-length tail"""
+
+        regex = self._get_regex()
+        overlap = max(len(old) for old, _, _ in self.rules) - 1
+
+        pending = ''
+        for chunk in chunks:
+            pending += chunk
+
+            # Matches starting before this point cannot change with more input
+            safe_end = len(pending) - overlap
+            if safe_end <= 0:
+                continue
+
+            output, position = self._rewrite_matches(regex, pending, safe_end)
+            emit_end = max(position, safe_end)
+            output.append(pending[position:emit_end])
+            pending = pending[emit_end:]
+            yield ''.join(output)
+
+        if pending:
+            output, position = self._rewrite_matches(regex, pending, len(pending))
+            output.append(pending[position:])
+            yield ''.join(output)
+
+    def _rewrite_matches(self, regex, text: str, limit: int):
+        """Replace matches that start before limit, returning the output pieces and the end position"""
+
+        output = []
+        position = 0
+        search_from = 0
+        while True:
+            candidate = regex.search(text, search_from)
+            if candidate is None or candidate.start() >= limit:
+                break
+
+            start = candidate.start()
+            pattern = self._match_at(text, start, candidate.group())
+            if pattern is None:
+                search_from = start + 1
+                continue
+
+            if pattern in self._first_replacements and pattern not in self._seen:
+                replacement = self._first_replacements[pattern]
+            else:
+                replacement = self._replacements[pattern]
+            self._seen.add(pattern)
+
+            output.append(text[position:start])
+            output.append(replacement)
+            position = search_from = start + len(pattern)
+
+        return output, position
+
+    def _candidates(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Every position in text where a pattern prefix starts, including overlapping ones"""
+
+        candidate = self._regex.search(text)
+        while candidate is not None:
+            yield candidate.start(), candidate.group()
+            candidate = self._regex.search(text, candidate.start() + 1)
+
+    def _patterns_at(self, text: str, start: int, prefix: str) -> Iterator[str]:
+        """All rule patterns that occur in text at start"""
+
+        for length in self._lengths[prefix]:
+            candidate = text[start:start + length]
+            if candidate in self._rank:
+                yield candidate
+
+    def _match_at(self, text: str, start: int, prefix: str) -> Optional[str]:
+        """The earliest rule pattern that occurs in text at start"""
+        return min(self._patterns_at(text, start, prefix), key=self._rank.get, default=None)
+
+    def _get_regex(self):
+        """Regex over the distinct pattern prefixes; full patterns are then looked up by length"""
+
+        if self._regex is not None:
+            return self._regex
+
+        patterns = []
+        first_index = {}
+        last_index = {}
+        for index, (old, _, _) in enumerate(self.rules):
+            if old not in first_index:
+                first_index[old] = index
+                patterns.append(old)
+            last_index[old] = index
+
+        # Hundreds of literal alternatives make a slow regex, so only match
+        # short prefixes and resolve the full pattern with dictionary lookups
+        prefix_length = min(_GRAM, min(len(pattern) for pattern in patterns))
+        self._rank = {pattern: rank for rank, pattern in enumerate(patterns)}
+        self._lengths: Dict[str, List[int]] = {}
+        for pattern in patterns:
+            lengths = self._lengths.setdefault(pattern[:prefix_length], [])
+            if len(pattern) not in lengths:
+                lengths.append(len(pattern))
+
+        self._regex = re.compile('|'.join(re.escape(prefix) for prefix in self._lengths))
+
+        # An earlier rule consumes every occurrence of its text, so later rules
+        # (including repeats of the same text) only ever see what it inserted
+        for pattern in patterns:
+            index = first_index[pattern]
+            _, new, first = self.rules[index]
+            self._replacements[pattern] = self._apply_later_rules(new, index, last_index)
+            if first is not None:
+                self._first_replacements[pattern] = self._apply_later_rules(first, index, last_index)
+
+        return self._regex
+
+    def _apply_later_rules(self, text: str, index: int, last_index: Dict[str, int]) -> str:
+        """Apply the stage's rules after index to text inserted by the rule at index"""
+
+        later_match = any(
+            last_index[pattern] > index
+            for start, prefix in self._candidates(text)
+            for pattern in self._patterns_at(text, start, prefix)
+        )
+        if not later_match:
+            return text
+
+        # accepts() keeps first-occurrence patterns out of inserted text
+        for old, new, first in self.rules[index + 1:]:
+            if first is None:
+                text = text.replace(old, new)
+        return text
@@ -0,0 +1,265 @@
+"""
+Image optimization for generated documents
+Resolves referenced images, downsamples them to the output resolution, recompresses them and stores them by content hash
+"""
+
+import io
+import os
+import hashlib
+import logging
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass
+
+from ..caching import DiskLRUStore
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Bump whenever image processing changes so cached images are invalidated
+IMAGE_PIPELINE_VERSION = "1.0.0"
+
+# Formats Pillow can downsample; anything else (SVG, animated GIF, ...) is stored as-is
+_RASTER_FORMATS = {'PNG', 'JPEG', 'WEBP', 'BMP', 'TIFF', 'GIF'}
+
+@dataclass
+class OptimizedImage:
+    """An optimized image stored in the cache"""
+    path: Path
+    content_hash: str
+    original_bytes: int
+    optimized_bytes: int
+    width: int = 0
+    height: int = 0
+
+    @property
+    def file_name(self) -> str:
+        return self.path.name
+
+class ImageOptimizer:
+    """Downsamples and recompresses document images, deduplicated by content hash"""
+
+    def __init__(self, cache_dir: Path, max_size_mb: int = 256, jpeg_quality: int = 85):
+        # Optimized files live in a size-bounded LRU store, named by source hash and settings
+        self.cache = DiskLRUStore(cache_dir, max_size_mb)
+        self.jpeg_quality = jpeg_quality
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._source_hashes: Dict[Tuple[str, int, int], str] = {}  # (path, mtime, size) -> content hash
+        self._optimized: Dict[str, OptimizedImage] = {}  # key without suffix -> image
+
+        self.images = 0
+        self.resized = 0
+        self.deduplicated = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def resolve(self, reference: str, base_dir: Optional[Path] = None) -> Optional[Path]:
+        """Find the file for an image reference, relative to the document first, then the working directory"""
+
+        if not reference or reference.startswith(('http://', 'https://', 'data:', '//')):
+            return None
+
+        reference = reference.split('#', 1)[0].split('?', 1)[0]
+        if reference.startswith('file://'):
+            reference = reference[len('file://'):]
+
+        candidates = [Path(reference)]
+        if base_dir is not None and not Path(reference).is_absolute():
+            candidates.insert(0, base_dir / reference)
+
+        for candidate in candidates:
+            if candidate.is_file():
+                return candidate.resolve()
+        return None
+
+    def optimize(self, reference: str, base_dir: Optional[Path] = None,
+                 max_width: int = 2000) -> Optional[OptimizedImage]:
+        """Return the optimized version of a referenced image, or None if it cannot be found"""
+
+        source_path = self.resolve(reference, base_dir)
+        if source_path is None:
+            return None
+
+        try:
+            content_hash, source_bytes = self._hash_source(source_path)
+        except OSError as e:
+            self.logger.warning(f"Could not read image {source_path}: {e}")
+            return None
+
+        # Identical images share one entry whatever their path or document
+        key_base = hashlib.sha256(
+            f"{content_hash}:{max_width}:{self.jpeg_quality}:{IMAGE_PIPELINE_VERSION}".encode('utf-8')
+        ).hexdigest()
+
+        with self._lock:
+            image = self._optimized.get(key_base)
+        if image is not None and image.path.exists():
+            with self._lock:
+                self.deduplicated += 1
+            return image
+
+        # The stored suffix depends on the output format chosen for the image
+        suffix = source_path.suffix.lower() or '.img'
+        for candidate_suffix in dict.fromkeys(('.jpg', '.png', suffix)):
+            if key_base + candidate_suffix in self.cache:
+                cached = self.cache.get(key_base + candidate_suffix)
+                if cached is not None:
+                    image = OptimizedImage(self.cache.path_for(key_base + candidate_suffix), content_hash,
+                                           source_path.stat().st_size, len(cached))
+                    return self._remember(key_base, image)
+
+        if source_bytes is None:
+            source_bytes = source_path.read_bytes()
+        optimized_bytes, optimized_suffix, size, was_resized = self._process(source_bytes, suffix, max_width)
+
+        cache_key = key_base + optimized_suffix
+        self.cache.put(cache_key, optimized_bytes)
+        image = OptimizedImage(self.cache.path_for(cache_key), content_hash,
+                               len(source_bytes), len(optimized_bytes), *size)
+
+        if not image.path.exists():
+            # Too large for the cache budget, keep the source file instead
+            image.path = source_path
+
+        with self._lock:
+            self.images += 1
+            self.resized += was_resized
+            self.bytes_in += len(source_bytes)
+            self.bytes_out += len(optimized_bytes)
+
+        return self._remember(key_base, image)
+
+    def optimize_references(self, references: List[str], base_dir: Optional[Path] = None,
+                            max_width: int = 2000) -> Dict[str, OptimizedImage]:
+        """Optimize every resolvable reference, returning reference -> optimized image"""
+
+        optimized = {}
+        for reference in dict.fromkeys(references):
+            image = self.optimize(reference, base_dir, max_width)
+            if image is not None:
+                optimized[reference] = image
+        return optimized
+
+    def publish(self, image: OptimizedImage, assets_dir: Path) -> Path:
+        """Copy an optimized image into an output assets directory once, by content-addressed name"""
+
+        assets_dir.mkdir(parents=True, exist_ok=True)
+        target = assets_dir / image.file_name
+        if not target.exists():
+            temp_path = assets_dir / f"{image.file_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(image.path, temp_path)
+            temp_path.replace(target)
+        return target
+
+    def _remember(self, key_base: str, image: OptimizedImage) -> OptimizedImage:
+        with self._lock:
+            self._optimized[key_base] = image
+        return image
+
+    def _hash_source(self, source_path: Path) -> Tuple[str, Optional[bytes]]:
+        """Content hash of a source file, reusing the hash while the file is unchanged"""
+
+        stat = source_path.stat()
+        identity = (str(source_path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            content_hash = self._source_hashes.get(identity)
+        if content_hash is not None:
+            return content_hash, None
+
+        source_bytes = source_path.read_bytes()
+        content_hash = hashlib.sha256(source_bytes).hexdigest()
+        with self._lock:
+            self._source_hashes[identity] = content_hash
+        return content_hash, source_bytes
+
+    def _process(self, source_bytes: bytes, suffix: str, max_width: int) -> Tuple[bytes, str, Tuple[int, int], bool]:
+        """Downsample and recompress image bytes, returning bytes, file suffix, size and whether it was resized"""
+
+        if not PIL_AVAILABLE:
+            return source_bytes, suffix, (0, 0), False
+
+        try:
+            with Image.open(io.BytesIO(source_bytes)) as original:
+                if original.format not in _RASTER_FORMATS or getattr(original, 'is_animated', False):
+                    return source_bytes, suffix, original.size, False
+
+                image = ImageOps.exif_transpose(original)
+                was_resized = image.width > max_width
+                if was_resized:
+                    height = max(1, round(image.height * max_width / image.width))
+                    image = image.resize((max_width, height), Image.LANCZOS)
+
+                has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+                buffer = io.BytesIO()
+                if has_alpha or (original.format in ('PNG', 'GIF') and image.mode in ('P', '1', 'L')):
+                    # Transparency and flat palette art stay lossless
+                    image.save(buffer, format='PNG', optimize=True)
+                    optimized_suffix = '.png'
+                else:
+                    image.convert('RGB').save(buffer, format='JPEG', quality=self.jpeg_quality,
+                                              optimize=True, progressive=True)
+                    optimized_suffix = '.jpg'
+
+                optimized_bytes = buffer.getvalue()
+                size = image.size
+
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            self.logger.warning(f"Could not optimize image: {e}")
+            return source_bytes, suffix, (0, 0), False
+
+        # Recompressing a small, already efficient file can make it bigger
+        if not was_resized and len(optimized_bytes) >= len(source_bytes):
+            return source_bytes, suffix, size, False
+
+        return optimized_bytes, optimized_suffix, size, was_resized
+
+    def get_counters(self) -> Dict[str, int]:
+        """Get the raw activity counters"""
+
+        counters = {f"cache_{name}": value for name, value in self.cache.get_counters().items()}
+        counters.update({
+            "images": self.images,
+            "resized": self.resized,
+            "deduplicated": self.deduplicated,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out
+        })
+        return counters
+
+    def merge_counters(self, counters: Dict[str, int]):
+        """Add activity counters reported by another process"""
+
+        self.cache.merge_counters({
+            name[len("cache_"):]: value for name, value in counters.items() if name.startswith("cache_")
+        })
+        with self._lock:
+            self.images += counters.get("images", 0)
+            self.resized += counters.get("resized", 0)
+            self.deduplicated += counters.get("deduplicated", 0)
+            self.bytes_in += counters.get("bytes_in", 0)
+            self.bytes_out += counters.get("bytes_out", 0)
+
+    def reload_index(self):
+        """Pick up images written to the cache directory by other processes"""
+        self.cache.reload_index()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get optimization totals and cache counters"""
+
+        return {
+            "images": self.images,
+            "resized": self.resized,
+            "deduplicated": self.deduplicated,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "cache": self.cache.get_stats()
+        }
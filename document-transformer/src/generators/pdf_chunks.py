@@ -0,0 +1,160 @@
+"""
+Chunked PDF rendering helpers
+Splits print HTML at section boundaries into standalone documents, merges the rendered chunks back into one PDF
+and stamps page overlays such as running page numbers
+"""
+
+import io
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Union
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# Marker inserted by PDFGenerator._add_smart_page_breaks before each major section
+PAGE_BREAK_MARKER = '<div style="page-break-before: always;"></div>'
+
+# Split point before other major section headings, inserted only for chunked rendering; it does not affect layout
+SPLIT_MARKER = '<!-- pdf-chunk-split -->'
+
+# Tags, skipping comments and the raw text of script and style elements
+_TAG_PATTERN = re.compile(
+    r'<!--.*?-->|<(script|style)\b.*?</\1\s*>|<(/?)([a-zA-Z][\w:-]*)\b[^>]*?(/?)>',
+    re.DOTALL | re.IGNORECASE
+)
+_BODY_OPEN_PATTERN = re.compile(r'<body\b[^>]*>', re.IGNORECASE)
+
+_VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'
+}
+
+def _open_elements(html_content: str, start: int, end: int, stack: List[tuple]) -> List[tuple]:
+    """Update a stack of (tag name, start tag) pairs with the elements opened and closed in html[start:end]"""
+
+    for match in _TAG_PATTERN.finditer(html_content, start, end):
+        name = match.group(3)
+        if not name:
+            continue
+        name = name.lower()
+        if match.group(2):
+            # Close the nearest open element of this name, implicitly closing anything left open inside it
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == name:
+                    del stack[i:]
+                    break
+        elif not match.group(4) and name not in _VOID_ELEMENTS:
+            stack.append((name, match.group(0)))
+
+    return stack
+
+def _pick_breaks(markers: Sequence[int], start: int, end: int, max_chunks: int) -> List[int]:
+    """Choose up to max_chunks - 1 break positions that split start..end into similar lengths"""
+
+    breaks = []
+    remaining = list(markers)
+    for k in range(1, max_chunks):
+        target = start + (end - start) * k // max_chunks
+        candidates = [pos for pos in remaining if not breaks or pos > breaks[-1]]
+        if not candidates:
+            break
+        best = min(candidates, key=lambda pos: abs(pos - target))
+        breaks.append(best)
+        remaining = [pos for pos in remaining if pos > best]
+
+    return breaks
+
+def split_html_at_page_breaks(html_content: str, max_chunks: int, leading_html: str = "",
+                              trailing_html: str = "") -> List[str]:
+    """Split a document at its forced page breaks into up to max_chunks standalone HTML documents.
+
+    Forced page breaks are used when there are enough of them, as splitting there leaves the layout unchanged.
+    Otherwise SPLIT_MARKER positions are used as well, and each chunk after such a split starts a new page.
+    Each chunk keeps the full <head>, reopens the elements enclosing the break and closes them at its end,
+    so styles that depend on the enclosing structure still apply. leading_html (such as a running header)
+    is inserted after <body> in every chunk but the first, and trailing_html (such as a running footer)
+    before </body> in every chunk but the last, which already contain them.
+    """
+
+    body_open = _BODY_OPEN_PATTERN.search(html_content)
+    body_close = html_content.rfind('</body>')
+    if max_chunks < 2 or body_open is None or body_close < body_open.end():
+        return [html_content]
+
+    body_start = body_open.end()
+    marker_lengths: Dict[int, int] = {}
+    for marker in (PAGE_BREAK_MARKER, SPLIT_MARKER):
+        position = html_content.find(marker, body_start, body_close)
+        while position != -1:
+            marker_lengths[position] = len(marker)
+            position = html_content.find(marker, position + len(marker), body_close)
+
+    forced_breaks = sorted(pos for pos in marker_lengths if html_content.startswith(PAGE_BREAK_MARKER, pos))
+    markers = forced_breaks if len(forced_breaks) >= max_chunks - 1 else sorted(marker_lengths)
+    breaks = _pick_breaks(markers, body_start, body_close, max_chunks)
+    if not breaks:
+        return [html_content]
+
+    prefix = html_content[:body_start]
+    suffix = html_content[body_close:]
+
+    chunks = []
+    stack: List[tuple] = []
+    segment_start = body_start
+    reopen = ""
+    last_break = len(breaks)
+    for index, break_at in enumerate(breaks + [body_close]):
+        segment = html_content[segment_start:break_at]
+        stack_at_start = reopen
+        _open_elements(html_content, segment_start, break_at, stack)
+        closing = ''.join(f'</{name}>' for name, _ in reversed(stack))
+
+        leading = leading_html if index > 0 else ""
+        trailing = trailing_html if index < last_break else ""
+        chunks.append(prefix + leading + stack_at_start + segment + closing + trailing + suffix)
+
+        reopen = ''.join(start_tag for _, start_tag in stack)
+        segment_start = break_at + marker_lengths.get(break_at, 0)
+
+    return chunks
+
+def merge_pdf_chunks(chunk_pdfs: Sequence[bytes], target: Union[str, Path]):
+    """Concatenate chunk PDFs into one file"""
+
+    if not PYPDF_AVAILABLE:
+        raise ImportError("pypdf is required to merge PDF chunks")
+
+    writer = PdfWriter()
+    for chunk in chunk_pdfs:
+        for page in PdfReader(io.BytesIO(chunk)).pages:
+            writer.add_page(page)
+
+    with open(target, 'wb') as output_file:
+        writer.write(output_file)
+
+def stamp_pdf_pages(target: Union[str, Path], build_overlay: Callable[[int], bytes]):
+    """Merge each page of an overlay PDF onto the matching page of the PDF at target.
+
+    build_overlay receives the page count and returns the overlay PDF, which must have that many pages.
+    """
+
+    if not PYPDF_AVAILABLE:
+        raise ImportError("pypdf is required to stamp PDF pages")
+
+    with open(target, 'rb') as input_file:
+        reader = PdfReader(io.BytesIO(input_file.read()))
+
+    overlay_pages = PdfReader(io.BytesIO(build_overlay(len(reader.pages)))).pages
+    if len(overlay_pages) != len(reader.pages):
+        raise ValueError(f"Overlay has {len(overlay_pages)} pages for {len(reader.pages)} document pages")
+
+    writer = PdfWriter()
+    for page, overlay_page in zip(reader.pages, overlay_pages):
+        page.merge_page(overlay_page)
+        writer.add_page(page)
+
+    with open(target, 'wb') as output_file:
+        writer.write(output_file)
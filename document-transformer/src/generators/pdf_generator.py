@@ -4,19 +4,37 @@ Converts documents to high-quality PDF with print optimization
 """
 
 import os
+import re
 import tempfile
 from pathlib import Path
 from typing import Optional, Dict, Any, Union
 from dataclasses import dataclass
 import logging
 
-from weasyprint import HTML, CSS
-from weasyprint.text.fonts import FontConfiguration
+from markupsafe import escape
 
 from ..parser import ParsedDocument
 from ..branding import BrandProfile
 from ..templates import TemplateEngine, TemplateConfig
 from .html_generator import HTMLGenerator
+from .pdf_service import PDFRenderService, get_pdf_service, render_chunk_in_worker
+from .pdf_chunks import (
+    PAGE_BREAK_MARKER, SPLIT_MARKER, PYPDF_AVAILABLE, split_html_at_page_breaks, merge_pdf_chunks, stamp_pdf_pages
+)
+from .image_optimizer import ImageOptimizer
+from ..profiling import phase
+
+# Page sizes in inches (width, height), portrait
+PAGE_SIZES_IN = {
+    'A3': (11.69, 16.54),
+    'A4': (8.27, 11.69),
+    'A5': (5.83, 8.27),
+    'LETTER': (8.5, 11.0),
+    'LEGAL': (8.5, 14.0)
+}
+
+# Length units accepted in margins, in inches
+LENGTH_UNITS_IN = {'in': 1.0, 'cm': 1 / 2.54, 'mm': 1 / 25.4, 'pt': 1 / 72, 'px': 1 / 96}
 
 @dataclass
 class PDFOptions:
@@ -35,13 +53,19 @@ class PDFOptions:
     table_of_contents: bool = False
     header_footer: bool = True
     watermarks: bool = False
+    parallel_workers: int = 0  # >1 lays out page-break chunks in that many worker processes
 
 class PDFGenerator:
     """Generates high-quality PDF documents from parsed content"""
 
     def __init__(self, template_engine: TemplateEngine, output_dir: Path,
-                 html_generator: HTMLGenerator = None):
+                 html_generator: HTMLGenerator = None, pdf_service: Optional[PDFRenderService] = None,
+                 parallel_workers: int = 0, image_optimizer: Optional[ImageOptimizer] = None,
+                 warm_fonts: bool = False):
         self.template_engine = template_engine
+        self.parallel_workers = parallel_workers
+        self.warm_fonts = warm_fonts
+        self.image_optimizer = image_optimizer
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -50,8 +74,9 @@ class PDFGenerator:
             html_generator = HTMLGenerator(template_engine, output_dir / "temp_html")
         self.html_generator = html_generator
 
-        # Font configuration for WeasyPrint
-        self.font_config = FontConfiguration()
+        # Rendering service shared by all generators in this process (fonts and parsed CSS stay warm)
+        self.pdf_service = pdf_service or get_pdf_service()
+        self.font_config = self.pdf_service.font_config
 
         # Setup logging
         self.logger = logging.getLogger(__name__)
@@ -59,7 +84,8 @@ class PDFGenerator:
     def generate_pdf(self, document: ParsedDocument, brand_profile: BrandProfile,
                     template_config: Optional[TemplateConfig] = None,
                     pdf_options: Optional[PDFOptions] = None,
-                    output_filename: Optional[str] = None) -> str:
+                    output_filename: Optional[str] = None,
+                    rendered_html: Optional[str] = None) -> str:
         """Generate PDF document"""
 
         # Use default PDF options if not provided
@@ -71,28 +97,38 @@ class PDFGenerator:
             output_filename = self._generate_filename(document)
 
         # Generate HTML content first
-        html_content = self._generate_pdf_html(document, brand_profile, template_config, pdf_options)
-
-        # Create PDF-specific CSS
-        pdf_css = self._generate_pdf_css(pdf_options, brand_profile)
+        html_content = self._generate_pdf_html(document, brand_profile, template_config, pdf_options, rendered_html)
 
         # Generate PDF
         output_path = self.output_dir / output_filename
 
         try:
-            # Use WeasyPrint to convert HTML to PDF
-            html_doc = HTML(string=html_content, base_url=str(self.output_dir))
-
-            # Additional CSS for PDF optimization
-            css_styles = [CSS(string=pdf_css)]
-
-            # Generate PDF with options
-            html_doc.write_pdf(
-                target=str(output_path),
-                stylesheets=css_styles,
-                font_config=self.font_config,
-                optimize_size=('fonts' if pdf_options.embed_fonts else None)
+            # PDF-specific CSS, parsed once per options and brand
+            css_styles = self.pdf_service.get_stylesheets(
+                self.pdf_service.make_key(pdf_options, brand_profile),
+                lambda: self._generate_pdf_css(pdf_options, brand_profile)
             )
+            # Warming costs one extra layout, which only pays off across a batch of documents
+            if self.warm_fonts:
+                self.pdf_service.warm_up(brand_profile, css_styles)
+
+            # Long documents can be laid out in parallel, one chunk per worker
+            if not self._render_chunked(html_content, brand_profile, pdf_options, output_path):
+                # Use WeasyPrint to convert HTML to PDF
+                self.pdf_service.render(
+                    html_content,
+                    base_url=str(self.output_dir),
+                    target=str(output_path),
+                    stylesheets=css_styles,
+                    optimize_size=('fonts' if pdf_options.embed_fonts else None)
+                )
+
+            # Numbers are stamped after layout, so they run on across chunks
+            if pdf_options.header_footer and PYPDF_AVAILABLE:
+                try:
+                    self._stamp_page_numbers(output_path, brand_profile, pdf_options)
+                except Exception as e:
+                    self.logger.warning(f"Page numbering failed, keeping the unnumbered PDF: {e}")
 
             print(f"✅ Generated PDF: {output_path}")
             return str(output_path)
@@ -103,20 +139,79 @@ class PDFGenerator:
             return self._generate_pdf_fallback(document, brand_profile, output_filename)
 
     def _generate_pdf_html(self, document: ParsedDocument, brand_profile: BrandProfile,
-                          template_config: Optional[TemplateConfig], pdf_options: PDFOptions) -> str:
+                          template_config: Optional[TemplateConfig], pdf_options: PDFOptions,
+                          rendered_html: Optional[str] = None) -> str:
         """Generate HTML optimized for PDF output"""
 
-        # Get base HTML content
-        if template_config is None:
-            template_config = self.template_engine.get_template_for_document(document, brand_profile)
+        # Get base HTML content (reuse the caller's render when provided)
+        if rendered_html is None:
+            if template_config is None:
+                template_config = self.template_engine.get_template_for_document(document, brand_profile)
+
+            rendered_html = self.template_engine.render_document(document, brand_profile, template_config)
+        html_content = rendered_html
+
+        with phase("post_process"):
+            # Add PDF-specific optimizations
+            html_content = self._add_pdf_optimizations(html_content, document, brand_profile, pdf_options)
+
+            # Point images at copies downsampled to the print resolution
+            if pdf_options.optimize_images and self.image_optimizer is not None:
+                html_content = self._optimize_images(html_content, document, brand_profile, pdf_options)
+
+        return html_content
+
+    def _optimize_images(self, html_content: str, document: ParsedDocument,
+                         brand_profile: BrandProfile, pdf_options: PDFOptions) -> str:
+        """Replace image references with optimized files sized for the page at the target DPI"""
 
-        html_content = self.template_engine.render_document(document, brand_profile, template_config)
+        references = list(document.images)
+        if brand_profile.brand_assets.logo_path:
+            references.append(brand_profile.brand_assets.logo_path)
+        if not references:
+            return html_content
 
-        # Add PDF-specific optimizations
-        html_content = self._add_pdf_optimizations(html_content, document, brand_profile, pdf_options)
+        max_width = max(1, round(self._get_content_width_inches(pdf_options) * pdf_options.dpi))
+        base_dir = Path(document.metadata.source_path).parent if document.metadata.source_path else None
+        optimized = self.image_optimizer.optimize_references(references, base_dir, max_width)
+
+        # WeasyPrint loads each distinct URL once, so duplicates are embedded a single time
+        for reference, image in optimized.items():
+            image_url = image.path.resolve().as_uri()
+            html_content = html_content.replace(f'src="{reference}"', f'src="{image_url}"')
+            html_content = html_content.replace(f']({reference})', f']({image_url})')
 
         return html_content
 
+    def _get_content_width_inches(self, pdf_options: PDFOptions) -> float:
+        """Printable width of the page between the left and right margins"""
+
+        width, height = PAGE_SIZES_IN.get(pdf_options.page_size.upper(), PAGE_SIZES_IN['A4'])
+        if pdf_options.orientation == 'landscape':
+            width = height
+
+        return max(width - self._get_margins_inches(pdf_options.margin_left, pdf_options.margin_right), 1.0)
+
+    def _get_content_height_inches(self, pdf_options: PDFOptions) -> float:
+        """Printable height of the page between the top and bottom margins"""
+
+        width, height = PAGE_SIZES_IN.get(pdf_options.page_size.upper(), PAGE_SIZES_IN['A4'])
+        if pdf_options.orientation == 'landscape':
+            height = width
+
+        return max(height - self._get_margins_inches(pdf_options.margin_top, pdf_options.margin_bottom), 1.0)
+
+    def _get_margins_inches(self, *margins: str) -> float:
+        """Total of CSS margin lengths in inches, ignoring units that cannot be converted"""
+
+        total = 0.0
+        for margin in margins:
+            match = re.match(r'^\s*([\d.]+)\s*([a-z]+)\s*$', margin)
+            if match and match.group(2) in LENGTH_UNITS_IN:
+                total += float(match.group(1)) * LENGTH_UNITS_IN[match.group(2)]
+
+        return total
+
     def _add_pdf_optimizations(self, html_content: str, document: ParsedDocument,
                              brand_profile: BrandProfile, pdf_options: PDFOptions) -> str:
         """Add PDF-specific optimizations to HTML"""
@@ -266,7 +361,7 @@ class PDFGenerator:
 
         # Add page break instructions
         if pdf_options.page_breaks:
-            html_content = self._add_smart_page_breaks(html_content, document)
+            html_content = self._add_smart_page_breaks(html_content, document, self._renders_in_chunks(pdf_options))
 
         # Add header and footer if requested
         if pdf_options.header_footer:
@@ -274,6 +369,50 @@ class PDFGenerator:
 
         return html_content
 
+    def _renders_in_chunks(self, pdf_options: PDFOptions) -> bool:
+        """Whether generate_pdf tries to lay out the document in parallel chunks"""
+        return pdf_options.parallel_workers > 1 and PYPDF_AVAILABLE
+
+    def _render_chunked(self, html_content: str, brand_profile: BrandProfile,
+                        pdf_options: PDFOptions, output_path: Path) -> bool:
+        """Render page-break chunks in worker processes and merge them, returning False to render in one pass"""
+
+        if not self._renders_in_chunks(pdf_options):
+            return False
+
+        # Running header and footer are fixed elements, so every chunk needs its own copy to match one-pass output
+        header_html = self._get_pdf_header_html(brand_profile) if pdf_options.header_footer else ""
+        footer_html = self._get_pdf_footer_html() if pdf_options.header_footer else ""
+        chunks = split_html_at_page_breaks(html_content, pdf_options.parallel_workers, header_html, footer_html)
+        if len(chunks) < 2:
+            return False
+
+        # Workers parse the same stylesheet once each, under the same key as the one-pass render
+        stylesheet_key = self.pdf_service.make_key(pdf_options, brand_profile)
+        css_text = self._generate_pdf_css(pdf_options, brand_profile)
+        render_options = {'optimize_size': ('fonts' if pdf_options.embed_fonts else None)}
+
+        try:
+            executor = self.pdf_service.get_executor(pdf_options.parallel_workers)
+            futures = [
+                executor.submit(render_chunk_in_worker, chunk, str(self.output_dir), stylesheet_key,
+                                css_text, render_options)
+                for chunk in chunks
+            ]
+            with phase("layout"):
+                results = [future.result() for future in futures]
+
+            with phase("write"):
+                merge_pdf_chunks([pdf_bytes for pdf_bytes, _ in results], output_path)
+
+        except Exception as e:
+            self.logger.warning(f"Chunked PDF rendering failed, rendering in one pass: {e}")
+            return False
+
+        page_count = sum(pages for _, pages in results)
+        self.logger.info(f"Rendered {page_count} pages in {len(chunks)} chunks")
+        return True
+
     def _generate_pdf_css(self, pdf_options: PDFOptions, brand_profile: BrandProfile) -> str:
         """Generate CSS specific to PDF generation"""
 
@@ -371,7 +510,7 @@ class PDFGenerator:
 
         doc_type = document.metadata.document_type
 
-        base_options = PDFOptions()
+        base_options = PDFOptions(parallel_workers=self.parallel_workers)
 
         if doc_type in ['financial_projections', 'market_research']:
             # Data-heavy documents need landscape orientation
@@ -409,19 +548,29 @@ class PDFGenerator:
 
         return filename
 
-    def _add_smart_page_breaks(self, html_content: str, document: ParsedDocument) -> str:
-        """Add intelligent page breaks to HTML"""
+    def _add_smart_page_breaks(self, html_content: str, document: ParsedDocument,
+                               split_points: bool = False) -> str:
+        """Add intelligent page breaks to HTML, and chunk split points before the other major headings if asked"""
 
         # Add page break before major sections
         sections = document.sections
         for i, section in enumerate(sections):
             if section.level <= 2 and i > 0:  # Break before h1 and h2 (except first)
-                section_id = section.title.replace(' ', '-').lower()
                 html_content = html_content.replace(
                     f'<h{section.level}>{section.title}</h{section.level}>',
-                    f'<div style="page-break-before: always;"></div>\n<h{section.level}>{section.title}</h{section.level}>'
+                    f'{PAGE_BREAK_MARKER}\n<h{section.level}>{section.title}</h{section.level}>'
                 )
 
+                # Template headings carry attributes and autoescaped titles; marking them leaves the layout alone
+                if split_points:
+                    titles = {re.escape(section.title), re.escape(str(escape(section.title)))}
+                    heading_pattern = re.compile(
+                        rf'<h{section.level}(?:\s[^>]*)?>(?:{"|".join(titles)})</h{section.level}>'
+                    )
+                    html_content = heading_pattern.sub(
+                        lambda match: self._mark_split_point(match, html_content), html_content
+                    )
+
         # Avoid breaking inside tables
         html_content = html_content.replace(
             '<table class="financial-table">',
@@ -434,19 +583,75 @@ class PDFGenerator:
 
         return html_content
 
-    def _add_pdf_header_footer(self, html_content: str, brand_profile: BrandProfile) -> str:
-        """Add header and footer for PDF"""
+    def _mark_split_point(self, match: re.Match, html_content: str) -> str:
+        """Prefix a matched heading with a split point unless it already has a break or split point"""
+
+        if html_content.endswith((f'{PAGE_BREAK_MARKER}\n', f'{SPLIT_MARKER}\n'), 0, match.start()):
+            return match.group(0)
+        return f'{SPLIT_MARKER}\n{match.group(0)}'
+
+    def _get_pdf_header_html(self, brand_profile: BrandProfile) -> str:
+        """Running header repeated on every page"""
 
-        header_html = f'''
+        return f'''
 <div class="pdf-header">
     <div>{brand_profile.company_name}</div>
 </div>'''
 
-        footer_html = '''
+    def _get_pdf_footer_html(self, page_number: str = "", page_count: str = "") -> str:
+        """Running footer repeated on every page; the numbers are stamped on after layout"""
+
+        return f'''
 <div class="pdf-footer">
-    <div>Page <span class="page-number"></span> of <span class="page-count"></span></div>
+    <div>Page <span class="page-number">{page_number}</span> of <span class="page-count">{page_count}</span></div>
 </div>'''
 
+    def _stamp_page_numbers(self, output_path: Path, brand_profile: BrandProfile, pdf_options: PDFOptions):
+        """Cover the running footer on every page with a copy that has the page number and count filled in"""
+
+        def build_overlay(page_count: int) -> bytes:
+            # One page-area-high sheet per page, with the footer where the fixed footer sits
+            sheets = ''.join(
+                f'<div class="page-number-sheet">{self._get_pdf_footer_html(str(page), str(page_count))}</div>'
+                for page in range(1, page_count + 1)
+            )
+            overlay_html = f'''<html><head><style>
+@page {{
+  size: {pdf_options.page_size} {pdf_options.orientation};
+  margin: {pdf_options.margin_top} {pdf_options.margin_right} {pdf_options.margin_bottom} {pdf_options.margin_left};
+}}
+body {{ margin: 0; padding: 0; font-family: "{brand_profile.typography.body_font}", serif; }}
+.page-number-sheet {{
+  position: relative;
+  height: {self._get_content_height_inches(pdf_options) - 0.01:.3f}in;
+  page-break-after: always;
+}}
+.page-number-sheet:last-child {{ page-break-after: auto; }}
+.pdf-footer {{
+  position: absolute;
+  bottom: 0;
+  left: 0;
+  right: 0;
+  height: 1cm;
+  font-size: 9pt;
+  color: #666;
+  text-align: center;
+  border-top: 1px solid #ddd;
+  background: #fff;
+}}
+</style></head><body>{sheets}</body></html>'''
+            pdf_bytes, _ = self.pdf_service.render_to_bytes(overlay_html, str(self.output_dir), [])
+            return pdf_bytes
+
+        with phase("write"):
+            stamp_pdf_pages(output_path, build_overlay)
+
+    def _add_pdf_header_footer(self, html_content: str, brand_profile: BrandProfile) -> str:
+        """Add header and footer for PDF"""
+
+        header_html = self._get_pdf_header_html(brand_profile)
+        footer_html = self._get_pdf_footer_html()
+
         # Insert header after body tag
         html_content = html_content.replace('<body>', f'<body>{header_html}')
 
@@ -559,7 +764,7 @@ class PDFGenerator:
                     for header in financial.headers:
                         html += f'<th>{header}</th>\n'
                     html += '</tr>\n'
-                for row in financial.table_data:
+                for row in financial.columns.rows:
                     html += '<tr>\n'
                     for cell in row:
                         html += f'<td>{cell}</td>\n'
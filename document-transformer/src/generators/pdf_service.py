@@ -0,0 +1,168 @@
+"""
+Long-lived WeasyPrint rendering service
+Keeps one font configuration per process, pre-parsed stylesheets per (PDF options, brand) and warm brand fonts
+"""
+
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
+
+from ..branding import BrandProfile
+from ..templates import hash_brand_profile
+from ..profiling import phase
+
+class PDFRenderService:
+    """Renders PDFs with a shared FontConfiguration and cached CSS objects"""
+
+    def __init__(self, max_stylesheets: int = 32):
+        self.font_config = FontConfiguration()
+        self.max_stylesheets = max_stylesheets
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._stylesheets: "OrderedDict[Tuple, List[CSS]]" = OrderedDict()
+        self._warm_fonts = set()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_workers = 0
+
+        self.stylesheet_hits = 0
+        self.stylesheet_misses = 0
+        self.renders = 0
+
+    def make_key(self, pdf_options: Any, brand_profile: BrandProfile) -> Tuple:
+        """Build a stylesheet key from the PDF options and brand"""
+        return tuple(sorted(asdict(pdf_options).items())), hash_brand_profile(brand_profile)
+
+    def get_stylesheets(self, key: Tuple, css_builder: Callable[[], str]) -> List[CSS]:
+        """Return the parsed stylesheets for a key, building and parsing them on a miss"""
+
+        with self._lock:
+            stylesheets = self._stylesheets.get(key)
+            if stylesheets is not None:
+                self._stylesheets.move_to_end(key)
+                self.stylesheet_hits += 1
+                return stylesheets
+            self.stylesheet_misses += 1
+
+        stylesheets = [CSS(string=css_builder(), font_config=self.font_config)]
+
+        with self._lock:
+            self._stylesheets[key] = stylesheets
+            self._stylesheets.move_to_end(key)
+            while len(self._stylesheets) > self.max_stylesheets:
+                self._stylesheets.popitem(last=False)
+
+        return stylesheets
+
+    def warm_up(self, brand_profile: BrandProfile, stylesheets: Optional[List[CSS]] = None):
+        """Resolve a brand's fonts once so later renders find them in the font map"""
+
+        fonts = brand_profile.typography
+        font_key = (fonts.heading_font, fonts.body_font)
+        with self._lock:
+            if font_key in self._warm_fonts:
+                return
+            self._warm_fonts.add(font_key)
+
+        sample_html = f'''<html><body>
+<h1 style="font-family: '{fonts.heading_font}', sans-serif; font-weight: bold;">Aa</h1>
+<p style="font-family: '{fonts.body_font}', serif;">Aa <strong>Aa</strong> <em>Aa</em></p>
+</body></html>'''
+
+        try:
+            HTML(string=sample_html).render(stylesheets=stylesheets, font_config=self.font_config)
+        except Exception as e:
+            self.logger.warning(f"Font warm-up failed for {brand_profile.company_name}: {e}")
+
+    def layout(self, html_content: str, base_url: str, stylesheets: List[CSS]):
+        """Lay out HTML into pages with the shared font configuration"""
+
+        with phase("layout"):
+            return HTML(string=html_content, base_url=base_url).render(
+                stylesheets=stylesheets,
+                font_config=self.font_config
+            )
+
+    def render(self, html_content: str, base_url: str, target: str,
+               stylesheets: List[CSS], **options):
+        """Lay out HTML and write it to a PDF file"""
+
+        document = self.layout(html_content, base_url, stylesheets)
+        with phase("write"):
+            document.write_pdf(target=target, **options)
+
+        with self._lock:
+            self.renders += 1
+
+    def render_to_bytes(self, html_content: str, base_url: str, stylesheets: List[CSS],
+                        **options) -> Tuple[bytes, int]:
+        """Lay out HTML and return the PDF bytes and page count"""
+
+        document = self.layout(html_content, base_url, stylesheets)
+        with phase("write"):
+            pdf_bytes = document.write_pdf(**options)
+
+        with self._lock:
+            self.renders += 1
+
+        return pdf_bytes, len(document.pages)
+
+    def get_executor(self, max_workers: int) -> ProcessPoolExecutor:
+        """Process pool for laying out document chunks, kept for the life of the service"""
+
+        with self._lock:
+            if self._executor is None or self._executor_workers != max_workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=max_workers)
+                self._executor_workers = max_workers
+            return self._executor
+
+    def shutdown(self):
+        """Stop the chunk worker processes"""
+
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stylesheet cache counters and render totals"""
+
+        return {
+            "renders": self.renders,
+            "stylesheet_hits": self.stylesheet_hits,
+            "stylesheet_misses": self.stylesheet_misses,
+            "stylesheets": len(self._stylesheets),
+            "warm_font_sets": len(self._warm_fonts)
+        }
+
+def render_chunk_in_worker(html_content: str, base_url: str, stylesheet_key: Tuple,
+                           css_text: str, options: Dict[str, Any]) -> Tuple[bytes, int]:
+    """Render one document chunk in a worker process with that process's warm service"""
+
+    service = get_pdf_service()
+    stylesheets = service.get_stylesheets(stylesheet_key, lambda: css_text)
+    return service.render_to_bytes(html_content, base_url, stylesheets, **options)
+
+# One service per process, shared by every PDFGenerator
+_shared_service: Optional[PDFRenderService] = None
+_shared_service_lock = threading.Lock()
+
+def get_pdf_service() -> PDFRenderService:
+    """Return the process-wide PDF rendering service, creating it on first use"""
+
+    global _shared_service
+
+    if _shared_service is None:
+        with _shared_service_lock:
+            if _shared_service is None:
+                _shared_service = PDFRenderService()
+
+    return _shared_service
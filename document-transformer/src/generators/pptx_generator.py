@@ -18,6 +18,7 @@ from pptx.enum.shapes import MSO_SHAPE
 from ..parser import ParsedDocument, ContentSection, FinancialData, TeamMember
 from ..branding import BrandProfile, ColorPalette, Typography, DesignStyle
 from ..templates import TemplateEngine, TemplateConfig
+from ..profiling import phase
 
 @dataclass
 class SlideLayout:
@@ -52,25 +53,27 @@ class PowerPointGenerator:
         if output_filename is None:
             output_filename = self._generate_filename(document)
 
-        # Create presentation
-        prs = Presentation()
+        with phase("layout"):
+            # Create presentation
+            prs = Presentation()
 
-        # Apply branding to presentation
-        self._apply_branding(prs, brand_profile)
+            # Apply branding to presentation
+            self._apply_branding(prs, brand_profile)
 
-        # Determine which slides to include
-        slides_to_include = include_slides or self._get_default_slides(document)
+            # Determine which slides to include
+            slides_to_include = include_slides or self._get_default_slides(document)
 
-        # Create slides
-        for slide_type in slides_to_include:
-            try:
-                self._create_slide(prs, slide_type, document, brand_profile)
-            except Exception as e:
-                self.logger.warning(f"Error creating {slide_type} slide: {e}")
+            # Create slides
+            for slide_type in slides_to_include:
+                try:
+                    self._create_slide(prs, slide_type, document, brand_profile)
+                except Exception as e:
+                    self.logger.warning(f"Error creating {slide_type} slide: {e}")
 
         # Save presentation
         output_path = self.output_dir / output_filename
-        prs.save(str(output_path))
+        with phase("write"):
+            prs.save(str(output_path))
 
         print(f"✅ Generated PowerPoint: {output_path}")
         return str(output_path)
@@ -515,9 +518,9 @@ class PowerPointGenerator:
         for data in financial_data[:3]:  # Show top 3 financial tables
             financial_summary.append(f"• {data.title}")
             if data.table_data and len(data.table_data) > 0:
-                first_row = data.table_data[0]
-                if len(first_row) > 1:
-                    financial_summary.append(f"  Latest: {first_row[0]} - {first_row[1]}")
+                latest = data.columns.latest()
+                if latest:
+                    financial_summary.append(f"  Latest: {latest[0]} - {latest[1]}")
 
         if hasattr(slide.placeholders, 1):
             content_placeholder = slide.placeholders[1]
@@ -531,11 +534,9 @@ class PowerPointGenerator:
         for data in financial_data[:5]:
             if data.table_data and len(data.table_data) > 1:
                 # Look for revenue/profit/growth indicators
-                for row in data.table_data:
-                    row_text = " ".join(row).lower()
-                    if any(indicator in row_text for indicator in ['revenue', 'profit', 'growth']):
-                        highlights.append(f"• {' '.join(row)}")
-                        break
+                row = data.columns.find_row(['revenue', 'profit', 'growth'])
+                if row:
+                    highlights.append(f"• {' '.join(row)}")
 
         if hasattr(slide.placeholders, 1):
             content_placeholder = slide.placeholders[1]
@@ -586,14 +587,7 @@ class PowerPointGenerator:
     def _extract_section_content(self, document: ParsedDocument, keywords: List[str]) -> str:
         """Extract content from sections based on keywords"""
 
-        content_parts = []
-
-        for section in document.sections:
-            section_lower = section.title.lower()
-            for keyword in keywords:
-                if keyword.lower() in section_lower:
-                    content_parts.append(section.content)
-                    break
+        content_parts = [section.content for section in document.section_index.find(keywords)]
 
         return "\n\n".join(content_parts) if content_parts else "Content will be customized based on your specific business details."
 
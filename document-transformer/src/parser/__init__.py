@@ -3,6 +3,10 @@ Parser module for document transformation
 """
 
 from .markdown_parser import MarkdownParser, ParsedDocument, DocumentMetadata, ContentSection, FinancialData, TeamMember
+from .parse_cache import ParseCache
+from .numeric_table import NumericTable, FinancialColumns, parse_numeric_cells
+from .keyword_scanner import KeywordScanner
+from .section_index import SectionIndex, slugify
 
 __all__ = [
     'MarkdownParser',
@@ -10,5 +14,12 @@ __all__ = [
     'DocumentMetadata',
     'ContentSection',
     'FinancialData',
-    'TeamMember'
+    'TeamMember',
+    'ParseCache',
+    'NumericTable',
+    'FinancialColumns',
+    'parse_numeric_cells',
+    'KeywordScanner',
+    'SectionIndex',
+    'slugify'
 ]
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Multi-keyword scanner for document classification
+Counts every occurrence of a fixed keyword list in one pass over the text with an Aho-Corasick automaton
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Set
+
+class KeywordScanner:
+    """Aho-Corasick matcher built once for a keyword list and reused for every text scanned"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+
+        # State 0 is the root; each state maps a character to the next state
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[str]] = [[]]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword)
+
+        # Breadth-first failure links, folded into full transition tables so scanning never backtracks
+        fail = [0] * len(goto)
+        self._transitions: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        for state in queue:
+            transitions = dict(self._transitions[fail[state]])
+            for char, next_state in goto[state].items():
+                fail[next_state] = self._transitions[fail[state]].get(char, 0)
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+                transitions[char] = next_state
+                queue.append(next_state)
+            self._transitions[state] = transitions
+
+        self._outputs = [tuple(output) for output in outputs]
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Occurrences of each keyword in text, overlapping matches included; absent keywords are omitted.
+
+        Matching is case-sensitive, so callers lowercase text and keywords alike.
+        """
+
+        transitions = self._transitions
+        outputs = self._outputs
+        counts = Counter()
+
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                counts.update(outputs[state])
+
+        return dict(counts)
+
+    def find(self, text: str) -> Set[str]:
+        """Keywords that occur in text at least once"""
+
+        return set(self.count(text))
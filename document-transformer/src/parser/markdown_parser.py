@@ -4,13 +4,67 @@ Handles content analysis, structure detection, and metadata extraction
 """
 
 import re
+import mmap
+from collections import deque
 import yaml
 import json
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime
 
+from .numeric_table import FinancialColumns
+from .keyword_scanner import KeywordScanner
+from ..profiling import phase
+
+# Bump whenever parsing output changes so cached documents are invalidated
+PARSER_VERSION = "1.6.0"
+
+# Patterns compiled once at import; per-line patterns are only tried after a cheap first-character check
+_HEADER_PATTERN = re.compile(r'^(#{1,6})\s+(.+)$')  # lines starting with '#'
+_TITLE_PATTERN = re.compile(r'^# (.+)$')
+_TEAM_END_PATTERN = re.compile(r'#{1,3} ')  # lines starting with '#'
+_TEAM_KEYWORDS = ('team', 'founders', 'leadership', 'management')
+_TEAM_KEYWORD_PATTERN = re.compile('|'.join(_TEAM_KEYWORDS), re.IGNORECASE)  # non-ASCII lines only
+_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')  # matched across lines
+_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')  # matched across lines
+_TABLE_SEPARATOR_PATTERN = re.compile(r'^[\s\|\-\:]*$')
+_TEAM_MEMBER_PATTERN = re.compile(r'[\*\-]\s*([^,\n]+?)\s*(?:,\s*([^,\n]+))?')
+_LINE_PATTERN = re.compile(rb'([^\r\n]*)(?:\r\n|\r|\n|\Z)')  # one line of a file and its ending
+_FRONTMATTER_PATTERN = re.compile(r'^---\s*\n(.*?)\n---\s*\n', re.DOTALL)
+_AUTHOR_PATTERN = re.compile(r'(?:author|by):\s*(.+)', re.IGNORECASE)
+_STATUS_PATTERN = re.compile(r'status:\s*(.+)', re.IGNORECASE)
+
+# Section categories matched against section titles
+SECTION_PATTERNS = {
+    'executive_summary': re.compile(r'(executive summary|overview|introduction)', re.IGNORECASE),
+    'problem': re.compile(r'(problem|challenge|opportunity|pain point)', re.IGNORECASE),
+    'solution': re.compile(r'(solution|product|service|offering)', re.IGNORECASE),
+    'market': re.compile(r'(market|industry|sector|landscape)', re.IGNORECASE),
+    'competition': re.compile(r'(competition|competitors|alternatives)', re.IGNORECASE),
+    'business_model': re.compile(r'(business model|revenue model|monetization)', re.IGNORECASE),
+    'team': re.compile(r'(team|founders|leadership|management)', re.IGNORECASE),
+    'financials': re.compile(r'(financial|projections|forecasts|budget)', re.IGNORECASE),
+    'traction': re.compile(r'(traction|milestones|progress|achievements)', re.IGNORECASE),
+    'ask': re.compile(r'(ask|investment|funding|raise)', re.IGNORECASE)
+}
+
+def iter_file_lines(file_path: Path) -> Iterator[str]:
+    """Yield the lines of a UTF-8 file without line endings, reading through a memory map.
+
+    CRLF, LF and a lone CR all end a line, as they do when parse_file normalizes line endings.
+    """
+
+    with open(file_path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Only the current line is copied out of the map, the file itself is never loaded whole
+            for match in _LINE_PATTERN.finditer(mapped):
+                if match.start() == match.end():  # end of file after a line ending
+                    break
+                yield match.group(1).decode('utf-8')
+
 @dataclass
 class DocumentMetadata:
     """Metadata extracted from business documents"""
@@ -25,11 +79,17 @@ class DocumentMetadata:
     status: str = "draft"
     priority: str = "medium"
     tags: List[str] = None
+    source_path: str = ""
 
     def __post_init__(self):
         if self.tags is None:
             self.tags = []
 
+    @property
+    def company_name(self) -> str:
+        """Alias used by the generators and batch processor"""
+        return self.company
+
 @dataclass
 class ContentSection:
     """Represents a section of the document"""
@@ -51,6 +111,26 @@ class FinancialData:
     currency: str = "USD"
     period: str = "annual"
 
+    def __post_init__(self):
+        # Build the columnar view once, when the table is parsed or loaded from the parse cache
+        self.__dict__['_columns'] = FinancialColumns(self.table_data, self.currency, self.period)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The numpy-backed view is rebuilt on first use rather than pickled with every process-backend job
+        state = self.__dict__.copy()
+        state.pop('_columns', None)
+        return state
+
+    @property
+    def columns(self) -> FinancialColumns:
+        """Columnar view of table_data, cached on the object (not a dataclass field) and rebuilt if table_data changes"""
+
+        columns = self.__dict__.get('_columns')
+        if columns is None or columns.source is not self.table_data:
+            columns = FinancialColumns(self.table_data, self.currency, self.period)
+            self.__dict__['_columns'] = columns
+        return columns
+
 @dataclass
 class TeamMember:
     """Team member information"""
@@ -60,6 +140,39 @@ class TeamMember:
     experience: str = ""
     education: str = ""
 
+@dataclass
+class TableSpan:
+    """Where a table sits in the source: its line range, enclosing heading and the lines just before it"""
+    start_line: int
+    end_line: int  # exclusive
+    heading: str = ""
+    preceding_lines: Tuple[str, ...] = ()
+
+@dataclass
+class DocumentTokens:
+    """Structural tokens collected in a single pass over the document"""
+    title: str = ""
+    sections: List[ContentSection] = None
+    tables: List[List[List[str]]] = None
+    table_spans: List[TableSpan] = None  # one per entry in tables
+    images: List[str] = None
+    links: List[str] = None
+    team_candidates: List[str] = None
+
+    def __post_init__(self):
+        if self.sections is None:
+            self.sections = []
+        if self.tables is None:
+            self.tables = []
+        if self.table_spans is None:
+            self.table_spans = []
+        if self.images is None:
+            self.images = []
+        if self.links is None:
+            self.links = []
+        if self.team_candidates is None:
+            self.team_candidates = []
+
 @dataclass
 class ParsedDocument:
     """Complete parsed document structure"""
@@ -83,11 +196,24 @@ class ParsedDocument:
         if self.links is None:
             self.links = []
 
+    @property
+    def section_index(self) -> 'SectionIndex':
+        """Section tree and lookup indexes, built on first use and cached on the object (not a dataclass field)"""
+
+        from .section_index import SectionIndex
+
+        index = self.__dict__.get('_section_index')
+        if index is None or index.source is not self.sections or len(index.sections) != len(self.sections):
+            index = SectionIndex(self.sections)
+            self.__dict__['_section_index'] = index
+        return index
+
 class MarkdownParser:
     """Intelligent parser for business markdown documents"""
 
-    def __init__(self, config=None):
+    def __init__(self, config=None, cache=None):
         self.config = config
+        self.cache = cache
         self.financial_keywords = [
             'revenue', 'expenses', 'profit', 'loss', 'income', 'cost',
             'budget', 'forecast', 'projection', 'investment', 'funding',
@@ -99,50 +225,143 @@ class MarkdownParser:
             'board', 'executives', 'key personnel', 'staff'
         ]
 
-        self.section_patterns = {
-            'executive_summary': r'(executive summary|overview|introduction)',
-            'problem': r'(problem|challenge|opportunity|pain point)',
-            'solution': r'(solution|product|service|offering)',
-            'market': r'(market|industry|sector|landscape)',
-            'competition': r'(competition|competitors|alternatives)',
-            'business_model': r'(business model|revenue model|monetization)',
-            'team': r'(team|founders|leadership|management)',
-            'financials': r'(financial|projections|forecasts|budget)',
-            'traction': r'(traction|milestones|progress|achievements)',
-            'ask': r'(ask|investment|funding|raise)'
+        self.section_patterns = SECTION_PATTERNS
+
+        self.industry_keywords = {
+            'agritech': ['agriculture', 'farming', 'crop', 'soil', 'harvest', 'agricultural'],
+            'telecom': ['telecom', 'communication', 'network', 'fiber', 'broadband', 'connectivity'],
+            'saas': ['software', 'saas', 'platform', 'subscription', 'cloud', 'digital'],
+            'finance': ['finance', 'fintech', 'banking', 'payments', 'financial services'],
+            'healthcare': ['health', 'medical', 'healthcare', 'hospital', 'pharmaceutical'],
+            'retail': ['retail', 'ecommerce', 'shopping', 'consumer', 'store'],
+            'manufacturing': ['manufacturing', 'production', 'factory', 'industrial']
         }
 
+        # Phrases checked in order by the fallback document type detection
+        self.document_type_phrases = [
+            ('investor_teaser', ['teaser', 'one pager']),
+            ('pitch_deck', ['pitch deck', 'presentation']),
+            ('financial_projections', ['financial', 'projections', 'revenue']),
+            ('business_plan', ['business plan']),
+            ('market_research', ['market research', 'market analysis'])
+        ]
+
+        # One automaton per keyword family, so classification is a single pass however long the lists grow
+        self._classification_vocabulary = None
+        self.classification_scanner = self._get_classification_scanner()
+        self.financial_scanner = KeywordScanner(self.financial_keywords)
+
+    def _get_classification_scanner(self) -> KeywordScanner:
+        """Scanner over industry keywords, type phrases and the config vocabulary, rebuilt when the config changes"""
+
+        vocabulary = self.config.get_document_type_keywords() if self.config is not None else []
+        if vocabulary != self._classification_vocabulary:
+            classification_keywords = [keyword for keywords in self.industry_keywords.values() for keyword in keywords]
+            classification_keywords.extend(phrase for _, phrases in self.document_type_phrases for phrase in phrases)
+            classification_keywords.extend(vocabulary)
+            self.classification_scanner = KeywordScanner(classification_keywords)
+            self._classification_vocabulary = vocabulary
+        return self.classification_scanner
+
     def parse_file(self, file_path: Path) -> ParsedDocument:
         """Parse a markdown file and extract all relevant information"""
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with phase("parse"):
+            if self.cache is None:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+
+                return self.parse_content(content, file_path)
+
+            with open(file_path, 'rb') as f:
+                raw_content = f.read()
+
+            # Cached documents are path independent, path metadata is applied on top
+            cache_key = self.cache.make_key(raw_content, self._cache_namespace())
+            document = self.cache.get(cache_key)
+            if document is None:
+                content = raw_content.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                document = self.parse_content(content)
+                try:
+                    self.cache.put(cache_key, document)
+                except (TypeError, ValueError):
+                    # Front matter values the cache cannot store only cost the cache entry
+                    pass
 
-        return self.parse_content(content, file_path)
+            self._apply_source_metadata(document.metadata, file_path)
+            return document
+
+    def iter_sections(self, file_path: Path) -> Iterator[ContentSection]:
+        """Stream the sections of a markdown file one at a time.
+
+        The file is memory-mapped and only the section being built is held in memory, so very large
+        files can be walked without loading them. Sections match those of parse_file.
+        """
+
+        current_section = None
+        current_content = []
+
+        for line in iter_file_lines(file_path):
+            header = self._match_header(line)
+            if header:
+                if current_section:
+                    current_section.content = '\n'.join(current_content).strip()
+                    yield current_section
+
+                current_section = ContentSection(title=header[1], level=header[0], content="")
+                current_content = []
+            elif current_section and not line.startswith('---'):
+                current_content.append(line)
+
+        if current_section:
+            current_section.content = '\n'.join(current_content).strip()
+            yield current_section
+
+    def _match_header(self, line: str) -> Optional[Tuple[int, str]]:
+        """Return (level, title) if the line is a markdown header"""
+
+        if not line.startswith('#'):
+            return None
+
+        header_match = _HEADER_PATTERN.match(line)
+        if not header_match:
+            return None
+
+        return len(header_match.group(1)), header_match.group(2).strip()
+
+    def _cache_namespace(self) -> str:
+        """Identify parser settings that affect the parsed output"""
+
+        # Document type classification depends on the configured vocabulary, not just on having a config
+        vocabulary = json.dumps(self.config.DOCUMENT_TYPES, sort_keys=True) if self.config else 'default'
+        return f"{PARSER_VERSION}:{vocabulary}"
 
     def parse_content(self, content: str, source_path: Optional[Path] = None) -> ParsedDocument:
         """Parse markdown content and return structured document"""
 
+        # Tokenize once, every extractor works from the same tokens
+        tokens = self._tokenize(content)
+
         # Extract metadata
-        metadata = self._extract_metadata(content, source_path)
+        metadata = self._extract_metadata(content, source_path, tokens)
 
         # Extract sections
-        sections = self._extract_sections(content)
+        sections = self._extract_sections(content, tokens)
 
         # Extract financial data
-        financial_data = self._extract_financial_data(content)
+        financial_data = self._extract_financial_data(content, tokens)
 
         # Extract team information
-        team_members = self._extract_team_info(content)
+        team_members = self._extract_team_info(content, tokens)
 
         # Extract tables
-        tables = self._extract_tables(content)
+        tables = self._extract_tables(content, tokens)
 
         # Extract images
-        images = self._extract_images(content)
+        images = self._extract_images(content, tokens)
 
         # Extract links
-        links = self._extract_links(content)
+        links = self._extract_links(content, tokens)
 
         return ParsedDocument(
             metadata=metadata,
@@ -154,13 +373,105 @@ class MarkdownParser:
             links=links
         )
 
-    def _extract_metadata(self, content: str, source_path: Optional[Path] = None) -> DocumentMetadata:
+    def _tokenize(self, content: str) -> DocumentTokens:
+        """Walk the document line by line and collect all structural tokens"""
+
+        tokens = DocumentTokens()
+
+        current_section = None
+        current_content = []
+        table_lines = []
+        table_span = None
+        recent_lines = deque(maxlen=3)  # context kept for table titles
+        team_state = None  # None: looking for team keyword, True: collecting, False: done
+
+        def close_table(end_line: int):
+            table = self._parse_table(table_lines)
+            if table:
+                table_span.end_line = end_line
+                tokens.tables.append(table)
+                tokens.table_spans.append(table_span)
+
+        lines = content.split('\n')
+        for line_number, line in enumerate(lines):
+            # Headers open a new section
+            header = self._match_header(line)
+            if header:
+                if current_section:
+                    current_section.content = '\n'.join(current_content).strip()
+                    tokens.sections.append(current_section)
+
+                level, title = header
+                current_section = ContentSection(title=title, level=level, content="")
+                current_content = []
+
+                if not tokens.title:
+                    title_match = _TITLE_PATTERN.match(line)
+                    if title_match:
+                        tokens.title = title_match.group(1).strip()
+            else:
+                # Skip YAML frontmatter
+                if not line.startswith('---'):
+                    current_content.append(line)
+
+            # A header row followed by a separator row starts a table; consecutive rows continue it
+            if self._is_table_row(line) and (
+                    table_lines or line_number + 1 < len(lines) and self._is_table_separator(lines[line_number + 1])):
+                if not table_lines:
+                    table_span = TableSpan(line_number, line_number + 1,
+                                           current_section.title if current_section else "", tuple(recent_lines))
+                table_lines.append(line)
+            elif table_lines:
+                close_table(line_number)
+                table_lines = []
+
+            # Team block runs from the first team keyword to the next h1-h3
+            if team_state is None:
+                if self._has_team_keyword(line):
+                    team_state = True
+            elif team_state:
+                if line.startswith('#') and _TEAM_END_PATTERN.match(line):
+                    team_state = False
+                elif line.startswith(('*', '-')):
+                    tokens.team_candidates.append(line)
+
+            recent_lines.append(line)
+
+        # Save last section
+        if current_section:
+            current_section.content = '\n'.join(current_content).strip()
+            tokens.sections.append(current_section)
+
+        # Handle table at end of file
+        if table_lines:
+            close_table(line_number + 1)
+
+        # Images and links may span lines, so they are matched over the whole document
+        tokens.images = [match[1] for match in _IMAGE_PATTERN.findall(content)]
+        tokens.links = [match[1] for match in _LINK_PATTERN.findall(content)]
+
+        return tokens
+
+    def _has_team_keyword(self, line: str) -> bool:
+        """Case-insensitive team keyword check; ASCII lines skip the much slower IGNORECASE regex"""
+
+        if line.isascii():
+            line_lower = line.lower()
+            return any(keyword in line_lower for keyword in _TEAM_KEYWORDS)
+
+        return _TEAM_KEYWORD_PATTERN.search(line) is not None
+
+    def _extract_metadata(self, content: str, source_path: Optional[Path] = None,
+                          tokens: Optional[DocumentTokens] = None) -> DocumentMetadata:
         """Extract metadata from document content and file path"""
 
+        if tokens is None:
+            tokens = self._tokenize(content)
+
         metadata = DocumentMetadata()
 
         # Extract YAML frontmatter if present
-        yaml_match = re.match(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL)
+        yaml_match = _FRONTMATTER_PATTERN.match(content)
         if yaml_match:
             try:
                 yaml_data = yaml.safe_load(yaml_match.group(1))
@@ -172,94 +483,70 @@ class MarkdownParser:
 
         # Extract from file path
         if source_path:
-            path_parts = source_path.parts
-            if len(path_parts) >= 2:
-                metadata.company = self._extract_company_name(source_path)
-                metadata.project = self._extract_project_name(source_path)
+            self._apply_source_metadata(metadata, source_path)
 
         # Extract title from first H1 if not in metadata
         if not metadata.title:
-            title_match = re.search(r'^# (.+)$', content, re.MULTILINE)
-            if title_match:
-                metadata.title = title_match.group(1).strip()
+            metadata.title = tokens.title
+
+        # Count classification keywords in one pass over a single lowercased copy
+        content_lower = content.lower()
+        keyword_counts = self._get_classification_scanner().count(content_lower)
 
         # Detect document type
-        metadata.document_type = self._detect_document_type(content)
+        metadata.document_type = self._detect_document_type(content, tokens, content_lower, keyword_counts)
 
         # Detect industry
-        metadata.industry = self._detect_industry(content)
-
-        # Extract dates
-        if source_path and source_path.exists():
-            metadata.last_modified = datetime.fromtimestamp(
-                source_path.stat().st_mtime
-            ).isoformat()
+        metadata.industry = self._detect_industry(content, keyword_counts)
 
         # Extract author if present
-        author_match = re.search(r'(?:author|by):\s*(.+)', content, re.IGNORECASE)
+        author_match = _AUTHOR_PATTERN.search(content)
         if author_match:
             metadata.author = author_match.group(1).strip()
 
         # Extract status
-        status_match = re.search(r'status:\s*(.+)', content, re.IGNORECASE)
+        status_match = _STATUS_PATTERN.search(content)
         if status_match:
             metadata.status = status_match.group(1).strip().lower()
 
         return metadata
 
-    def _extract_sections(self, content: str) -> List[ContentSection]:
-        """Extract document sections based on headers"""
+    def _apply_source_metadata(self, metadata: DocumentMetadata, source_path: Path):
+        """Fill in metadata derived from the file path and file stats"""
 
-        lines = content.split('\n')
-        sections = []
-        current_section = None
-        current_content = []
+        metadata.source_path = str(source_path)
 
-        for line in lines:
-            # Check for headers
-            header_match = re.match(r'^(#{1,6})\s+(.+)$', line)
-            if header_match:
-                # Save previous section
-                if current_section:
-                    current_section.content = '\n'.join(current_content).strip()
-                    sections.append(current_section)
+        path_parts = source_path.parts
+        if len(path_parts) >= 2:
+            metadata.company = self._extract_company_name(source_path)
+            metadata.project = self._extract_project_name(source_path)
 
-                # Start new section
-                level = len(header_match.group(1))
-                title = header_match.group(2).strip()
-                current_section = ContentSection(title=title, level=level, content="")
-                current_content = []
-            else:
-                # Skip YAML frontmatter
-                if not line.startswith('---'):
-                    current_content.append(line)
+        # Extract dates
+        if source_path.exists():
+            metadata.last_modified = datetime.fromtimestamp(
+                source_path.stat().st_mtime
+            ).isoformat()
 
-        # Save last section
-        if current_section:
-            current_section.content = '\n'.join(current_content).strip()
-            sections.append(current_section)
+    def _extract_sections(self, content: str, tokens: Optional[DocumentTokens] = None) -> List[ContentSection]:
+        """Extract document sections based on headers"""
+
+        if tokens is None:
+            tokens = self._tokenize(content)
 
-        return sections
+        return tokens.sections
 
-    def _extract_financial_data(self, content: str) -> List[FinancialData]:
+    def _extract_financial_data(self, content: str, tokens: Optional[DocumentTokens] = None) -> List[FinancialData]:
         """Extract financial data from tables and content"""
 
+        if tokens is None:
+            tokens = self._tokenize(content)
+
         financial_data = []
 
         # Find financial tables
-        tables = self._extract_tables(content)
-        for i, table in enumerate(tables):
+        for i, (table, span) in enumerate(zip(tokens.tables, tokens.table_spans)):
             if self._is_financial_table(table):
-                title = f"Financial Data {i+1}"
-
-                # Try to extract title from preceding text
-                table_start = content.find('\n'.join(['|'.join(row) for row in table]))
-                if table_start > 0:
-                    preceding_text = content[:table_start].split('\n')[-3:]
-                    for line in reversed(preceding_text):
-                        if line.strip() and any(keyword in line.lower() for keyword in self.financial_keywords):
-                            title = line.strip('# ').strip()
-                            break
+                title = self._get_table_title(span) or f"Financial Data {i+1}"
 
                 financial_data.append(FinancialData(
                     table_data=table,
@@ -269,68 +556,61 @@ class MarkdownParser:
 
         return financial_data
 
-    def _extract_team_info(self, content: str) -> List[TeamMember]:
-        """Extract team member information"""
+    def _get_table_title(self, span: TableSpan) -> str:
+        """Title a table from a financial line just above it, falling back to its enclosing heading"""
 
-        team_members = []
+        for line in reversed(span.preceding_lines):
+            if line.strip() and any(keyword in line.lower() for keyword in self.financial_keywords):
+                return line.strip('# ').strip()
 
-        # Look for team sections
-        team_section_match = re.search(
-            r'(?:team|founders|leadership|management)[\s\S]*?(?=\n#{1,3} |\Z)',
-            content,
-            re.IGNORECASE
-        )
+        return span.heading
 
-        if team_section_match:
-            team_content = team_section_match.group(0)
+    def _extract_team_info(self, content: str, tokens: Optional[DocumentTokens] = None) -> List[TeamMember]:
+        """Extract team member information"""
 
-            # Pattern for team member information
-            member_pattern = r'(?:^|\n)[\*\-]\s*([^,\n]+?)\s*(?:,\s*([^,\n]+))?'
-            matches = re.findall(member_pattern, team_content)
+        if tokens is None:
+            tokens = self._tokenize(content)
 
-            for match in matches:
-                name = match[0].strip()
-                title = match[1].strip() if len(match) > 1 and match[1] else ""
+        team_members = []
 
-                if name and len(name.split()) >= 2:  # Likely a real name
-                    team_member = TeamMember(
-                        name=name,
-                        title=title
-                    )
-                    team_members.append(team_member)
+        for line in tokens.team_candidates:
+            match = _TEAM_MEMBER_PATTERN.match(line)
+            if not match:
+                continue
+
+            name = match.group(1).strip()
+            title = match.group(2).strip() if match.group(2) else ""
+
+            if name and len(name.split()) >= 2:  # Likely a real name
+                team_member = TeamMember(
+                    name=name,
+                    title=title
+                )
+                team_members.append(team_member)
 
         return team_members
 
-    def _extract_tables(self, content: str) -> List[List[List[str]]]:
+    def _extract_tables(self, content: str, tokens: Optional[DocumentTokens] = None) -> List[List[List[str]]]:
         """Extract markdown tables"""
 
-        tables = []
-        table_lines = []
-        in_table = False
+        if tokens is None:
+            tokens = self._tokenize(content)
 
-        lines = content.split('\n')
-        for line in lines:
-            if '|' in line and ('|' in line.split('|')[1] if len(line.split('|')) > 2 else False):
-                # This looks like a table row
-                if not in_table:
-                    in_table = True
-                table_lines.append(line)
-            elif in_table:
-                # Table ended
-                if table_lines:
-                    table = self._parse_table(table_lines)
-                    if table:
-                        tables.append(table)
-                table_lines = []
-                in_table = False
+        return tokens.tables
 
-        # Handle table at end of file
-        if table_lines:
-            table = self._parse_table(table_lines)
-            if table:
-                tables.append(table)
+    def _is_table_row(self, line: str) -> bool:
+        """Check if a line looks like a markdown table row.
+
+        Rows only form a table after a header row and a separator row, see _is_table_separator. The original
+        check looked for a pipe inside a single split cell, so it never matched and documents parsed before
+        1.5.0 carry no tables.
+        """
+
+        return line.count('|') >= 2
 
-        return tables
+    def _is_table_separator(self, line: str) -> bool:
+        """Check if a line is a markdown table separator row such as |---|:--:|"""
+        return '|' in line and '-' in line and bool(_TABLE_SEPARATOR_PATTERN.match(line))
 
     def _parse_table(self, table_lines: List[str]) -> List[List[str]]:
         """Parse table lines into 2D array"""
@@ -339,7 +619,7 @@ class MarkdownParser:
         for line in table_lines:
             if line.strip() and '|' in line:
                 # Skip separator lines (e.g., |---|---|)
-                if not re.match(r'^[\s\|\-\:]*$', line):
+                if not _TABLE_SEPARATOR_PATTERN.match(line):
                     cells = [cell.strip() for cell in line.split('|')]
                     # Remove empty cells at start and end
                     if cells and not cells[0]:
@@ -351,25 +631,25 @@ class MarkdownParser:
 
         return table
 
-    def _extract_images(self, content: str) -> List[str]:
+    def _extract_images(self, content: str, tokens: Optional[DocumentTokens] = None) -> List[str]:
         """Extract image references"""
 
+        if tokens is None:
+            tokens = self._tokenize(content)
+
         # Markdown images: ![alt](src)
-        img_pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
-        matches = re.findall(img_pattern, content)
-        return [match[1] for match in matches]
+        return list(tokens.images)
 
-    def _extract_links(self, content: str) -> List[str]:
+    def _extract_links(self, content: str, tokens: Optional[DocumentTokens] = None) -> List[str]:
         """Extract web links"""
 
-        # Markdown links: [text](url)
-        link_pattern = r'\[([^\]]+)\]\(([^)]+)\)'
-        matches = re.findall(link_pattern, content)
+        if tokens is None:
+            tokens = self._tokenize(content)
 
+        # Markdown links: [text](url)
         # Filter out images and internal links
         links = []
-        for match in matches:
-            url = match[1]
+        for url in tokens.links:
             if not url.startswith(('http://', 'https://')):
                 continue
             if url.endswith(('.png', '.jpg', '.jpeg', '.gif', '.svg')):
@@ -386,50 +666,40 @@ class MarkdownParser:
 
         # Check headers and content for financial keywords
         all_text = ' '.join([' '.join(row) for row in table]).lower()
-        financial_count = sum(1 for keyword in self.financial_keywords if keyword in all_text)
+        financial_count = len(self.financial_scanner.count(all_text))
 
         return financial_count >= 2
 
-    def _detect_document_type(self, content: str) -> str:
+    def _detect_document_type(self, content: str, tokens: Optional[DocumentTokens] = None,
+                              content_lower: Optional[str] = None,
+                              keyword_counts: Optional[Dict[str, int]] = None) -> str:
         """Detect document type based on content analysis"""
 
-        content_lower = content.lower()
+        if content_lower is None:
+            content_lower = content.lower()
+        if keyword_counts is None:
+            keyword_counts = self._get_classification_scanner().count(content_lower)
 
         if self.config:
-            return self.config.get_document_type([], content_lower, len(self._extract_tables(content)) > 0)
-
-        # Fallback detection
-        if 'teaser' in content_lower or 'one pager' in content_lower:
-            return 'investor_teaser'
-        elif 'pitch deck' in content_lower or 'presentation' in content_lower:
-            return 'pitch_deck'
-        elif any(keyword in content_lower for keyword in ['financial', 'projections', 'revenue']):
-            return 'financial_projections'
-        elif 'business plan' in content_lower:
-            return 'business_plan'
-        elif 'market research' in content_lower or 'market analysis' in content_lower:
-            return 'market_research'
-        else:
-            return 'business_plan'
-
-    def _detect_industry(self, content: str) -> str:
-        """Detect industry based on content keywords"""
+            has_tables = len(self._extract_tables(content, tokens)) > 0
+            return self.config.get_document_type([], content_lower, has_tables, keyword_counts)
 
-        content_lower = content.lower()
+        # Fallback detection, first matching type wins
+        for document_type, phrases in self.document_type_phrases:
+            if any(phrase in keyword_counts for phrase in phrases):
+                return document_type
 
-        industry_keywords = {
-            'agritech': ['agriculture', 'farming', 'crop', 'soil', 'harvest', 'agricultural'],
-            'telecom': ['telecom', 'communication', 'network', 'fiber', 'broadband', 'connectivity'],
-            'saas': ['software', 'saas', 'platform', 'subscription', 'cloud', 'digital'],
-            'finance': ['finance', 'fintech', 'banking', 'payments', 'financial services'],
-            'healthcare': ['health', 'medical', 'healthcare', 'hospital', 'pharmaceutical'],
-            'retail': ['retail', 'ecommerce', 'shopping', 'consumer', 'store'],
-            'manufacturing': ['manufacturing', 'production', 'factory', 'industrial']
-        }
+        return 'business_plan'
+
+    def _detect_industry(self, content: str, keyword_counts: Optional[Dict[str, int]] = None) -> str:
+        """Detect industry based on content keywords"""
+
+        if keyword_counts is None:
+            keyword_counts = self._get_classification_scanner().count(content.lower())
 
         industry_scores = {}
-        for industry, keywords in industry_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in content_lower)
+        for industry, keywords in self.industry_keywords.items():
+            score = sum(1 for keyword in keywords if keyword in keyword_counts)
             industry_scores[industry] = score
 
         if industry_scores:
@@ -0,0 +1,249 @@
+"""
+Numeric parsing of financial tables
+Converts table cells such as "$1,200", "-R0.35M", "(4.5k)" or "**12%**" into NumPy arrays in one vectorized pass
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Magnitude suffixes, checked after any percent sign is removed
+SCALE_SUFFIXES = {'k': 1e3, 'K': 1e3, 'm': 1e6, 'M': 1e6, 'b': 1e9, 'B': 1e9}
+
+# Currency prefixes and the currencies they stand for
+CURRENCY_SYMBOLS = {'$': 'USD', 'R': 'ZAR'}
+
+# Characters dropped anywhere in a cell (markdown emphasis, thousands separators, spaces),
+# and the unicode minus sign mapped to "-"
+_CELL_TRANSLATION = str.maketrans({'*': None, ',': None, ' ': None, '\t': None, '\u00a0': None, '\u2212': '-'})
+
+# Period labels by frequency, matched against header or label cells without markdown emphasis
+_PERIOD_PATTERNS = [
+    ('quarterly', re.compile(r"^(q[1-4]\b|quarter\s*\d)", re.IGNORECASE)),
+    ('monthly', re.compile(r"^(month\s*\d+|m\d+$|(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b)",
+                           re.IGNORECASE)),
+    ('annual', re.compile(r"^((fy\s*)?'?\d{2}(\d{2})?[ae]?$|year\s*\d+|y\d+$)", re.IGNORECASE))
+]
+
+def parse_numeric_cells(cells: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Parse cell strings, returning float values (NaN where not numeric), a valid mask,
+    a percent mask and each cell's currency symbol ('' if none)"""
+
+    if not len(cells):
+        return np.full(0, np.nan), np.zeros(0, dtype=bool), np.zeros(0, dtype=bool), np.full(0, '')
+
+    # One translate over all cells is much cheaper than an array-wide replace per character
+    cleaned = '\n'.join(cells).translate(_CELL_TRANSLATION).split('\n')
+    text = np.array(cleaned, dtype=np.str_)
+
+    # Accounting negatives: (1,200)
+    opens = np.char.startswith(text, '(')
+    closes = np.char.endswith(text, ')')
+    text = np.char.strip(text, '()')
+
+    # Trailing "+" as in "R72M+" or "24+"
+    text = np.char.rstrip(text, '+')
+
+    percent = np.char.endswith(text, '%')
+    text = np.char.rstrip(text, '%')
+
+    # Sign, then an optional currency prefix, then a sign again for "R-5"
+    negative = np.char.startswith(text, '-')
+    text = np.char.lstrip(text, '+-')
+    symbols = np.full(text.shape, '')
+    for symbol in CURRENCY_SYMBOLS:
+        symbols[np.char.startswith(text, symbol)] = symbol
+    text = np.char.lstrip(text, ''.join(CURRENCY_SYMBOLS))
+    negative |= np.char.startswith(text, '-')
+    text = np.char.lstrip(text, '+-')
+
+    scale = np.ones(text.shape)
+    for suffix, factor in SCALE_SUFFIXES.items():
+        scale[np.char.endswith(text, suffix)] = factor
+    text = np.char.rstrip(text, ''.join(SCALE_SUFFIXES))
+
+    # What remains must be digits with at most one decimal point
+    digits = np.char.replace(text, '.', '', count=1)
+    valid = np.char.isdecimal(digits) & (np.char.str_len(digits) > 0) & (opens == closes)
+
+    values = np.full(text.shape, np.nan)
+    values[valid] = np.array(text[valid].tolist(), dtype=np.float64) * scale[valid]
+    values[negative | opens] *= -1
+
+    return values, valid, percent & valid, np.where(valid, symbols, '')
+
+class NumericTable:
+    """A table's cells parsed once into typed arrays, indexed [row, column]"""
+
+    def __init__(self, table_data: List[List[str]]):
+        self.headers = table_data[0] if table_data else []
+        self.rows = table_data[1:]
+
+        # Pad ragged rows; present marks cells that exist in the source table
+        width = max((len(row) for row in table_data), default=0)
+        lengths = np.array([len(row) for row in self.rows], dtype=np.int64)
+        self.present = np.arange(width) < lengths[:, np.newaxis]
+
+        cells = [cell for row in self.rows for cell in row + [''] * (width - len(row))]
+        shape = (len(self.rows), width)
+        values, valid, percent, symbols = parse_numeric_cells(cells)
+        self.values = values.reshape(shape)
+        self.valid = valid.reshape(shape)
+        self.percent = percent.reshape(shape)
+        self.symbols = symbols.reshape(shape)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    def column_values(self, column: int) -> np.ndarray:
+        """The numeric values of a column, skipping cells that are not numbers"""
+        return self.values[self.valid[:, column], column]
+
+    def numeric_count(self, column: int, max_rows: int = None) -> int:
+        """Number of numeric cells in a column, optionally only in the first max_rows rows"""
+        return int(np.count_nonzero(self.valid[:max_rows, column]))
+
+    def text_count(self, column: int, max_rows: int = None) -> int:
+        """Number of non-numeric cells in a column, optionally only in the first max_rows rows"""
+        return int(np.count_nonzero(self.present[:max_rows, column] & ~self.valid[:max_rows, column]))
+
+def detect_period(label: str) -> Optional[str]:
+    """Frequency of a period label such as "2025", "FY24", "Q3", "Month 7" or "Year 2", or None"""
+
+    label = label.strip('* ')
+    for frequency, pattern in _PERIOD_PATTERNS:
+        if pattern.match(label):
+            return frequency
+    return None
+
+class FinancialColumns:
+    """Columnar view of a financial table: typed columns, label and data columns, units, currency and periods"""
+
+    def __init__(self, table_data: List[List[str]], default_currency: str = "USD", default_period: str = "annual"):
+        self.source = table_data
+        self.table = NumericTable(table_data)
+        self.headers = self.table.headers
+        self.rows = self.table.rows
+
+        self.label_column = self._find_label_column()
+        self.data_columns = [
+            i for i in range(len(self.headers))
+            if i != self.label_column and self._is_numeric_column(i)
+        ]
+        self.units = {column: self._column_unit(column) for column in self.data_columns}
+        self.currency = self._detect_currency() or default_currency
+
+        # Periods run either across the header (Metric | 2024 | 2025) or down the label column
+        self.period_axis: Optional[str] = None
+        self.period_columns: List[int] = []
+        self.periods: List[str] = []
+        self.period = default_period
+        self._detect_periods()
+
+    def _is_text_column(self, column: int) -> bool:
+        """Check if a column holds text in most of its first 5 rows"""
+        if not self.rows or column >= len(self.rows[0]):
+            return False
+        return self.table.text_count(column, 5) > len(self.rows[:5]) * 0.7
+
+    def _is_numeric_column(self, column: int) -> bool:
+        """Check if a column holds numbers in most of its first 5 rows"""
+        if not self.rows or column >= len(self.rows[0]):
+            return False
+        return self.table.numeric_count(column, 5) > len(self.rows[:5]) * 0.5
+
+    def _find_label_column(self) -> Optional[int]:
+        """The first text column, usually holding row labels"""
+
+        for column in range(len(self.headers)):
+            if self._is_text_column(column):
+                return column
+        return None
+
+    def _column_unit(self, column: int) -> str:
+        """Unit of a data column: percent, currency or number"""
+
+        valid = self.table.valid[:, column]
+        count = np.count_nonzero(valid)
+        if np.count_nonzero(self.table.percent[:, column]) * 2 > count:
+            return 'percent'
+        if np.count_nonzero(self.table.symbols[valid, column] != '') * 2 > count:
+            return 'currency'
+        return 'number'
+
+    def _detect_currency(self) -> Optional[str]:
+        """Currency of the most common symbol in the table"""
+
+        symbols = Counter(self.table.symbols[self.table.symbols != ''].tolist())
+        if not symbols:
+            return None
+        return CURRENCY_SYMBOLS[symbols.most_common(1)[0][0]]
+
+    def _detect_periods(self):
+        """Find a period axis in the header row or the label column"""
+
+        header_periods = {
+            column: detect_period(self.headers[column])
+            for column in range(len(self.headers)) if column != self.label_column
+        }
+        header_periods = {column: frequency for column, frequency in header_periods.items() if frequency}
+        if len(header_periods) >= 2 and len(header_periods) * 2 > len(self.headers) - 1:
+            self.period_axis = 'columns'
+            self.period_columns = sorted(header_periods)
+            self.periods = [self.headers[column] for column in self.period_columns]
+            self.period = Counter(header_periods.values()).most_common(1)[0][0]
+            return
+
+        if self.label_column is None:
+            return
+        row_periods = [detect_period(row[self.label_column]) if self.label_column < len(row) else None
+                       for row in self.rows]
+        found = [frequency for frequency in row_periods if frequency]
+        if len(found) >= 2 and len(found) * 2 > len(self.rows):
+            self.period_axis = 'rows'
+            self.periods = [row[self.label_column] for row, frequency in zip(self.rows, row_periods) if frequency]
+            self.period = Counter(found).most_common(1)[0][0]
+
+    def column_values(self, column: int) -> np.ndarray:
+        """The numeric values of a column, skipping cells that are not numbers"""
+        return self.table.column_values(column)
+
+    def series(self, column: int) -> Tuple[List[str], List[float]]:
+        """Row labels and values of a data column, for rows where it holds a number"""
+
+        if self.label_column is None:
+            return [], []
+
+        row_indexes = np.flatnonzero(self.table.valid[:, column])
+        labels = [self.rows[i][self.label_column] for i in row_indexes]
+        return labels, self.table.values[row_indexes, column].tolist()
+
+    def find_row(self, keywords: Sequence[str]) -> Optional[List[str]]:
+        """The first data row whose text mentions any of the keywords"""
+
+        for row in self.rows:
+            row_text = " ".join(row).lower()
+            if any(keyword in row_text for keyword in keywords):
+                return row
+        return None
+
+    def latest(self) -> Optional[Tuple[str, str]]:
+        """Label and cell text of the most recent value in the first series"""
+
+        if self.period_axis == 'columns' and self.rows:
+            columns = [column for column in self.period_columns if self.table.valid[0, column]]
+            if columns:
+                label = self.rows[0][self.label_column] if self.label_column is not None else ''
+                return f"{label} {self.headers[columns[-1]]}".strip(), self.rows[0][columns[-1]]
+
+        if self.label_column is not None and self.data_columns:
+            column = self.data_columns[0]
+            row_indexes = np.flatnonzero(self.table.valid[:, column])
+            if row_indexes.size:
+                row = self.rows[row_indexes[-1]]
+                return row[self.label_column], row[column]
+
+        return None
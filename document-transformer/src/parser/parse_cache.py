@@ -0,0 +1,78 @@
+"""
+Content-addressed cache for parsed documents
+Stores serialized ParsedDocument objects on disk keyed by file content hash
+"""
+
+import json
+import hashlib
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Any
+from dataclasses import asdict
+
+from .markdown_parser import (
+    ParsedDocument, DocumentMetadata, ContentSection, FinancialData, TeamMember
+)
+from ..caching import DiskLRUStore
+
+def _encode_value(value: Any) -> Dict[str, str]:
+    """Encode front matter values JSON has no type for, such as YAML dates"""
+
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _decode_value(data: Dict[str, Any]) -> Any:
+    """Restore values encoded by _encode_value"""
+
+    if len(data) == 1:
+        if "__datetime__" in data:
+            return datetime.fromisoformat(data["__datetime__"])
+        if "__date__" in data:
+            return date.fromisoformat(data["__date__"])
+    return data
+
+class ParseCache(DiskLRUStore):
+    """On-disk LRU cache of parsed documents, bounded by total size"""
+
+    def __init__(self, cache_dir: Path, max_size_mb: int = 256):
+        super().__init__(cache_dir, max_size_mb, suffix=".json")
+
+    def make_key(self, raw_content: bytes, namespace: str) -> str:
+        """Build a cache key from file bytes and the parser namespace"""
+
+        digest = hashlib.sha256(raw_content)
+        digest.update(b"\0" + namespace.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _serialize(self, document: ParsedDocument) -> bytes:
+        return json.dumps(asdict(document), ensure_ascii=False, default=_encode_value).encode('utf-8')
+
+    def _deserialize(self, payload: bytes) -> ParsedDocument:
+        return self._document_from_dict(json.loads(payload.decode('utf-8'), object_hook=_decode_value))
+
+    def _document_from_dict(self, data: Dict[str, Any]) -> ParsedDocument:
+        """Rebuild a ParsedDocument from its serialized form"""
+
+        return ParsedDocument(
+            metadata=DocumentMetadata(**data["metadata"]),
+            sections=[self._section_from_dict(section) for section in data["sections"]],
+            financial_data=[FinancialData(**financial) for financial in data["financial_data"]],
+            team_members=[TeamMember(**member) for member in data["team_members"]],
+            tables=data["tables"],
+            images=data["images"],
+            links=data["links"]
+        )
+
+    def _section_from_dict(self, data: Dict[str, Any]) -> ContentSection:
+        """Rebuild a ContentSection and its subsections"""
+
+        subsections = [self._section_from_dict(sub) for sub in data.get("subsections") or []]
+        return ContentSection(
+            title=data["title"],
+            content=data["content"],
+            level=data["level"],
+            subsections=subsections
+        )
@@ -0,0 +1,122 @@
+"""
+Section tree and lookup indexes
+Nests a document's flat header sections into a tree and indexes them by slug, level and category in one pass
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .markdown_parser import ContentSection, SECTION_PATTERNS
+
+_SLUG_STRIP_PATTERN = re.compile(r'[^\w\s-]')
+_SLUG_SEPARATOR_PATTERN = re.compile(r'[-\s]+')
+
+def slugify(text: str) -> str:
+    """Convert text to URL-friendly slug"""
+
+    text = text.lower()
+    text = _SLUG_STRIP_PATTERN.sub('', text)
+    text = _SLUG_SEPARATOR_PATTERN.sub('-', text)
+    return text.strip('-')
+
+class SectionIndex:
+    """Section tree with slug, level, category and title keyword lookups, built once per section list"""
+
+    def __init__(self, sections: Sequence[ContentSection]):
+        self.source = sections
+        self.sections: List[ContentSection] = list(sections)
+        self.roots: List[ContentSection] = []
+
+        self._positions: Dict[int, int] = {}  # id(section) -> position in document order, rebuilt on unpickling
+        self._parents: List[Optional[int]] = []
+        self._children: List[List[int]] = [[] for _ in self.sections]
+        self._titles_lower = [section.title.lower() for section in self.sections]
+        self._keyword_matches: Dict[str, Tuple[int, ...]] = {}
+
+        self.slugs: List[str] = []
+        self._by_slug: Dict[str, int] = {}
+        self._by_level: Dict[int, List[int]] = {}
+        self._by_category: Dict[str, List[int]] = {}
+        self._categories: List[List[str]] = []
+
+        # A header nests under the nearest earlier header of a smaller level
+        self._index_positions()
+        stack: List[int] = []
+        for position, section in enumerate(self.sections):
+            while stack and self.sections[stack[-1]].level >= section.level:
+                stack.pop()
+            parent = stack[-1] if stack else None
+            self._parents.append(parent)
+            if parent is None:
+                self.roots.append(section)
+            else:
+                self._children[parent].append(position)
+            stack.append(position)
+
+            slug = slugify(section.title)
+            self.slugs.append(slug)
+            self._by_slug.setdefault(slug, position)
+            self._by_level.setdefault(section.level, []).append(position)
+            categories = [category for category, pattern in SECTION_PATTERNS.items() if pattern.search(section.title)]
+            self._categories.append(categories)
+            for category in categories:
+                self._by_category.setdefault(category, []).append(position)
+
+    def _index_positions(self):
+        self._positions = {id(section): position for position, section in enumerate(self.sections)}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Object ids do not survive pickling or deepcopy, positions do
+        state = self.__dict__.copy()
+        del state['_positions']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._index_positions()
+
+    def get(self, slug: str) -> Optional[ContentSection]:
+        """First section whose title slugifies to slug"""
+
+        position = self._by_slug.get(slug)
+        return self.sections[position] if position is not None else None
+
+    def by_level(self, level: int) -> List[ContentSection]:
+        """Sections with a header of the given level, in document order"""
+        return [self.sections[position] for position in self._by_level.get(level, [])]
+
+    def by_category(self, category: str) -> List[ContentSection]:
+        """Sections whose titles match a SECTION_PATTERNS category, in document order"""
+        return [self.sections[position] for position in self._by_category.get(category, [])]
+
+    def categories(self, section: ContentSection) -> List[str]:
+        """Categories a section's title falls under"""
+
+        return list(self._categories[self._positions[id(section)]])
+
+    def parent(self, section: ContentSection) -> Optional[ContentSection]:
+        """Enclosing section, or None for a top-level section"""
+
+        parent = self._parents[self._positions[id(section)]]
+        return self.sections[parent] if parent is not None else None
+
+    def children(self, section: ContentSection) -> List[ContentSection]:
+        """Sections directly nested under a section"""
+        return [self.sections[position] for position in self._children[self._positions[id(section)]]]
+
+    def find(self, keywords: Iterable[str]) -> List[ContentSection]:
+        """Sections whose titles contain any keyword (case-insensitive), in document order.
+
+        Matches are remembered per keyword, so slides asking for the same keywords reuse them.
+        """
+
+        positions = set()
+        for keyword in keywords:
+            keyword = keyword.lower()
+            matches = self._keyword_matches.get(keyword)
+            if matches is None:
+                matches = tuple(position for position, title in enumerate(self._titles_lower) if keyword in title)
+                self._keyword_matches[keyword] = matches
+            positions.update(matches)
+
+        return [self.sections[position] for position in sorted(positions)]
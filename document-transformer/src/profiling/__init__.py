@@ -0,0 +1,15 @@
+"""
+Profiling module for document transformation
+"""
+
+from .timing import PhaseTimer, Span, phase, get_active_timer
+from .trace import SpanCollector, percentile
+
+__all__ = [
+    'PhaseTimer',
+    'Span',
+    'phase',
+    'get_active_timer',
+    'SpanCollector',
+    'percentile'
+]
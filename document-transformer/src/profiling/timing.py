@@ -0,0 +1,82 @@
+"""
+Phase timing for document generation
+Code marks its phases with phase(); the timings go to whichever PhaseTimer is active on the current thread
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+_active = threading.local()
+
+@dataclass
+class Span:
+    """One timed phase, placed on a process and thread timeline"""
+    name: str
+    start: float  # seconds since the epoch, comparable across processes
+    duration: float
+    pid: int
+    tid: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+class PhaseTimer:
+    """Accumulates wall-clock time per named phase, optionally keeping every span.
+
+    A phase nested in another counts only towards itself, so phase totals never overlap; spans keep
+    their full duration.
+    """
+
+    def __init__(self, record_spans: bool = False, **args):
+        self.phases: Dict[str, float] = {}
+        self.spans: List[Span] = []
+        self.record_spans = record_spans
+        self.args = args  # attached to every span, e.g. job and format
+        self._nested_time: List[float] = []  # time spent in nested phases, one entry per open phase
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block and add it, less any nested phases, to the named phase"""
+
+        wall_start = time.time()
+        start = time.perf_counter()
+        self._nested_time.append(0.0)
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            nested = self._nested_time.pop()
+            if self._nested_time:
+                self._nested_time[-1] += duration
+            self.phases[name] = self.phases.get(name, 0.0) + duration - nested
+            if self.record_spans:
+                self.spans.append(Span(name, wall_start, duration, os.getpid(), threading.get_ident(), self.args))
+
+    @contextmanager
+    def activate(self) -> Iterator["PhaseTimer"]:
+        """Collect phase() timings from code running on this thread"""
+
+        previous = getattr(_active, 'timer', None)
+        _active.timer = self
+        try:
+            yield self
+        finally:
+            _active.timer = previous
+
+def get_active_timer() -> Optional[PhaseTimer]:
+    """The timer collecting phases on this thread, if any"""
+    return getattr(_active, 'timer', None)
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Mark a phase of work; costs one attribute lookup when nothing is timing this thread"""
+
+    timer = getattr(_active, 'timer', None)
+    if timer is None:
+        yield
+        return
+
+    with timer.phase(name):
+        yield
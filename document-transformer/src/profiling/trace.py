@@ -0,0 +1,105 @@
+"""
+Span collection for batch runs
+Aggregates phase spans from threads and worker processes into percentiles and Chrome trace files
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence
+
+from .timing import Span
+
+PERCENTILES = (50, 90, 95, 99)
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linearly interpolated percentile of already sorted values"""
+
+    if not sorted_values:
+        return 0.0
+
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+class SpanCollector:
+    """Thread-safe store of spans reported by jobs and worker processes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans: List[Span] = []
+
+    def add(self, spans: Iterable[Span]):
+        """Add spans from a finished task"""
+
+        with self._lock:
+            self.spans.extend(spans)
+
+    def drain(self) -> List[Span]:
+        """Remove and return all spans, for shipping them to another process"""
+
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+    def clear(self):
+        """Drop every collected span"""
+
+        with self._lock:
+            self.spans = []
+
+    def get_phase_stats(self) -> Dict[str, Dict[str, float]]:
+        """Count, total and percentiles of each phase's duration in seconds.
+
+        Phases are inclusive: a generate span contains the render, layout and write spans inside it.
+        """
+
+        with self._lock:
+            spans = list(self.spans)
+
+        durations: Dict[str, List[float]] = {}
+        for span in spans:
+            durations.setdefault(span.name, []).append(span.duration)
+
+        stats = {}
+        for name, values in sorted(durations.items()):
+            values.sort()
+            phase_stats = {
+                "count": len(values),
+                "total": sum(values),
+                "mean": sum(values) / len(values),
+                "max": values[-1]
+            }
+            for q in PERCENTILES:
+                phase_stats[f"p{q}"] = percentile(values, q)
+            stats[name] = phase_stats
+
+        return stats
+
+    def export_chrome_trace(self, output_path: Path) -> str:
+        """Write spans as a Chrome trace (chrome://tracing, Perfetto) with one track per worker thread"""
+
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+
+        origin = spans[0].start if spans else 0.0
+        events = [
+            {
+                "name": span.name,
+                "cat": span.args.get("format", "prepare"),
+                "ph": "X",
+                "ts": round((span.start - origin) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": span.pid,
+                "tid": span.tid,
+                "args": span.args
+            }
+            for span in spans
+        ]
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+        return str(output_path)
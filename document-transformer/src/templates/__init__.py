@@ -3,8 +3,12 @@ Templates module for document transformation
 """
 
 from .template_engine import TemplateEngine, TemplateConfig
+from .render_cache import RenderCache, hash_parsed_document, hash_brand_profile
 
 __all__ = [
     'TemplateEngine',
-    'TemplateConfig'
+    'TemplateConfig',
+    'RenderCache',
+    'hash_parsed_document',
+    'hash_brand_profile'
 ]
\ No newline at end of file
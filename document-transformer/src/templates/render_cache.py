@@ -0,0 +1,102 @@
+"""
+In-memory cache of rendered templates
+Lets the HTML and PDF generators share one Jinja render per document, brand and template
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+from dataclasses import asdict
+
+from ..branding import BrandProfile
+from ..parser import ParsedDocument
+
+def hash_parsed_document(document: ParsedDocument) -> str:
+    """SHA-256 of a parsed document's content.
+
+    Computed on every call rather than stored on the document, so a document edited after
+    parsing never reuses a render of its old content.
+    """
+
+    serialized = json.dumps(asdict(document), sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+def hash_brand_profile(brand_profile: BrandProfile) -> str:
+    """SHA-256 of the brand settings that affect rendering"""
+
+    profile_dict = asdict(brand_profile)
+    profile_dict["design_style"] = brand_profile.design_style.value
+    profile_dict.pop("created_at", None)
+    profile_dict.pop("updated_at", None)
+
+    serialized = json.dumps(profile_dict, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+class RenderCache:
+    """LRU cache of rendered HTML, bounded by total size"""
+
+    def __init__(self, max_size_mb: int = 64):
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._total_size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, document: ParsedDocument, brand_profile: BrandProfile,
+                 template_name: str, *extra: str) -> tuple:
+        """Build a cache key from document, brand and template"""
+
+        return (hash_parsed_document(document), hash_brand_profile(brand_profile), template_name) + extra
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Return a cached render, or None on a miss"""
+
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rendered
+
+    def put(self, key: tuple, rendered: str):
+        """Store a render and evict old entries if over budget"""
+
+        size = len(rendered)
+        if size > self.max_size_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._total_size -= len(self._entries[key])
+            self._entries[key] = rendered
+            self._entries.move_to_end(key)
+            self._total_size += size
+
+            while self._total_size > self.max_size_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_size -= len(evicted)
+
+    def clear(self):
+        """Remove all cached renders"""
+
+        with self._lock:
+            self._entries.clear()
+            self._total_size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and size information"""
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "size_bytes": self._total_size
+        }
@@ -4,13 +4,18 @@ Handles template selection, customization, and rendering
 """
 
 import os
+import json
+import logging
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
-from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+from typing import Dict, List, Optional, Any, Union, Tuple, Iterator
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Template, select_autoescape
 from dataclasses import dataclass
 
 from ..branding import BrandProfile, DesignStyle
-from ..parser import ParsedDocument, ContentSection
+from ..parser import ParsedDocument, ContentSection, slugify
+from .render_cache import RenderCache
+from ..profiling import phase
 
 @dataclass
 class TemplateConfig:
@@ -22,32 +27,74 @@ class TemplateConfig:
     template_file: str
     css_file: str
     variables: Dict[str, Any] = None
+    priority: int = 0  # higher ranks first when several templates match
+
+# Bump when the built-in template or CSS sources change
+TEMPLATES_VERSION = "1.1.0"
+
+# Jinja2 environments shared by every TemplateEngine in the process
+_shared_environments: Dict[Tuple[str, Optional[str]], Environment] = {}
+_shared_environments_lock = threading.Lock()
 
 class TemplateEngine:
     """Dynamic template engine for document generation"""
 
-    def __init__(self, templates_dir: Path):
+    def __init__(self, templates_dir: Path, bytecode_cache_dir: Optional[Path] = None):
         self.templates_dir = templates_dir
         self.templates_dir.mkdir(exist_ok=True)
+        self.bytecode_cache_dir = bytecode_cache_dir
+        self.custom_templates_dir = templates_dir / "custom"
+        self.logger = logging.getLogger(__name__)
 
-        # Initialize Jinja2 environment
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(str(templates_dir)),
-            autoescape=select_autoescape(['html', 'xml']),
-            trim_blocks=True,
-            lstrip_blocks=True
-        )
+        # Key into the shared environments, resolved once; the environment itself is built on first use
+        self._env_key = (str(templates_dir.resolve()),
+                         str(bytecode_cache_dir.resolve()) if bytecode_cache_dir else None)
+        self._jinja_env: Optional[Environment] = None
 
-        # Register custom filters
-        self._register_filters()
-
-        # Load available templates
+        # Load available templates and build the selection index
         self.templates = self._load_templates()
 
+        # Rendered output shared by the HTML and PDF generators
+        self.render_cache = RenderCache()
+
         # Create default templates if they don't exist
         self._ensure_default_templates()
 
-    def _register_filters(self):
+    @property
+    def jinja_env(self) -> Environment:
+        """Jinja2 environment, created on first use and shared process-wide"""
+
+        env = self._jinja_env
+        if env is None:
+            env = self._jinja_env = self._get_shared_environment()
+        return env
+
+    def _get_shared_environment(self) -> Environment:
+        """Look up or build the shared environment for this engine's directories"""
+
+        with _shared_environments_lock:
+            env = _shared_environments.get(self._env_key)
+            if env is None:
+                bytecode_cache = None
+                if self.bytecode_cache_dir:
+                    self.bytecode_cache_dir.mkdir(parents=True, exist_ok=True)
+                    bytecode_cache = FileSystemBytecodeCache(str(self.bytecode_cache_dir))
+
+                env = Environment(
+                    loader=FileSystemLoader(str(self.templates_dir)),
+                    autoescape=select_autoescape(['html', 'xml']),
+                    trim_blocks=True,
+                    lstrip_blocks=True,
+                    bytecode_cache=bytecode_cache
+                )
+
+                # Register custom filters
+                self._register_filters(env)
+                _shared_environments[self._env_key] = env
+
+        return env
+
+    def _register_filters(self, env: Environment):
         """Register custom Jinja2 filters"""
 
         def format_currency(value, currency='USD'):
@@ -86,20 +133,19 @@ class TemplateEngine:
                 return text
             return ' '.join(words[:length]) + '...'
 
-        def slugify(text):
-            """Convert text to URL-friendly slug"""
-            import re
-            text = text.lower()
-            text = re.sub(r'[^\w\s-]', '', text)
-            text = re.sub(r'[-\s]+', '-', text)
-            return text.strip('-')
+        def nl2br(text):
+            """Turn line breaks into <br> tags"""
+            if not text:
+                return ""
+            return str(text).replace('\n', '<br>\n')
 
         # Register filters
-        self.jinja_env.filters['currency'] = format_currency
-        self.jinja_env.filters['number'] = format_number
-        self.jinja_env.filters['percentage'] = format_percentage
-        self.jinja_env.filters['truncate_words'] = truncate_words
-        self.jinja_env.filters['slugify'] = slugify
+        env.filters['currency'] = format_currency
+        env.filters['number'] = format_number
+        env.filters['percentage'] = format_percentage
+        env.filters['truncate_words'] = truncate_words
+        env.filters['slugify'] = slugify
+        env.filters['nl2br'] = nl2br
 
     def _load_templates(self) -> Dict[str, TemplateConfig]:
         """Load available template configurations"""
@@ -176,47 +222,143 @@ class TemplateEngine:
         }
 
         templates.update(builtin_templates)
+
+        # Per-client templates registered on disk
+        templates.update(self._load_custom_templates())
+
+        self._build_selection_index(templates)
+        return templates
+
+    def _load_custom_templates(self) -> Dict[str, TemplateConfig]:
+        """Load user-registered template configurations from templates/custom/*.json"""
+
+        templates = {}
+        if not self.custom_templates_dir.exists():
+            return templates
+
+        for config_path in sorted(self.custom_templates_dir.glob("*.json")):
+            try:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    config_dict = json.load(f)
+
+                template_key = config_dict.pop("key", config_path.stem)
+                config_dict["design_styles"] = [DesignStyle(style) for style in config_dict.get("design_styles", [])]
+                templates[template_key] = TemplateConfig(**config_dict)
+
+            except Exception as e:
+                self.logger.warning(f"Could not load template config {config_path}: {e}")
+
         return templates
 
+    def _build_selection_index(self, templates: Dict[str, TemplateConfig]):
+        """Index templates by (document_type, design_style) and by document_type, best match first"""
+
+        self._style_index: Dict[Tuple[str, DesignStyle], List[TemplateConfig]] = {}
+        self._type_index: Dict[str, List[TemplateConfig]] = {}
+
+        for template_config in templates.values():
+            self._index_template(template_config)
+
+    def _index_template(self, template_config: TemplateConfig):
+        """Add one template to the selection index"""
+
+        for document_type in template_config.document_types:
+            self._insert_ranked(self._type_index.setdefault(document_type, []), template_config)
+            for design_style in template_config.design_styles:
+                self._insert_ranked(self._style_index.setdefault((document_type, design_style), []), template_config)
+
+    def _unindex_template(self, template_config: TemplateConfig):
+        """Remove one template from the selection index"""
+
+        for document_type in template_config.document_types:
+            self._remove_candidate(self._type_index[document_type], template_config)
+            for design_style in template_config.design_styles:
+                self._remove_candidate(self._style_index[(document_type, design_style)], template_config)
+
+    def _insert_ranked(self, candidates: List[TemplateConfig], template_config: TemplateConfig):
+        """Insert after every candidate of the same or higher priority, keeping registration order among equals"""
+
+        position = len(candidates)
+        while position > 0 and candidates[position - 1].priority < template_config.priority:
+            position -= 1
+        candidates.insert(position, template_config)
+
+    def _remove_candidate(self, candidates: List[TemplateConfig], template_config: TemplateConfig):
+        """Remove a template by identity, as distinct templates may have equal configs"""
+        candidates[:] = [candidate for candidate in candidates if candidate is not template_config]
+
+    def register_template(self, template_key: str, template_config: TemplateConfig):
+        """Register an additional template and add it to the selection index"""
+
+        previous = self.templates.get(template_key)
+        if previous is not None:
+            self._unindex_template(previous)
+
+        self.templates[template_key] = template_config
+        self._index_template(template_config)
+
+    def get_template_candidates(self, document_type: str, design_style: DesignStyle) -> List[TemplateConfig]:
+        """Get matching templates for a document type and design style, best match first"""
+
+        # Prefer templates matching both, then document type only
+        candidates = self._style_index.get((document_type, design_style))
+        if not candidates:
+            candidates = self._type_index.get(document_type)
+        if not candidates:
+            candidates = [self.templates['modern_corporate']]
+
+        return list(candidates)
+
     def _ensure_default_templates(self):
         """Create default template files if they don't exist"""
 
-        # Create HTML templates
+        # Files were already checked for this version of the built-in templates
+        stamp_path = self.templates_dir / '.templates_version'
+        try:
+            if stamp_path.read_text(encoding='utf-8').strip() == TEMPLATES_VERSION:
+                return
+        except OSError:
+            pass
+
+        # Create HTML templates (content is only generated for missing files)
         html_templates = {
-            'base.html': self._get_base_template(),
-            'modern_corporate.html': self._get_modern_corporate_template(),
-            'startup_vibrant.html': self._get_startup_vibrant_template(),
-            'professional_classic.html': self._get_professional_classic_template(),
-            'creative_minimal.html': self._get_creative_minimal_template(),
-            'financial_report.html': self._get_financial_report_template()
+            'base.html': self._get_base_template,
+            'modern_corporate.html': self._get_modern_corporate_template,
+            'startup_vibrant.html': self._get_startup_vibrant_template,
+            'professional_classic.html': self._get_professional_classic_template,
+            'creative_minimal.html': self._get_creative_minimal_template,
+            'financial_report.html': self._get_financial_report_template
         }
 
         # Create CSS files
         css_templates = {
-            'base.css': self._get_base_css(),
-            'modern_corporate.css': self._get_modern_corporate_css(),
-            'startup_vibrant.css': self._get_startup_vibrant_css(),
-            'professional_classic.css': self._get_professional_classic_css(),
-            'creative_minimal.css': self._get_creative_minimal_css(),
-            'financial_report.css': self._get_financial_report_css()
+            'base.css': self._get_base_css,
+            'modern_corporate.css': self._get_modern_corporate_css,
+            'startup_vibrant.css': self._get_startup_vibrant_css,
+            'professional_classic.css': self._get_professional_classic_css,
+            'creative_minimal.css': self._get_creative_minimal_css,
+            'financial_report.css': self._get_financial_report_css
         }
 
         # Write HTML templates
-        for filename, content in html_templates.items():
+        for filename, get_content in html_templates.items():
             file_path = self.templates_dir / filename
             if not file_path.exists():
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                    f.write(get_content())
 
         # Create CSS directory and write CSS files
         css_dir = self.templates_dir / 'css'
         css_dir.mkdir(exist_ok=True)
 
-        for filename, content in css_templates.items():
+        for filename, get_content in css_templates.items():
             file_path = css_dir / filename
             if not file_path.exists():
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                    f.write(get_content())
+
+        with open(stamp_path, 'w', encoding='utf-8') as f:
+            f.write(TEMPLATES_VERSION)
 
     def get_template_for_document(self, document: ParsedDocument, brand_profile: BrandProfile) -> TemplateConfig:
         """Select the best template for a document based on type and brand profile"""
@@ -224,25 +366,8 @@ class TemplateEngine:
         document_type = document.metadata.document_type
         design_style = brand_profile.design_style
 
-        # Find templates that match document type and design style
-        matching_templates = []
-        for template_name, template_config in self.templates.items():
-            if document_type in template_config.document_types:
-                if design_style in template_config.design_styles:
-                    matching_templates.append(template_config)
-
-        # If no exact match, find templates that match document type only
-        if not matching_templates:
-            for template_name, template_config in self.templates.items():
-                if document_type in template_config.document_types:
-                    matching_templates.append(template_config)
-
-        # If still no match, use modern_corporate as default
-        if not matching_templates:
-            matching_templates = [self.templates['modern_corporate']]
-
         # Return the first (best) match
-        return matching_templates[0]
+        return self.get_template_candidates(document_type, design_style)[0]
 
     def render_document(self, document: ParsedDocument, brand_profile: BrandProfile,
                        template_config: Optional[TemplateConfig] = None) -> str:
@@ -255,14 +380,68 @@ class TemplateEngine:
         # Load template
         template = self.jinja_env.get_template(template_config.template_file)
 
+        # Reuse an earlier render of the same document, brand and template
+        cache_key = self._get_render_cache_key(document, brand_profile, template_config, template)
+        cached_content = self.render_cache.get(cache_key)
+        if cached_content is not None:
+            return cached_content
+
         # Prepare template variables
         template_vars = self._prepare_template_variables(document, brand_profile, template_config)
 
         # Render template
-        rendered_content = template.render(**template_vars)
+        with phase("render"):
+            rendered_content = template.render(**template_vars)
+
+        self.render_cache.put(cache_key, rendered_content)
 
         return rendered_content
 
+    def generate_document(self, document: ParsedDocument, brand_profile: BrandProfile,
+                          template_config: Optional[TemplateConfig] = None) -> Iterator[str]:
+        """Render a document as a stream of chunks, without building the whole output in memory"""
+
+        # Select template if not provided
+        if template_config is None:
+            template_config = self.get_template_for_document(document, brand_profile)
+
+        template = self.jinja_env.get_template(template_config.template_file)
+
+        # An earlier full render is already in memory, so reuse it
+        cache_key = self._get_render_cache_key(document, brand_profile, template_config, template)
+        cached_content = self.render_cache.get(cache_key)
+        if cached_content is not None:
+            yield cached_content
+            return
+
+        template_vars = self._prepare_template_variables(document, brand_profile, template_config)
+
+        # Time only the template's own work; consumers process each chunk between pulls.
+        # Jinja yields Markup for some expressions; hand out plain strings so
+        # concatenation downstream does not escape them
+        chunks = template.generate(**template_vars)
+        while True:
+            with phase("render"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield str(chunk)
+
+    def _get_render_cache_key(self, document: ParsedDocument, brand_profile: BrandProfile,
+                              template_config: TemplateConfig, template: Template) -> tuple:
+        """Render cache key for a document, brand and template"""
+
+        return self.render_cache.make_key(document, brand_profile, template_config.name,
+                                          template_config.template_file, self._get_template_stamp(template),
+                                          self._get_current_date())
+
+    def _get_template_stamp(self, template: Template) -> str:
+        """Modification stamp of a template file, so edited templates are re-rendered"""
+        try:
+            return str(os.path.getmtime(template.filename))
+        except (OSError, TypeError):
+            return template.name or ""
+
     def _prepare_template_variables(self, document: ParsedDocument, brand_profile: BrandProfile,
                                   template_config: TemplateConfig) -> Dict[str, Any]:
         """Prepare variables for template rendering"""
@@ -275,6 +454,7 @@ class TemplateEngine:
             'industry': document.metadata.industry,
             'document_type': document.metadata.document_type,
             'sections': document.sections,
+            'section_index': document.section_index,
             'financial_data': document.financial_data,
             'team_members': document.team_members,
             'tables': document.tables,
@@ -459,7 +639,7 @@ class TemplateEngine:
                         </tr>
                     </thead>
                     <tbody>
-                        {% for row in financial.table_data %}
+                        {% for row in financial.columns.rows %}
                         <tr>
                             {% for cell in row %}
                             <td>{{ cell }}</td>
@@ -700,7 +880,7 @@ class TemplateEngine:
                             </tr>
                         </thead>
                         <tbody>
-                            {% for row in financial.table_data %}
+                            {% for row in financial.columns.rows %}
                             <tr>
                                 {% for cell in row %}
                                 <td>{{ cell }}</td>
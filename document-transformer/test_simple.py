@@ -4,199 +4,1007 @@ Tests core functionality without external dependencies
 """
 
 import sys
+import copy
+import json
+import pickle
+import random
+import datetime
+from dataclasses import asdict
 from pathlib import Path
 
+import pytest
+
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-def test_parser():
-    """Test the markdown parser"""
-    print("🧪 Testing Markdown Parser")
-    print("="*50)
+from src.config.settings import Config
+from src.parser import MarkdownParser, TeamMember, NumericTable, KeywordScanner, ParseCache
+from src.parser.markdown_parser import FinancialData
+from src.branding import BrandProfile, ColorPalette, Typography, DesignStyle
+from src.templates import TemplateEngine, TemplateConfig
+from src.generators.chart_cache import ChartCache
+from src.generators.html_generator import HTMLGenerator
+from src.generators.html_rewriter import HTMLRewriter
+from src.generators.pdf_chunks import PAGE_BREAK_MARKER, SPLIT_MARKER, PYPDF_AVAILABLE, split_html_at_page_breaks
+from src.benchmark import BenchmarkSuite, BenchmarkConfiguration
+from src.profiling import PhaseTimer, Span, SpanCollector, percentile
+
+TEMPLATES_DIR = Path(__file__).parent / "src" / "templates"
+TEASER_FILE = Path(__file__).parent.parent / "companies/VeloCity/projects/VeloCity/workspace/funding-docs/INVESTOR_TEASER.md"
+
+# The PDF generator and batch processor need WeasyPrint and its system libraries
+try:
+    import weasyprint  # noqa: F401
+    WEASYPRINT_ERROR = None
+except (ImportError, OSError) as e:
+    WEASYPRINT_ERROR = e
+
+requires_weasyprint = pytest.mark.skipif(WEASYPRINT_ERROR is not None,
+                                         reason=f"WeasyPrint unavailable: {WEASYPRINT_ERROR}")
+requires_pypdf = pytest.mark.skipif(not PYPDF_AVAILABLE, reason="pypdf unavailable")
+requires_teaser = pytest.mark.skipif(not TEASER_FILE.exists(), reason=f"Test file not found: {TEASER_FILE}")
+
+PLAN_MARKDOWN = """# Revenue Plan
+
+## Financial Projections
+| Year | Revenue | Cost |
+|------|---------|------|
+| 2025 | $1,000 | 400 |
+| 2026 | $2,500 | 900 |
+
+![Chart](chart.png) See [site](https://example.com).
+"""
+
+def velocity_brand() -> BrandProfile:
+    """Brand profile shared by the rendering tests"""
+    return BrandProfile(
+        company_name="VeloCity",
+        industry="telecom",
+        design_style=DesignStyle.MODERN_CORPORATE,
+        color_palette=ColorPalette(primary=["#1976D2", "#2196F3"]),
+        typography=Typography(heading_font="Inter", body_font="Inter")
+    )
+
+# Parser
 
+@requires_teaser
+def test_parser():
+    """Test the markdown parser on the VeloCity investor teaser"""
+
+    document = MarkdownParser(Config()).parse_file(TEASER_FILE)
+    assert document.metadata.title
+    assert document.sections
+
+def test_tokenizer_extracts_sections_tables_images_and_links():
+    parser = MarkdownParser()
+    document = parser.parse_content(PLAN_MARKDOWN)
+
+    assert document.metadata.title == "Revenue Plan"
+    assert [s.title for s in document.sections] == ["Revenue Plan", "Financial Projections"]
+    assert document.tables == [[["Year", "Revenue", "Cost"], ["2025", "$1,000", "400"], ["2026", "$2,500", "900"]]]
+    assert len(document.financial_data) == 1
+    assert document.financial_data[0].title == "Financial Projections"
+    assert document.images == ["chart.png"]
+    assert document.links == ["https://example.com"]
+    assert parser._is_table_row("a | b | c") and not parser._is_table_row("either | or")
+
+def test_pipe_prose_is_not_a_table():
+    # A table needs a separator row under its header
+    prose = MarkdownParser().parse_content("# Options\n\nPick fibre | wireless | satellite per region.\n"
+                                           "Rates vary | by term |\n\n| Plan | Price |\n|:--|--:|\n| Basic | 10 |\n")
+    assert prose.tables == [[["Plan", "Price"], ["Basic", "10"]]]
+
+def test_wrapped_links_and_images():
+    wrapped = MarkdownParser().parse_content("# Links\n\nRead [the full\nreport](https://example.com/report) and\n"
+                                             "![quarterly\nchart](q3.png) [site](https://example.org).\n")
+    assert wrapped.images == ["q3.png"]
+    assert wrapped.links == ["https://example.com/report", "https://example.org"]
+
+def test_section_index():
+    document = MarkdownParser().parse_content(PLAN_MARKDOWN)
+    index = document.section_index
+
+    assert [s.title for s in index.roots] == ["Revenue Plan"]
+    assert index.parent(index.get("financial-projections")) is document.sections[0]
+    assert index.by_category("financials") == [document.sections[1]]
+
+def test_section_index_survives_pickle_and_deepcopy():
+    # The cached index travels with the document to worker processes
+    document = MarkdownParser().parse_content(PLAN_MARKDOWN)
+    document.section_index
+
+    for restored in (pickle.loads(pickle.dumps(document)), copy.deepcopy(document)):
+        restored_index = restored.section_index
+        child = restored.sections[1]
+        assert restored_index.parent(child) is restored.sections[0]
+        assert restored_index.children(restored.sections[0]) == [child]
+        assert restored_index.categories(child) == ["financials"]
+
+@pytest.mark.parametrize("line_ending", ['\n', '\r\n', '\r'])
+def test_iter_sections_matches_parse_file(tmp_path, line_ending):
+    # Streaming and whole-file parsing split Windows and old Mac line endings the same way
+    parser = MarkdownParser()
+    expected = [(s.title, s.content) for s in parser.parse_content(PLAN_MARKDOWN).sections]
+    file_path = tmp_path / "plan.md"
+    file_path.write_bytes(PLAN_MARKDOWN.replace('\n', line_ending).encode('utf-8'))
+
+    streamed = [(s.title, s.content) for s in parser.iter_sections(file_path)]
+    assert streamed == [(s.title, s.content) for s in parser.parse_file(file_path).sections]
+    assert streamed == expected
+
+def test_iter_sections_memory_is_bounded_by_a_section(tmp_path):
+    import tracemalloc
+
+    parser = MarkdownParser()
+    file_path = tmp_path / "atlas.md"
+
+    # Patterns and scanners are built on first use, so warm them up before measuring
+    file_path.write_text(PLAN_MARKDOWN, encoding='utf-8')
+    list(parser.iter_sections(file_path))
+
+    section = "## Region {}\n\n" + "Fibre demand keeps growing across the region. " * 40 + "\n\n"
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("# Coverage Atlas\n\n")
+        for i in range(10000):
+            f.write(section.format(i))
+
+    tracemalloc.start()
     try:
-        from src.config.settings import Config
-        from src.parser import MarkdownParser
-
-        config = Config()
-        parser = MarkdownParser(config)
-
-        # Test with VeloCity investor teaser
-        test_file = Path("../companies/VeloCity/projects/VeloCity/workspace/funding-docs/INVESTOR_TEASER.md")
-        if not test_file.exists():
-            print(f"❌ Test file not found: {test_file}")
-            return False
-
-        print(f"📄 Parsing: {test_file.name}")
-        document = parser.parse_file(test_file)
-
-        print(f"✅ Parsed Document:")
-        print(f"  Title: {document.metadata.title}")
-        print(f"  Company: {document.metadata.company_name}")
-        print(f"  Type: {document.metadata.document_type}")
-        print(f"  Industry: {document.metadata.industry}")
-        print(f"  Sections: {len(document.sections)}")
-        print(f"  Financial Data: {len(document.financial_data)}")
-        print(f"  Team Members: {len(document.team_members)}")
-        print(f"  Tables: {len(document.tables)}")
-
-        # Show first few sections
-        if document.sections:
-            print(f"\n📑 First 3 sections:")
-            for i, section in enumerate(document.sections[:3], 1):
-                print(f"  {i}. {section.title} (Level {section.level})")
-                print(f"     Content preview: {section.content[:100]}...")
-
-        return True
-
-    except Exception as e:
-        print(f"❌ Parser test failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+        section_count = sum(1 for _ in parser.iter_sections(file_path))
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert section_count == 10001
+    assert peak_bytes < file_path.stat().st_size // 100, peak_bytes
+
+def test_numeric_table_parses_formatted_values():
+    table = NumericTable([["Item", "Value"], ["A", "**-R1.5M**"], ["B", "(4.5k)"], ["C", "12%"], ["D", "n/a"]])
+    assert table.column_values(1).tolist() == [-1500000.0, -4500.0, 12.0]
+    assert table.percent[:, 1].tolist() == [False, False, True, False]
+
+def test_keyword_scanner_counts_overlapping_keywords():
+    assert KeywordScanner(["he", "she", "his", "hers"]).count("ushers") == {"she": 1, "he": 1, "hers": 1}
+
+# Parse cache
+
+TEASER_MARKDOWN = "# Teaser\n\n## Revenue\n| Year | Revenue | Cost |\n|---|---|---|\n| 2025 | 100 | 50 |\n"
+
+def test_parse_cache_round_trips_documents(tmp_path):
+    source = tmp_path / "teaser.md"
+    source.write_text(TEASER_MARKDOWN, encoding='utf-8')
+    cache = ParseCache(tmp_path / "cache")
+    parser = MarkdownParser(cache=cache)
+
+    first = parser.parse_file(source)
+    second = parser.parse_file(source)
+    expected = MarkdownParser().parse_file(source)
+
+    assert asdict(first) == asdict(expected)
+    assert asdict(second) == asdict(expected)
+    stats = cache.get_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+
+def test_financial_columns_view_is_cached_and_rebuilt_after_pickle(tmp_path):
+    source = tmp_path / "teaser.md"
+    source.write_text(TEASER_MARKDOWN, encoding='utf-8')
+    parser = MarkdownParser(cache=ParseCache(tmp_path / "cache"))
+    parser.parse_file(source)
+    cached = parser.parse_file(source)
+    expected = MarkdownParser().parse_file(source)
+
+    # The cached columnar view is not part of the serialized document
+    columns = expected.financial_data[0].columns
+    assert columns is expected.financial_data[0].columns
+    assert columns.column_values(1).tolist() == [100.0]
+
+    # The view is built by the parser, left out of pickles and rebuilt on first use after unpickling
+    assert '_columns' in cached.financial_data[0].__dict__
+    restored = pickle.loads(pickle.dumps(expected.financial_data[0]))
+    assert '_columns' not in restored.__dict__
+    assert restored.columns.column_values(1).tolist() == [100.0]
+
+def test_parse_cache_stores_dates_and_skips_unstorable_values(tmp_path):
+    cache = ParseCache(tmp_path / "cache")
+    parser = MarkdownParser(cache=cache)
+
+    # YAML dates round-trip through the cache
+    dated = tmp_path / "dated.md"
+    dated.write_text("---\ncreated_date: 2025-01-01\n---\n# Dated\n", encoding='utf-8')
+    assert parser.parse_file(dated).metadata.created_date == datetime.date(2025, 1, 1)
+    assert parser.parse_file(dated).metadata.created_date == datetime.date(2025, 1, 1)
+    assert cache.get_stats()['hits'] == 1
+
+    # Values the cache cannot store are parsed every time instead
+    unstorable = tmp_path / "unstorable.md"
+    unstorable.write_text("---\ntags: !!set {a: null}\n---\n# Tags\n", encoding='utf-8')
+    assert parser.parse_file(unstorable).metadata.tags == {'a'}
+    assert parser.parse_file(unstorable).metadata.tags == {'a'}
+    assert cache.get_stats()['hits'] == 1
+
+def test_document_type_vocabulary_is_part_of_the_cache_namespace():
+    config = Config()
+    namespace = MarkdownParser(config)._cache_namespace()
+    assert MarkdownParser(Config())._cache_namespace() == namespace
+
+    config.DOCUMENT_TYPES = copy.deepcopy(Config.DOCUMENT_TYPES)
+    config.DOCUMENT_TYPES['investor_teaser']['keywords'].append('teaser deck')
+    assert MarkdownParser(config)._cache_namespace() != namespace
+
+def test_keyword_scanners_pick_up_vocabulary_edits():
+    config = Config()
+    parser = MarkdownParser(config)
+    assert 'teaser deck' not in config.document_type_scanner.count("our teaser deck")
+    assert 'teaser deck' not in parser._get_classification_scanner().count("our teaser deck")
+
+    config.DOCUMENT_TYPES = copy.deepcopy(Config.DOCUMENT_TYPES)
+    config.DOCUMENT_TYPES['investor_teaser']['keywords'].append('teaser deck')
+    assert config.document_type_scanner.count("our teaser deck")['teaser deck'] == 1
+    assert parser._get_classification_scanner().count("our teaser deck")['teaser deck'] == 1
+
+# Disk cache
+
+def test_disk_cache_lru_eviction_and_size_limit(tmp_path):
+    cache = ChartCache(tmp_path, max_size_mb=1)
+    blob = b"x" * 400 * 1024
+
+    cache.put("a.png", blob)
+    cache.put("b.png", blob)
+    assert cache.get("a.png") == blob  # a is now the most recently used
+    assert cache.get("missing.png") is None
+
+    # A third entry goes over the 1 MB budget and evicts the least recently used one
+    cache.put("c.png", blob)
+    assert "b.png" not in cache and "a.png" in cache and "c.png" in cache
+    assert not (tmp_path / "b.png").exists()
+
+    # Entries larger than the whole budget are not stored
+    cache.put("huge.png", b"x" * 2 * 1024 * 1024)
+    assert "huge.png" not in cache
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['writes'], stats['evictions']) == (1, 1, 3, 1)
+    assert stats['entries'] == 2 and stats['size_bytes'] == 2 * len(blob)
+
+def test_disk_cache_is_shared_between_instances(tmp_path):
+    blob = b"x" * 1024
+    ChartCache(tmp_path, max_size_mb=1).put("c.png", blob)
+    assert ChartCache(tmp_path, max_size_mb=1).get("c.png") == blob
+
+# Charts
+
+def test_charts_rendered_on_threads_match_sequential_renders():
+    import base64
+    from concurrent.futures import ThreadPoolExecutor
+    from src.generators.chart_generator import ChartGenerator, ChartConfig, MATPLOTLIB_AVAILABLE
+
+    if not MATPLOTLIB_AVAILABLE:
+        pytest.skip("matplotlib unavailable")
+
+    generators = [
+        ChartGenerator(BrandProfile(company_name=name, industry="telecom",
+                                    typography=Typography(heading_font=font, body_font=font)))
+        for name, font in (("VeloCity", "Inter"), ("Acme", "Georgia"))
+    ]
+    tables = [
+        [["Year", "Revenue"], ["2024", "$1,000"], ["2025", "$2,500"]],
+        [["Item", "Plan", "Actual"], ["Q1", "10", "12"], ["Q2", "14", "11"]]
+    ]
+    jobs = [(generator, table, image_format)
+            for generator in generators for table in tables for image_format in ("svg", "png")] * 3
+
+    def render(job):
+        generator, table, image_format = job
+        return generator.generate_financial_chart(FinancialData(table_data=table, headers=table[0]),
+                                                  ChartConfig(title="Chart", image_format=image_format))
+
+    sequential = [render(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        concurrent = list(executor.map(render, jobs))
+
+    assert concurrent == sequential
+    # Each brand's font reaches the SVG text
+    assert "Georgia" in base64.b64decode(sequential[4]).decode()
+
+# Image optimizer
+
+@pytest.fixture
+def photo_dir(tmp_path):
+    """A directory holding a large photo and a byte-identical copy"""
+
+    import shutil
+    import numpy as np
+    from PIL import Image
+
+    pixels = np.random.default_rng(0).integers(0, 255, (1000, 3000, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(tmp_path / "photo.png")
+    shutil.copyfile(tmp_path / "photo.png", tmp_path / "copy.png")
+    return tmp_path
+
+def test_image_optimizer_downsamples_and_deduplicates(photo_dir):
+    from PIL import Image
+    from src.generators.image_optimizer import ImageOptimizer
+
+    optimizer = ImageOptimizer(photo_dir / "cache")
+    image = optimizer.optimize("photo.png", photo_dir, max_width=800)
+    assert (image.width, image.height) == (800, 267)
+    assert image.optimized_bytes < image.original_bytes
+    with Image.open(image.path) as optimized_image:
+        assert optimized_image.size == (800, 267)
+
+    # The same bytes under another name reuse the optimized file
+    duplicate = optimizer.optimize("copy.png", photo_dir, max_width=800)
+    assert duplicate.path == image.path
+    stats = optimizer.get_stats()
+    assert (stats['images'], stats['resized'], stats['deduplicated']) == (1, 1, 1)
+    assert optimizer.optimize("missing.png", photo_dir) is None
+
+def test_html_references_images_published_as_assets(photo_dir):
+    from PIL import Image
+    from src.generators.image_optimizer import ImageOptimizer
+
+    source = photo_dir / "report.md"
+    source.write_text("# Report\n\n## Site\n\n![Site](photo.png)\n", encoding='utf-8')
+    document = MarkdownParser().parse_file(source)
+    html_generator = HTMLGenerator(TemplateEngine(TEMPLATES_DIR), photo_dir / "html",
+                                   image_optimizer=ImageOptimizer(photo_dir / "cache"))
+    html_path = Path(html_generator.generate_html(document, BrandProfile(company_name="Test", industry="saas"),
+                                                  output_filename="report.html"))
+
+    # HTML points at a copy published once into the assets directory
+    html = html_path.read_text(encoding='utf-8')
+    assets = list((photo_dir / "html" / "assets").iterdir())
+    assert len(assets) == 1 and f"](assets/{assets[0].name})" in html
+    assert "](photo.png)" not in html
+    with Image.open(assets[0]) as asset:
+        assert asset.width == 1600
+
+@requires_weasyprint
+def test_pdf_references_images_sized_for_the_printable_width(photo_dir):
+    from src.generators.image_optimizer import ImageOptimizer
+    from src.generators.pdf_generator import PDFGenerator, PDFOptions
+
+    source = photo_dir / "report.md"
+    source.write_text("# Report\n\n## Site\n\n![Site](photo.png)\n", encoding='utf-8')
+    document = MarkdownParser().parse_file(source)
+    optimizer = ImageOptimizer(photo_dir / "cache")
+    pdf_generator = PDFGenerator(TemplateEngine(TEMPLATES_DIR), photo_dir / "pdf", image_optimizer=optimizer)
+    options = PDFOptions()
+
+    rewritten = pdf_generator._optimize_images("![Site](photo.png)", document,
+                                               BrandProfile(company_name="Test", industry="saas"), options)
+    expected_width = round(pdf_generator._get_content_width_inches(options) * options.dpi)
+    pdf_image = optimizer.optimize("photo.png", photo_dir, max_width=expected_width)
+    assert rewritten == f"![Site]({pdf_image.path.resolve().as_uri()})"
+
+# Branding and templates
 
 def test_brand_system():
     """Test the branding system"""
-    print("\n🧪 Testing Brand System")
-    print("="*50)
 
-    try:
-        from src.branding import BrandProfile, ColorPalette, Typography, DesignStyle
-
-        # Create test brand profile
-        test_brand = BrandProfile(
-            company_name="TestCompany",
-            industry="saas",
-            tagline="Innovating the Future",
-            design_style=DesignStyle.STARTUP_VIBRANT,
-            color_palette=ColorPalette(
-                primary=["#6200EA", "#7C4DFF"],
-                secondary=["#FF6B6B", "#424242"]
-            ),
-            typography=Typography(
-                heading_font="Inter",
-                body_font="Inter"
-            )
+    test_brand = BrandProfile(
+        company_name="TestCompany",
+        industry="saas",
+        tagline="Innovating the Future",
+        design_style=DesignStyle.STARTUP_VIBRANT,
+        color_palette=ColorPalette(
+            primary=["#6200EA", "#7C4DFF"],
+            secondary=["#FF6B6B", "#424242"]
+        ),
+        typography=Typography(
+            heading_font="Inter",
+            body_font="Inter"
         )
+    )
 
-        print(f"✅ Created brand profile:")
-        print(f"  Company: {test_brand.company_name}")
-        print(f"  Industry: {test_brand.industry}")
-        print(f"  Style: {test_brand.design_style.value}")
-        print(f"  Primary Colors: {test_brand.color_palette.primary}")
-
-        return True
-
-    except Exception as e:
-        print(f"❌ Brand system test failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-
-def test_template_system():
-    """Test the template system"""
-    print("\n🧪 Testing Template System")
-    print("="*50)
+    assert test_brand.design_style.value == DesignStyle.STARTUP_VIBRANT.value
+    assert test_brand.color_palette.primary == ["#6200EA", "#7C4DFF"]
 
-    try:
-        from src.templates import TemplateEngine
-        from src.branding import BrandProfile, ColorPalette, Typography, DesignStyle
-        from src.config.settings import Config
-
-        config = Config()
-        template_engine = TemplateEngine(Path(__file__).parent / "src" / "templates")
-
-        available_templates = template_engine.list_templates()
-        print(f"✅ Available templates: {available_templates}")
-
-        # Create a test brand profile
-        test_brand = BrandProfile(
-            company_name="VeloCity",
-            industry="telecom",
-            design_style=DesignStyle.MODERN_CORPORATE,
-            color_palette=ColorPalette(primary=["#1976D2", "#2196F3"]),
-            typography=Typography(heading_font="Inter", body_font="Inter")
-        )
+def test_template_engines_share_a_jinja_environment():
+    template_engine = TemplateEngine(TEMPLATES_DIR)
+    assert template_engine.list_templates()
+    assert TemplateEngine(Config().templates_dir).jinja_env is template_engine.jinja_env
 
-        return True
+def test_every_template_compiles():
+    # Each filter a template uses is registered (nl2br was once missing)
+    jinja_env = TemplateEngine(TEMPLATES_DIR).jinja_env
+    for template_path in sorted(TEMPLATES_DIR.glob("*.html")):
+        jinja_env.compile(template_path.read_text(encoding='utf-8'), template_path.name)
 
-    except Exception as e:
-        print(f"❌ Template system test failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+    nl2br = jinja_env.filters['nl2br']
+    assert nl2br("Line one\nLine two") == "Line one<br>\nLine two" and nl2br(None) == ""
 
-def test_html_generator():
-    """Test HTML generator without external dependencies"""
-    print("\n🧪 Testing HTML Generator")
-    print("="*50)
-
-    try:
-        from src.config.settings import Config
-        from src.parser import MarkdownParser
-        from src.templates import TemplateEngine
-        from src.branding import BrandProfile, ColorPalette, Typography, DesignStyle
-
-        config = Config()
-        parser = MarkdownParser(config)
-        template_engine = TemplateEngine(Path(__file__).parent / "src" / "templates")
-
-        # Parse a simple test document
-        test_file = Path("../companies/VeloCity/projects/VeloCity/workspace/funding-docs/INVESTOR_TEASER.md")
-        if not test_file.exists():
-            print(f"❌ Test file not found: {test_file}")
-            return False
-
-        document = parser.parse_file(test_file)
-
-        # Create brand profile
-        brand_profile = BrandProfile(
-            company_name="VeloCity",
-            industry="telecom",
-            design_style=DesignStyle.MODERN_CORPORATE,
-            color_palette=ColorPalette(primary=["#1976D2", "#2196F3"]),
-            typography=Typography(heading_font="Inter", body_font="Inter")
-        )
+def test_registered_templates_rank_by_priority():
+    template_engine = TemplateEngine(TEMPLATES_DIR)
 
-        # Get template for document
-        template_config = template_engine.get_template_for_document(document, brand_profile)
-        print(f"✅ Selected template: {template_config.name}")
+    def client_template(name, priority):
+        return TemplateConfig(name=name, description="", document_types=["client_brief"],
+                              design_styles=[DesignStyle.STARTUP_VIBRANT], template_file="modern_corporate.html",
+                              css_file="modern_corporate.css", priority=priority)
 
-        # Test rendering (without saving file)
-        rendered_content = template_engine.render_document(document, brand_profile, template_config)
-        print(f"✅ Rendered {len(rendered_content)} characters of HTML")
+    # Registered templates slot in by priority, keeping registration order among equals
+    for key, priority in (("first", 0), ("urgent", 5), ("second", 0)):
+        template_engine.register_template(key, client_template(key, priority))
+    candidates = template_engine.get_template_candidates("client_brief", DesignStyle.STARTUP_VIBRANT)
+    assert [candidate.name for candidate in candidates] == ["urgent", "first", "second"]
 
-        return True
+    # Re-registering a key replaces its old entry
+    template_engine.register_template("urgent", client_template("demoted", -1))
+    candidates = template_engine.get_template_candidates("client_brief", DesignStyle.CREATIVE_MINIMAL)
+    assert [candidate.name for candidate in candidates] == ["first", "second", "demoted"]
 
-    except Exception as e:
-        print(f"❌ HTML generator test failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+# Rendering
 
-def run_simple_tests():
-    """Run simple tests"""
-    print("🚀 Running Simple Document Transformer Tests")
-    print("="*60)
+FIBRE_MARKDOWN = """# Fibre Rollout
 
-    results = []
-    results.append(test_parser())
-    results.append(test_brand_system())
-    results.append(test_template_system())
-    results.append(test_html_generator())
+## Executive Summary
+Open-access fibre for underserved suburbs.
 
-    print("\n" + "="*60)
-    passed = sum(results)
-    total = len(results)
-    print(f"📊 Test Results: {passed}/{total} passed")
+## Financial Projections
+| Year | Revenue | Cost |
+|------|---------|------|
+| 2025 | $1,000 | 400 |
+| 2026 | $2,500 | 900 |
+"""
 
-    if passed == total:
-        print("🎉 All tests passed!")
-    else:
-        print(f"⚠️ {total - passed} test(s) failed")
+def test_render_cache_serves_repeat_renders():
+    document = MarkdownParser().parse_content(FIBRE_MARKDOWN)
+    brand_profile = velocity_brand()
+    template_engine = TemplateEngine(TEMPLATES_DIR)
+    template_config = template_engine.get_template_for_document(document, brand_profile)
+
+    rendered_content = template_engine.render_document(document, brand_profile, template_config)
+    cached_content = template_engine.render_document(document, brand_profile, template_config)
+
+    assert "Fibre Rollout" in rendered_content
+    assert cached_content == rendered_content
+    stats = template_engine.render_cache.get_stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+def test_render_cache_misses_after_the_document_is_edited():
+    document = MarkdownParser().parse_content(FIBRE_MARKDOWN)
+    brand_profile = velocity_brand()
+    template_engine = TemplateEngine(TEMPLATES_DIR)
+    template_config = template_engine.get_template_for_document(document, brand_profile)
+    template_engine.render_document(document, brand_profile, template_config)
+
+    # Editing the document after a render changes its key instead of serving the old output
+    document.sections[0].content += "\nNow covering rural towns too."
+    edited_content = template_engine.render_document(document, brand_profile, template_config)
+    assert "rural towns" in edited_content
+    assert not hasattr(document, '_content_hash')
+    stats = template_engine.render_cache.get_stats()
+    assert (stats['hits'], stats['misses']) == (0, 2)
+
+def test_streamed_html_matches_buffered_html(tmp_path):
+    document = MarkdownParser().parse_content("""# Fibre Rollout
+
+## Financial Projections
+| Year | Revenue | Cost |
+|------|---------|------|
+| 2025 | $1,000 | 400 |
+| 2026 | $2,500 | 900 |
+
+## Team
+- Jane Smith, CEO
+- John Doe, CTO
+
+See [our site](https://example.com).
+""")
+    brand_profile = BrandProfile(company_name="VeloCity", industry="telecom")
+    html_generator = HTMLGenerator(TemplateEngine(TEMPLATES_DIR), tmp_path)
+
+    buffered_path = html_generator.generate_html(document, brand_profile, output_filename="buffered.html")
+    streamed_path = html_generator.generate_html(document, brand_profile, output_filename="streamed.html",
+                                                 stream=True)
+    buffered = Path(buffered_path).read_text(encoding='utf-8')
+    streamed = Path(streamed_path).read_text(encoding='utf-8')
+
+    assert "Financial Projections" in buffered and "VeloCity" in buffered
+    assert streamed == buffered
+
+@requires_teaser
+def test_html_generator():
+    """Test rendering the VeloCity investor teaser without saving a file"""
+
+    document = MarkdownParser(Config()).parse_file(TEASER_FILE)
+    template_engine = TemplateEngine(TEMPLATES_DIR)
+    template_config = template_engine.get_template_for_document(document, velocity_brand())
+
+    rendered_content = template_engine.render_document(document, velocity_brand(), template_config)
+    assert rendered_content
+
+# HTML rewriter
+
+def sequential_rewrite(text, rules):
+    """Apply replacement rules one after another, as the rewriter must"""
+
+    for old, new, first in rules:
+        if first is None:
+            text = text.replace(old, new)
+        elif old in text:
+            before, after = text.split(old, 1)
+            text = before + first + after.replace(old, new)
+    return text
+
+def rewrite(text, rules, chunk_size=None):
+    """Apply replacement rules with an HTMLRewriter, whole or in chunks"""
+
+    rewriter = HTMLRewriter()
+    for rule in rules:
+        rewriter.add_replacement(*rule)
+    if chunk_size is None:
+        return rewriter.rewrite(text)
+    return ''.join(rewriter.rewrite_stream(text[i:i + chunk_size] for i in range(0, len(text), chunk_size)))
+
+@pytest.mark.parametrize("text, rules", [
+    # A later key starting before an earlier one loses the overlap
+    ('<p>abcde</p>', [('bcde', 'X', None), ('abcd', 'Y', None)]),
+    ('<img src="a.png">', [('<img', '<img class="image"', None), ('<img src="a.png"', '<figure>', None)]),
+    # Inserted text, alone or with its neighbours, makes matches for later keys
+    ('<img src="a.png">', [('<img', '<img class="image"', None), ('"image" src', '"image" data-src', None)]),
+    ('<a href="x">', [('href="x"', 'href="x" rel', None), ('rel>', 'rel="noopener">', None)]),
+    ('<h3>Revenue</h3>', [('<h3>Revenue</h3>', '<h3>Revenue</h3><svg id="1">', None),
+                          ('<h3>Revenue</h3>', '<h3>Revenue</h3><svg id="2">', None)]),
+    # The first occurrence counts from the text earlier keys produced
+    ('<br><p></head></head>', [('<br>', '</head>', None), ('</head>', '</head>', '<meta></head>')]),
+    ('<style>a</style><style>b</style></head>', [('</style>', '</style>', 'x{}</style>'),
+                                                 ('</head>', '</head>', '<title></title></head>')])
+])
+def test_html_rewriter_matches_sequential_replacement(text, rules):
+    expected = sequential_rewrite(text, rules)
+    assert rewrite(text, rules) == expected
+    assert rewrite(text, rules, chunk_size=1) == expected
+
+def test_html_rewriter_matches_sequential_replacement_for_random_rules():
+    # Random rules over a small alphabet overlap and chain often
+    rng = random.Random(10)
+    for _ in range(3000):
+        alphabet = 'ab<>/"'[:rng.randint(2, 6)]
+        word = lambda low, high: ''.join(rng.choice(alphabet) for _ in range(rng.randint(low, high)))
+        rules = [(word(1, 7), word(0, 9), word(0, 9) if rng.random() < 0.3 else None)
+                 for _ in range(rng.randint(1, 6))]
+        text = word(0, 60)
+        expected = sequential_rewrite(text, rules)
+        assert rewrite(text, rules) == expected, (text, rules)
+        assert rewrite(text, rules, chunk_size=rng.randint(1, 8)) == expected, (text, rules)
+
+def sequential_post_process(generator, html, document, brand_profile):
+    """The HTML generator's post-processing as its original sequential passes"""
+
+    for old, new in generator._get_content_replacements(document, brand_profile):
+        html = html.replace(old, new)
+    for css in (generator._generate_custom_css(brand_profile), generator._get_responsive_css()):
+        if '<style>' in html and '</style>' in html:
+            style_end = html.find('</style>')
+            html = html[:style_end] + css + html[style_end:]
+        elif '</head>' in html:
+            html = html.replace('</head>', f'<style>\n{css}\n</style>\n</head>')
+        else:
+            html = f'<style>\n{css}\n</style>\n{html}'
+    if '<meta name="viewport"' not in html:
+        html = html.replace('<head>', '<head>\n<meta name="viewport" content="width=device-width, initial-scale=1.0">')
+    head_end = html.find('</head>')
+    if head_end != -1:
+        html = html[:head_end] + generator._generate_seo_metadata(document, brand_profile) + html[head_end:]
+    return html
+
+def test_post_process_matches_sequential_passes(tmp_path):
+    document = MarkdownParser().parse_content("""# Fibre Rollout
+
+![Network map](map.png) and ![Towers](towers.png)
+
+## Financial Projections
+| Year | Revenue | Cost |
+|------|---------|------|
+| 2025 | $1,000 | 400 |
+
+## Financial Projections
+| Year | Revenue | Cost |
+|------|---------|------|
+| 2026 | $2,500 | 900 |
+
+See [our site](https://example.com), [the map](https://example.com/map) and [our site](https://example.com).
+""")
+    document.team_members = [TeamMember(name="Jane Smith", title="CEO"), TeamMember(name="Jane Smith", title="CFO")]
+    brand_profile = BrandProfile(company_name="VeloCity", industry="telecom")
+    generator = HTMLGenerator(TemplateEngine(TEMPLATES_DIR), tmp_path)
+    rendered = generator._render_document(document, brand_profile,
+                                          generator.template_engine.get_template_for_document(document, brand_profile))
+
+    # Markup for every content rewrite, including repeated links, chart titles and team members
+    body = """<img src="map.png" alt="Network map"><img src="towers.png">
+<h3>Financial Projections</h3><table></table><h3>Financial Projections</h3>
+<a href="https://example.com">site</a> <a href="https://example.com/map">map</a> <a href="https://example.com">site</a>
+<h4>Jane Smith</h4><p>CEO</p>
+</div>
+</div>
+</body>"""
+    pages = [
+        rendered.replace('</body>', body),
+        '<html><head><title>Plan</title></head><body><style>p {}</style><div><div>' + body + '</html>',
+        '<div><div>' + body
+    ]
+    for page in pages:
+        expected = sequential_post_process(generator, page, document, brand_profile)
+        for chunk_size in (len(page), 7, 1000):
+            chunks = [page[i:i + chunk_size] for i in range(0, len(page), chunk_size)]
+            assert ''.join(generator._post_process(chunks, document, brand_profile)) == expected
+
+# Benchmarks and profiling
+
+def test_nested_phases_count_only_towards_themselves():
+    timer = PhaseTimer()
+    with timer.phase("outer"):
+        with timer.phase("inner"):
+            sum(range(200000))
+    assert timer.phases["inner"] > 0 and timer.phases["outer"] < timer.phases["inner"]
+
+def test_streamed_render_is_timed_as_render(tmp_path):
+    # Streamed HTML renders the template while post-processing
+    document = MarkdownParser().parse_content("# Plan\n\n## Market\n" + "Demand grows.\n" * 200)
+    generator = HTMLGenerator(TemplateEngine(TEMPLATES_DIR), tmp_path)
+    timer = PhaseTimer()
+    with timer.activate():
+        generator.generate_html(document, BrandProfile(company_name="Bench", industry="telecom"), stream=True)
+    assert timer.phases["render"] > 0 and "post_process" in timer.phases
+
+@pytest.fixture(scope="module")
+def benchmark_run():
+    """A benchmark suite and the results of one small HTML run"""
+
+    suite = BenchmarkSuite(Path(__file__).parent, BenchmarkConfiguration(
+        formats=['html'], synthetic_sections=[4], repeat=1
+    ))
+    return suite, suite.run()
+
+def test_benchmark_reports_phases_memory_and_output(benchmark_run):
+    _, results = benchmark_run
+    case = results["cases"]["synthetic/4_sections:html"]
+    assert {"parse", "render", "post_process"} <= set(case["phases"])
+    assert case["output_bytes"] > 0 and case["peak_memory_kb"] > 0
+    assert sum(case["phases"].values()) <= case["total"]
+
+def test_benchmark_flags_regressions(benchmark_run):
+    suite, results = benchmark_run
+    case = results["cases"]["synthetic/4_sections:html"]
+    baseline = copy.deepcopy(results)
+    assert suite.compare(results, baseline) == []
+
+    # Growth past the threshold is a regression for time, memory and output size alike
+    baseline["cases"]["synthetic/4_sections:html"].update(
+        total=case["total"] / 4 - 0.1, peak_memory_kb=case["peak_memory_kb"] // 4 - 2048,
+        output_bytes=case["output_bytes"] // 4 - 2048
+    )
+    regressions = {regression.metric: regression for regression in suite.compare(results, baseline)}
+    assert {"total", "peak_memory_kb", "output_bytes"} <= set(regressions)
+    assert regressions["peak_memory_kb"].format_value(2048) == "2,048 KB"
+
+def test_benchmark_ignores_noise_and_other_versions(benchmark_run):
+    suite, results = benchmark_run
+    case = results["cases"]["synthetic/4_sections:html"]
+    baseline = copy.deepcopy(results)
+    baseline_case = baseline["cases"]["synthetic/4_sections:html"]
+
+    # Growth below the minimum is noise
+    baseline_case.update(total=case["total"] - 0.01, peak_memory_kb=case["peak_memory_kb"] - 10,
+                         output_bytes=case["output_bytes"] - 10)
+    assert suite.compare(results, baseline) == []
+
+    # Other benchmark versions are not compared
+    baseline["version"] = "0.0.0"
+    baseline_case.update(total=0.0)
+    assert suite.compare(results, baseline) == []
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    assert percentile([4.0], 99) == 4.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0) == 1.0 and percentile([1.0, 2.0, 3.0, 4.0], 100) == 4.0
+    assert abs(percentile([0.0, 10.0], 90) - 9.0) < 1e-9
+
+@pytest.fixture
+def span_collector():
+    """A collector holding parse and render spans from two processes"""
+
+    collector = SpanCollector()
+    collector.add([
+        Span("parse", 100.0, 0.4, 1, 11),
+        Span("render", 100.5, 0.1, 1, 12, {"format": "html"}),
+        Span("parse", 100.2, 0.2, 2, 21)
+    ])
+    collector.add([Span("render", 101.0, 0.3, 2, 22, {"format": "pdf"})])
+    return collector
+
+def test_span_phase_stats(span_collector):
+    stats = span_collector.get_phase_stats()
+    assert list(stats) == ["parse", "render"]
+    assert stats["parse"]["count"] == 2 and abs(stats["parse"]["total"] - 0.6) < 1e-9
+    assert abs(stats["parse"]["mean"] - 0.3) < 1e-9 and stats["parse"]["max"] == 0.4
+    assert abs(stats["render"]["p50"] - 0.2) < 1e-9 and abs(stats["render"]["p90"] - 0.28) < 1e-9
+    assert {"p50", "p90", "p95", "p99"} <= set(stats["render"])
+
+    span_collector.clear()
+    assert span_collector.get_phase_stats() == {}
+
+def test_chrome_trace_export(span_collector, tmp_path):
+    trace_path = span_collector.export_chrome_trace(tmp_path / "traces" / "run.json")
+    with open(trace_path, 'r', encoding='utf-8') as f:
+        trace = json.load(f)
+
+    # Complete events in microseconds from the first span, one track per process and thread
+    assert trace["displayTimeUnit"] == "ms"
+    events = trace["traceEvents"]
+    assert [event["ts"] for event in events] == [0.0, 200000.0, 500000.0, 1000000.0]
+    assert [event["dur"] for event in events] == [400000.0, 200000.0, 100000.0, 300000.0]
+    assert all(event["ph"] == "X" for event in events)
+    assert [event["cat"] for event in events] == ["prepare", "prepare", "html", "pdf"]
+    assert (events[1]["pid"], events[1]["tid"]) == (2, 21) and events[2]["args"] == {"format": "html"}
+
+@requires_weasyprint
+def test_reused_batch_processor_reports_only_its_latest_run(tmp_path):
+    from src.batch import BatchProcessor, BatchConfiguration
+
+    document_path = tmp_path / "plan.md"
+    document_path.write_text("# Plan\n\n**Company**: VeloCity\n\n## Market\n\nDemand grows.\n", encoding='utf-8')
+    processor = BatchProcessor(Path(__file__).parent, BatchConfiguration(
+        output_directory=tmp_path / "output", max_workers=2, create_summary_document=False,
+        use_parse_cache=False, use_chart_cache=False, optimize_images=False
+    ))
+    processor.add_document_processing_job(document_path, formats=["html"])
+    first_run = processor.process_all_jobs()["phase_timings"]
+    second_run = processor.process_all_jobs()["phase_timings"]
+
+    # The second run may hit the render cache, so it can have fewer phases but never more spans
+    assert first_run["prepare"]["count"] == second_run["prepare"]["count"] == 1
+    assert all(phase_stats["count"] == 1 for phase_stats in second_run.values())
+
+# Batch processing
+
+BATCH_DOCUMENTS = {
+    "fibre.md": "# Fibre Rollout\n\n**Company**: VeloCity\n\n## Market\n\nDemand grows in every region.\n",
+    "towers.md": """# Tower Leasing
+
+**Company**: VeloCity
+
+## Financial Projections
+| Year | Revenue | Cost |
+|------|---------|------|
+| 2025 | $1,000 | 400 |
+| 2026 | $2,500 | 900 |
+"""
+}
+
+@pytest.fixture(scope="module")
+def backend_runs(tmp_path_factory):
+    """Summaries and HTML outputs of the same two-document batch on the thread and process backends"""
+
+    if WEASYPRINT_ERROR is not None:
+        pytest.skip(f"WeasyPrint unavailable: {WEASYPRINT_ERROR}")
+    from src.batch import BatchProcessor, BatchConfiguration
+
+    temp_dir = tmp_path_factory.mktemp("backends")
+    for name, content in BATCH_DOCUMENTS.items():
+        (temp_dir / name).write_text(content, encoding='utf-8')
+
+    runs = {}
+    for backend in ("thread", "process"):
+        backend_dir = temp_dir / backend
+        backend_dir.mkdir()
+        processor = BatchProcessor(Path(__file__).parent, BatchConfiguration(
+            max_workers=2, execution_backend=backend, output_directory=backend_dir / "output",
+            create_summary_document=False, parse_cache_dir=backend_dir / "parse_cache",
+            chart_cache_dir=backend_dir / "chart_cache", image_cache_dir=backend_dir / "images"
+        ))
+        for name in sorted(BATCH_DOCUMENTS):
+            processor.add_document_processing_job(temp_dir / name, formats=["html", "docx"])
+        summary = processor.process_all_jobs()
+        outputs = {
+            Path(job.input_path).name: Path(job.output_paths["html"]).read_text(encoding='utf-8')
+            for job in processor.jobs
+        }
+        runs[backend] = (summary, outputs)
+    return runs
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_batch_jobs_prepare_once_and_fan_out_per_format(backend_runs, backend):
+    summary, _ = backend_runs[backend]
+    assert (summary["completed_jobs"], summary["failed_jobs"]) == (2, 0), summary["failed_job_details"]
+    assert summary["formats_generated"] == {"html": 2, "docx": 2}
+    phases = summary["phase_timings"]
+    assert phases["prepare"]["count"] == 2 and phases["parse"]["count"] == 2
+    assert phases["generate_html"]["count"] == 2 and phases["generate_docx"]["count"] == 2
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_batch_merges_worker_cache_counters(backend_runs, backend):
+    summary, _ = backend_runs[backend]
+    assert summary["parse_cache"]["misses"] == 2
+    assert summary["chart_cache"]["misses"] > 0
+
+def test_batch_backends_produce_the_same_html(backend_runs):
+    assert backend_runs["thread"][1] == backend_runs["process"][1]
+
+def run_incremental_batch(temp_dir, **settings):
+    """Run an incremental HTML batch over temp_dir/plan.md and return its job"""
+
+    from src.batch import BatchProcessor, BatchConfiguration
+
+    processor = BatchProcessor(Path(__file__).parent, BatchConfiguration(
+        max_workers=1, incremental=True, output_directory=temp_dir / "output", create_summary_document=False,
+        parse_cache_dir=temp_dir / "parse_cache", chart_cache_dir=temp_dir / "chart_cache",
+        image_cache_dir=temp_dir / "images", **settings
+    ))
+    processor.add_document_processing_job(temp_dir / "plan.md", formats=["html"])
+    processor.process_all_jobs()
+    return processor.jobs[0]
+
+@pytest.fixture
+def built_plan(tmp_path):
+    """A directory whose plan.md has been built once by an incremental batch"""
+
+    (tmp_path / "plan.md").write_text("# Fibre Rollout\n\n**Company**: VeloCity\n\n## Market\n\nDemand grows.\n",
+                                      encoding='utf-8')
+    assert run_incremental_batch(tmp_path).status == "completed"
+    return tmp_path
+
+@requires_weasyprint
+def test_incremental_batch_skips_unchanged_jobs(built_plan):
+    # An unchanged run is skipped and reports the previous outputs
+    job = run_incremental_batch(built_plan)
+    assert job.status == "skipped" and Path(job.output_paths["html"]).exists()
+
+@requires_weasyprint
+def test_incremental_batch_rebuilds_edited_inputs(built_plan):
+    source = built_plan / "plan.md"
+    source.write_text(source.read_text(encoding='utf-8') + "\n## Team\n\nFounders.\n", encoding='utf-8')
+    assert run_incremental_batch(built_plan).status == "completed"
+    assert run_incremental_batch(built_plan).status == "skipped"
+
+@requires_weasyprint
+def test_incremental_batch_rebuilds_when_output_settings_change(built_plan):
+    # Settings that change the output are part of the fingerprint
+    assert run_incremental_batch(built_plan, chart_formats={"html": "png"}).status == "completed"
+    assert run_incremental_batch(built_plan, chart_formats={"html": "png"}).status == "skipped"
+    assert run_incremental_batch(built_plan, chart_formats={"html": "png"}, stream_html=True).status == "completed"
+
+# PDF rendering
+
+@requires_weasyprint
+def test_pdf_service_evicts_least_recently_used_stylesheets():
+    from src.generators.pdf_service import PDFRenderService
+
+    service = PDFRenderService(max_stylesheets=2)
+    builds = []
+
+    def builder(name):
+        return lambda: builds.append(name) or f"body {{ font-family: '{name}'; }}"
+
+    first = service.get_stylesheets(("a",), builder("a"))
+    assert service.get_stylesheets(("a",), builder("a")) is first
+    service.get_stylesheets(("b",), builder("b"))
+    service.get_stylesheets(("a",), builder("a"))  # a becomes most recent, so b is evicted next
+    service.get_stylesheets(("c",), builder("c"))
+    service.get_stylesheets(("a",), builder("a"))
+    service.get_stylesheets(("b",), builder("b"))
+
+    assert builds == ["a", "b", "c", "b"]
+    stats = service.get_stats()
+    assert (stats["stylesheet_hits"], stats["stylesheet_misses"], stats["stylesheets"]) == (3, 4, 2)
+
+@requires_weasyprint
+def test_pdf_generators_share_the_service_and_font_configuration(tmp_path):
+    from src.generators.pdf_generator import PDFGenerator
+    from src.generators.pdf_service import get_pdf_service
+
+    # Generators without an explicit service share the process-wide service and its font configuration
+    template_engine = TemplateEngine(TEMPLATES_DIR)
+    first_generator = PDFGenerator(template_engine, tmp_path / "one")
+    second_generator = PDFGenerator(template_engine, tmp_path / "two")
+    assert first_generator.pdf_service is second_generator.pdf_service is get_pdf_service()
+    assert first_generator.font_config is second_generator.font_config is get_pdf_service().font_config
+    assert not first_generator.warm_fonts
+
+def test_split_prefers_forced_page_breaks():
+    # Split points are only used when there are too few forced breaks
+    body = f"<p>a</p>{SPLIT_MARKER}<p>b</p>{PAGE_BREAK_MARKER}<p>c</p>{SPLIT_MARKER}<p>d</p>"
+    chunks = split_html_at_page_breaks(f"<html><body>{body}</body></html>", 2)
+    assert [chunk.count("<p>") for chunk in chunks] == [2, 2]
+    assert SPLIT_MARKER in chunks[0] and PAGE_BREAK_MARKER not in ''.join(chunks)
+
+def test_split_at_split_points():
+    body = f"<p>a</p>{SPLIT_MARKER}<p>b</p>{SPLIT_MARKER}<p>c</p>"
+    chunks = split_html_at_page_breaks(f"<html><body>{body}</body></html>", 3)
+    assert chunks == ["<html><body><p>a</p></body></html>", "<html><body><p>b</p></body></html>",
+                      "<html><body><p>c</p></body></html>"]
+
+def blank_pdf(page_count):
+    """A PDF of blank A4 pages"""
+
+    import io
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(page_count):
+        writer.add_blank_page(595, 842)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+@requires_pypdf
+def test_stamp_pdf_pages_builds_overlays_for_the_page_count(tmp_path):
+    from src.generators.pdf_chunks import stamp_pdf_pages
+
+    target = tmp_path / "stamped.pdf"
+    target.write_bytes(blank_pdf(3))
+    page_counts = []
+    stamp_pdf_pages(target, lambda page_count: page_counts.append(page_count) or blank_pdf(page_count))
+    assert page_counts == [3]
+
+    # Overlays must match the stamped PDF's page count
+    with pytest.raises(ValueError):
+        stamp_pdf_pages(target, lambda page_count: blank_pdf(page_count - 1))
+
+REGIONS_MARKDOWN = "# Network Expansion Plan\n\n" + "".join(
+    f"## Region {i} & Partners\n\n" + f"Fibre rollout paragraph {i}. " * 60 + "\n\n"
+    for i in range(1, 9)
+)
+
+@requires_weasyprint
+def test_split_points_are_marked_only_for_chunked_rendering(tmp_path):
+    from src.generators.pdf_generator import PDFGenerator, PDFOptions
+
+    document = MarkdownParser().parse_content(REGIONS_MARKDOWN)
+    brand_profile = BrandProfile(company_name="VeloCity", industry="telecom",
+                                 design_style=DesignStyle.MODERN_CORPORATE)
+    template_engine = TemplateEngine(TEMPLATES_DIR)
+    single = PDFGenerator(template_engine, tmp_path / "single")
+    chunked = PDFGenerator(template_engine, tmp_path / "chunked", parallel_workers=3)
+
+    # Default templates put a class on section headings: one-pass HTML gets no extra breaks,
+    # chunked HTML gets layout-neutral split points before each h2 after the first
+    single_html = single._generate_pdf_html(document, brand_profile, None, PDFOptions(parallel_workers=0), None)
+    assert PAGE_BREAK_MARKER not in single_html and SPLIT_MARKER not in single_html
+    chunked_html = chunked._generate_pdf_html(document, brand_profile, None, PDFOptions(parallel_workers=3), None)
+    assert chunked_html.count(SPLIT_MARKER) == 8 and PAGE_BREAK_MARKER not in chunked_html
+
+@requires_weasyprint
+@requires_pypdf
+def test_chunked_pdf_matches_single_pass_pdf_with_page_numbers(tmp_path):
+    from pypdf import PdfReader
+    from src.generators.pdf_generator import PDFGenerator, PDFOptions
+    from src.generators.pdf_service import get_pdf_service
+
+    document = MarkdownParser().parse_content(REGIONS_MARKDOWN)
+    brand_profile = BrandProfile(company_name="VeloCity", industry="telecom",
+                                 design_style=DesignStyle.MODERN_CORPORATE)
+    template_engine = TemplateEngine(TEMPLATES_DIR)
+    single = PDFGenerator(template_engine, tmp_path / "single")
+    chunked = PDFGenerator(template_engine, tmp_path / "chunked", parallel_workers=3)
+
+    # Bare section headings get forced breaks in both modes, so splitting there keeps the layout
+    rendered_html = "<html><head></head><body>" + "".join(
+        f"<div><h{section.level}>{section.title}</h{section.level}><p>{section.content}</p></div>"
+        for section in document.sections
+    ) + "</body></html>"
 
-    return passed == total
+    try:
+        single_path = single.generate_pdf(document, brand_profile, pdf_options=PDFOptions(parallel_workers=0),
+                                          output_filename="single.pdf", rendered_html=rendered_html)
+        chunked_path = chunked.generate_pdf(document, brand_profile, pdf_options=PDFOptions(parallel_workers=3),
+                                            output_filename="chunked.pdf", rendered_html=rendered_html)
+    finally:
+        get_pdf_service().shutdown()
+
+    single_pages = PdfReader(single_path).pages
+    chunked_pages = PdfReader(chunked_path).pages
+    assert len(chunked_pages) == len(single_pages) > 8
+    chunked_text = [page.extract_text() for page in chunked_pages]
+    assert chunked_text == [page.extract_text() for page in single_pages]
+
+    # Page numbers run on across chunks
+    page_count = len(chunked_pages)
+    for number, text in enumerate(chunked_text, 1):
+        assert f"Page {number} of {page_count}" in text, (number, text)
 
 if __name__ == "__main__":
-    success = run_simple_tests()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    sys.exit(pytest.main([__file__, "-v"]))